@@ -4,11 +4,13 @@ Module de détection d'anomalies et d'écarts dans les données géopolitiques
 """
 
 import logging
+import math
 import numpy as np
 from typing import List, Dict, Any
 from datetime import datetime, timedelta
 from scipy import stats
-from .database import DatabaseManager
+from .database import DatabaseManager, to_epoch
+from .online_anomaly import OnlineAnomalyDetector
 
 logger = logging.getLogger(__name__)
 
@@ -19,45 +21,51 @@ class AnomalyDetector:
     
     def __init__(self, db_manager: DatabaseManager):
         self.db_manager = db_manager
+        self.online = OnlineAnomalyDetector(db_manager)
     
     def detect_sentiment_anomalies(self, days: int = 7, threshold: float = 2.0) -> List[Dict[str, Any]]:
         """
         Détecte les anomalies de sentiment sur une période donnée
-        Utilise la méthode statistique des z-scores
+        Utilise la méthode statistique des z-scores : moyenne et écart-type
+        sont agrégés par SQLite, seuls les articles hors seuil sont lus
         """
         try:
-            cutoff_date = datetime.now() - timedelta(days=days)
+            cutoff = to_epoch(datetime.now() - timedelta(days=days))
             
             conn = self.db_manager.get_connection()
             cursor = conn.cursor()
             
-            # Récupérer les données de sentiment
+            # Statistiques de la période en une agrégation
             cursor.execute("""
-                SELECT sentiment_score, pub_date
+                SELECT COUNT(sentiment_score), AVG(sentiment_score),
+                       AVG(sentiment_score * sentiment_score)
                 FROM articles
-                WHERE pub_date >= ?
-                ORDER BY pub_date
-            """, (cutoff_date,))
-            
-            scores = [row[0] for row in cursor.fetchall()]
-            conn.close()
+                WHERE pub_ts >= ?
+            """, (cutoff,))
+            total, mean_score, mean_square = cursor.fetchone()
             
-            if len(scores) < 10:
+            if total < 10:
+                conn.close()
                 return []
             
-            # Calcul des statistiques de base
-            mean_score = np.mean(scores)
-            std_score = np.std(scores)
-            
-            if std_score == 0:
+            std_score = math.sqrt(max(0.0, mean_square - mean_score * mean_score))
+            if std_score < 1e-12:
+                conn.close()
                 return []
             
-            # Calcul des z-scores
-            z_scores = [(score - mean_score) / std_score for score in scores]
+            # Articles dont |z-score| > threshold
+            cursor.execute("""
+                SELECT sentiment_score
+                FROM articles
+                WHERE pub_ts >= ? AND ABS(sentiment_score - ?) > ?
+                ORDER BY pub_ts
+            """, (cutoff, mean_score, threshold * std_score))
+            scores = [row[0] for row in cursor.fetchall()]
+            conn.close()
             
-            # Identifier les anomalies (|z-score| > threshold)
             anomalies = []
-            for i, (score, z_score) in enumerate(zip(scores, z_scores)):
+            for score in scores:
+                z_score = (score - mean_score) / std_score
                 if abs(z_score) > threshold:
                     anomalies.append({
                         'score': score,
@@ -67,7 +75,7 @@ class AnomalyDetector:
                         'confidence': min(1.0, abs(z_score) / (threshold * 2))
                     })
             
-            logger.info(f"🔍 {len(anomalies)} anomalies de sentiment détectées sur {len(scores)} articles")
+            logger.info(f"🔍 {len(anomalies)} anomalies de sentiment détectées sur {total} articles")
             return anomalies
             
         except Exception as e:
@@ -86,13 +94,13 @@ class AnomalyDetector:
             
             # Compter les articles par jour pour ce thème
             cursor.execute("""
-                SELECT DATE(a.pub_date) as date, COUNT(*) as count
-                FROM articles a
-                JOIN theme_analyses ta ON a.id = ta.article_id
-                WHERE ta.theme_id = ? AND a.pub_date >= ?
-                GROUP BY DATE(a.pub_date)
+                SELECT DATE(a.pub_ts, 'unixepoch') as date, COUNT(*) as count
+                FROM theme_analyses ta
+                JOIN articles a ON a.id = ta.article_id
+                WHERE ta.theme_id = ? AND a.pub_ts >= ?
+                GROUP BY date
                 ORDER BY date
-            """, (theme_id, cutoff_date))
+            """, (theme_id, to_epoch(cutoff_date)))
             
             daily_counts = [(row[0], row[1]) for row in cursor.fetchall()]
             conn.close()
@@ -146,10 +154,10 @@ class AnomalyDetector:
                 FROM themes t
                 JOIN theme_analyses ta ON t.id = ta.theme_id
                 JOIN articles a ON ta.article_id = a.id
-                WHERE a.pub_date >= ? AND ta.confidence >= 0.1
+                WHERE a.pub_ts >= ? AND ta.confidence >= 0.1
                 GROUP BY t.id, t.name
                 HAVING COUNT(*) >= 5
-            """, (cutoff_date,))
+            """, (to_epoch(cutoff_date),))
             
             theme_data = cursor.fetchall()
             conn.close()
@@ -197,20 +205,47 @@ class AnomalyDetector:
     def get_comprehensive_anomaly_report(self, days: int = 7) -> Dict[str, Any]:
         """
         Génère un rapport complet des anomalies détectées
+        
+        Les anomalies de volume (thèmes, flux) sont lues dans les statistiques
+        en ligne : une requête pour les états, une pour les pics de la période,
+        quel que soit le nombre de thèmes. Elles ne portent que sur la série
+        journalière (moyenne, écart-type et pics par jour).
+        
+        theme_anomalies est indexé par theme_id (clé de série des
+        analyses, y compris pour un thème supprimé depuis) et non plus par
+        les seuls thèmes de la table themes ; feed_anomalies par URL du flux.
         """
+        since = datetime.now() - timedelta(days=days)
+        self.online.advance()
+        
         report = {
             'timestamp': datetime.now(),
             'period_days': days,
             'sentiment_anomalies': self.detect_sentiment_anomalies(days),
-            'theme_anomalies': {},
+            'theme_anomalies': self._volume_anomalies('theme', since),
+            'feed_anomalies': self._volume_anomalies('feed', since),
             'correlation_anomalies': self.detect_correlation_anomalies(days)
         }
         
-        # Analyser les anomalies pour chaque thème
-        themes = self.db_manager.get_themes()
-        for theme in themes:
-            theme_anomaly = self.detect_theme_anomalies(theme['id'], days)
-            if theme_anomaly.get('anomaly_detected', False) or theme_anomaly.get('total_peaks', 0) > 0:
-                report['theme_anomalies'][theme['id']] = theme_anomaly
-        
         return report
+    
+    def _volume_anomalies(self, kind: str, since: datetime) -> Dict[str, Dict[str, Any]]:
+        """Séries journalières (thèmes ou flux) ayant au moins un pic depuis `since`"""
+        states = self.online.series_states(kind, 'day')
+        peaks = self.online.peaks(kind, since, 'day')
+        
+        anomalies = {}
+        for key, series_peaks in peaks.items():
+            state = states.get(key, {})
+            anomalies[key] = {
+                'anomaly_detected': True,
+                'mean_daily_count': state.get('mean'),
+                'std_daily_count': state.get('std'),
+                'ewma_daily_count': state.get('ewma'),
+                'last_day': state.get('last_bucket'),
+                'z_score': state.get('z_score'),
+                'seasonal_z_score': state.get('seasonal_z_score'),
+                'significant_peaks': series_peaks,
+                'total_peaks': len(series_peaks)
+            }
+        return anomalies
@@ -86,22 +86,25 @@ def create_app():
         entity_extractor = GeopoliticalEntityExtractor(model_name="fr_core_news_lg")
         print("✅ Extracteur d'entités SpaCy initialisé")
 
-        # 2. Créer l'analyseur geo-narrative corrigé
-        from .geo_narrative_analyzer import GeoNarrativeAnalyzer
-        geo_narrative_analyzer = GeoNarrativeAnalyzer(db_manager, entity_extractor)
-        print("✅ GeoNarrativeAnalyzer corrigé initialisé")
-
-        # 3. Créer le gestionnaire BDD d'entités
+        # 2. Créer le gestionnaire BDD d'entités et le cache par article
         from .entity_database_manager import EntityDatabaseManager
+        from .article_entity_cache import ArticleEntityCache
         entity_db_manager = EntityDatabaseManager(db_manager)
+        entity_cache = ArticleEntityCache(entity_extractor, entity_db_manager)
         print("✅ EntityDatabaseManager initialisé")
 
+        # 3. Créer l'analyseur geo-narrative corrigé
+        from .geo_narrative_analyzer import GeoNarrativeAnalyzer
+        geo_narrative_analyzer = GeoNarrativeAnalyzer(db_manager, entity_extractor, entity_cache)
+        print("✅ GeoNarrativeAnalyzer corrigé initialisé")
+
         # 4. Créer l'intégrateur
         from .geo_entity_integration import GeoEntityIntegration
         geo_entity_integration = GeoEntityIntegration(
             geo_narrative_analyzer,
             entity_extractor,
-            entity_db_manager
+            entity_db_manager,
+            entity_cache
         )
         print("✅ GeoEntityIntegration initialisé")
 
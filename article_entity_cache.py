@@ -0,0 +1,154 @@
+# Flask/article_entity_cache.py
+"""
+Cache persistant des entités par article
+La NER tourne une fois par article (clé : empreinte du texte + version du
+modèle), à l'ingestion ou par rattrapage ; les analyses lisent ensuite
+article_entities en SQL
+"""
+
+import hashlib
+import itertools
+import json
+import logging
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from .entity_database_manager import CATEGORY_MAP, _IDS, EntityDatabaseManager
+
+logger = logging.getLogger(__name__)
+
+# Articles par transaction d'enregistrement (les résultats d'un même
+# nlp.pipe() sont enregistrés au fil de l'eau par tranches de cette taille)
+EXTRACT_CHUNK_SIZE = 200
+
+# Articles lus par page de rattrapage : une page = un seul nlp.pipe(), donc au
+# plus un pool de processus SpaCy, amorti sur bien plus que MULTIPROCESS_MIN_TEXTS
+BACKFILL_PAGE_SIZE = 5000
+
+# Clés du résultat de l'extracteur -> catégorie stockée
+CATEGORY_KEYS = CATEGORY_MAP
+
+
+class ArticleEntityCache:
+    """Extraction à la demande des seuls articles non traités, lectures en SQL"""
+
+    def __init__(self, entity_extractor, entity_db: EntityDatabaseManager):
+        self.entity_extractor = entity_extractor
+        self.entity_db = entity_db
+        self.db_manager = entity_db.db_manager
+
+    # ------------------------------------------------------------------
+    # Extraction
+    # ------------------------------------------------------------------
+
+    def content_hash(self, article: Dict[str, Any]) -> str:
+        """Empreinte du texte réellement analysé (titre + contenu tronqué)"""
+        text = self.entity_extractor.prepare_text(self.entity_extractor.article_text(article))
+        return hashlib.sha1(text.encode('utf-8')).hexdigest()
+
+    def ensure(self, articles: List[Dict[str, Any]]) -> Dict[str, int]:
+        """
+        Extrait les entités des articles absents du cache ou périmés
+        (texte modifié, autre version de modèle) ; les autres ne sont pas relus
+        """
+        articles = [article for article in articles if article.get('id')]
+        states = self.entity_db.get_extraction_states([article['id'] for article in articles])
+        stats = self._extract_stale(articles, states)
+        if stats['extracted']:
+            logger.info(f"🧠 Entités extraites pour {stats['extracted']} article(s) "
+                        f"sur {stats['checked']} (autres en cache)")
+        return stats
+
+    def backfill(self, chunk_size: int = BACKFILL_PAGE_SIZE, limit: Optional[int] = None,
+                 progress_callback: Optional[Callable[[int, int], None]] = None) -> Dict[str, int]:
+        """
+        Parcourt les articles par identifiant croissant et extrait ceux
+        qui ne sont pas à jour ; reprend sans perte après interruption
+
+        Args:
+            chunk_size: Articles lus (et passés à un même nlp.pipe()) par page
+            limit: Nombre maximal d'articles à extraire
+            progress_callback: appelé avec (dernier id traité, id maximal)
+        """
+        totals = {'checked': 0, 'extracted': 0, 'errors': 0}
+        last_id = 0
+        max_id = self.db_manager.execute_query("SELECT COALESCE(MAX(id), 0) FROM articles")[0][0]
+
+        while last_id < max_id and (limit is None or totals['extracted'] < limit):
+            rows = self.db_manager.execute_query("""
+                SELECT a.id, a.title, a.content, x.content_hash, x.model_version
+                FROM articles a
+                LEFT JOIN article_entity_extractions x ON x.article_id = a.id
+                WHERE a.id > ?
+                ORDER BY a.id
+                LIMIT ?
+            """, (last_id, chunk_size))
+            if not rows:
+                break
+            last_id = rows[-1]['id']
+
+            articles = [{'id': row['id'], 'title': row['title'] or '', 'content': row['content'] or ''}
+                        for row in rows]
+            states = {row['id']: (row['content_hash'], row['model_version'])
+                      for row in rows if row['content_hash'] is not None}
+            if limit is not None:
+                stale = self._stale(articles, states)[:limit - totals['extracted']]
+                articles = [article for article, _ in stale]
+
+            stats = self._extract_stale(articles, states)
+            for key in totals:
+                totals[key] += stats[key]
+            if progress_callback:
+                progress_callback(last_id, max_id)
+
+        logger.info(f"✅ Rattrapage des entités : {totals['extracted']} article(s) extraits, "
+                    f"{totals['errors']} erreur(s)")
+        return totals
+
+    def _stale(self, articles: List[Dict[str, Any]],
+               states: Dict[int, Tuple[str, str]]) -> List[Tuple[Dict[str, Any], str]]:
+        model_version = self.entity_extractor.model_version
+        stale = []
+        for article in articles:
+            content_hash = self.content_hash(article)
+            if states.get(article['id']) != (content_hash, model_version):
+                stale.append((article, content_hash))
+        return stale
+
+    def _extract_stale(self, articles: List[Dict[str, Any]],
+                       states: Dict[int, Tuple[str, str]]) -> Dict[str, int]:
+        stats = {'checked': len(articles), 'extracted': 0, 'errors': 0}
+        stale = self._stale(articles, states)
+        model_version = self.entity_extractor.model_version
+
+        # Un seul nlp.pipe() pour tous les articles périmés, enregistrés par tranches
+        results = self.entity_extractor.iter_entities_batch(
+            [self.entity_extractor.article_text(article) for article, _ in stale]
+        )
+        for i in range(0, len(stale), EXTRACT_CHUNK_SIZE):
+            chunk = stale[i:i + EXTRACT_CHUNK_SIZE]
+            batch = list(itertools.islice(results, len(chunk)))
+            stored = [
+                (article['id'], {category: entities.get(category, []) for category in CATEGORY_KEYS},
+                 content_hash, model_version)
+                for (article, content_hash), entities in zip(chunk, batch)
+            ]
+            # Une transaction par lot, annulée en entier en cas d'erreur
+            if self.entity_db.store_entities_batch(stored):
+                stats['extracted'] += len(stored)
+            else:
+                stats['errors'] += len(stored)
+        return stats
+
+    # ------------------------------------------------------------------
+    # Lecture
+    # ------------------------------------------------------------------
+
+    def window_entities(self, article_ids: List[int]) -> List[Dict[str, Any]]:
+        """Entités distinctes (texte, label, catégorie) citées par ces articles"""
+        rows = self.db_manager.execute_query(f"""
+            SELECT DISTINCT e.entity_text, e.entity_type, e.category
+            FROM article_entities ae
+            JOIN geopolitical_entities e ON e.id = ae.entity_id
+            WHERE ae.article_id IN {_IDS}
+        """, (json.dumps(article_ids),))
+        return [{'text': row[0], 'label': row[1], 'category': row[2]} for row in rows]
@@ -0,0 +1,283 @@
+# Flask/article_export.py
+"""
+Export en flux des articles : CSV, NDJSON, Parquet ou Arrow, gzip optionnel
+Les lignes sont lues par fetchmany et émises au fil de l'eau : mémoire constante
+"""
+
+import csv
+import io
+import json
+import logging
+import zlib
+from typing import Any, Dict, Iterator, List, Sequence
+
+from .database import DatabaseManager
+
+logger = logging.getLogger(__name__)
+
+HAVE_PYARROW = False
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    HAVE_PYARROW = True
+except ImportError:
+    logger.info("pyarrow non disponible - export Parquet/Arrow désactivé")
+
+# Lignes lues par fetchmany (CSV/NDJSON)
+FETCH_SIZE = 1000
+
+# Lignes par row group Parquet / batch Arrow
+COLUMNAR_BATCH_ROWS = 5000
+
+# Seuil de confiance des thèmes exportés (comme les statistiques)
+THEME_CONFIDENCE_THRESHOLD = 0.3
+
+EXPORT_FORMATS = {
+    'csv': ('text/csv', 'csv'),
+    'ndjson': ('application/x-ndjson', 'ndjson'),
+    'parquet': ('application/vnd.apache.parquet', 'parquet'),
+    'arrow': ('application/vnd.apache.arrow.stream', 'arrows'),
+}
+
+# (colonne, en-tête CSV)
+EXPORT_COLUMNS = [
+    ('id', 'ID'),
+    ('title', 'Titre'),
+    ('content', 'Contenu'),
+    ('link', 'Lien'),
+    ('pub_date', 'Date'),
+    ('sentiment', 'Sentiment'),
+    ('sentiment_score', 'Score'),
+    ('feed_url', 'Source'),
+    ('detailed_sentiment', 'Sentiment Détaillé'),
+    ('roberta_score', 'Score RoBERTa'),
+    ('theme_scores', 'Thèmes'),
+    ('corroboration_count', 'Corroborations'),
+]
+
+
+def _arrow_schema():
+    return pa.schema([
+        ('id', pa.int64()),
+        ('title', pa.string()),
+        ('content', pa.string()),
+        ('link', pa.string()),
+        ('pub_date', pa.string()),
+        ('sentiment', pa.string()),
+        ('sentiment_score', pa.float64()),
+        ('feed_url', pa.string()),
+        ('detailed_sentiment', pa.string()),
+        ('roberta_score', pa.float64()),
+        ('theme_scores', pa.map_(pa.string(), pa.float64())),
+        ('corroboration_count', pa.int64()),
+    ])
+
+
+class _StreamSink(io.RawIOBase):
+    """Fichier en écriture seule dont on vide le contenu après chaque lot"""
+
+    def __init__(self):
+        super().__init__()
+        self._chunks: List[bytes] = []
+        self._position = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        data = bytes(data)
+        self._chunks.append(data)
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def drain(self) -> bytes:
+        data = b''.join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+class ArticleExporter:
+    """Requête d'export (thèmes et corroborations inclus) et encodeurs en flux"""
+
+    def __init__(self, db_manager: DatabaseManager):
+        self.db_manager = db_manager
+
+    @staticmethod
+    def available_formats() -> List[str]:
+        if HAVE_PYARROW:
+            return list(EXPORT_FORMATS)
+        return ['csv', 'ndjson']
+
+    def _has_corroborations(self, conn) -> bool:
+        return conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'article_corroborations'"
+        ).fetchone() is not None
+
+    def iter_rows(self, where: str = '', params: Sequence[Any] = ()) -> Iterator[Dict[str, Any]]:
+        """
+        Articles filtrés, plus récents d'abord, par lots de FETCH_SIZE
+
+        `where` porte sur la table articles aliasée `a`. Les scores de thème
+        (confiance ≥ 0.3) et le nombre de corroborations sont calculés par
+        sous-requêtes indexées sur article_id, ligne par ligne : SQLite n'a
+        rien à matérialiser avant la première ligne.
+        """
+        conn = self.db_manager.get_connection()
+        try:
+            corroborations = (
+                "(SELECT COUNT(*) FROM article_corroborations c WHERE c.article_id = a.id)"
+                if self._has_corroborations(conn) else "0"
+            )
+            cursor = conn.execute(f"""
+                SELECT a.id, a.title, a.content, a.link, a.pub_date,
+                       a.sentiment_type, a.sentiment_score, a.feed_url,
+                       a.detailed_sentiment, a.roberta_score,
+                       (SELECT json_group_object(theme_id, confidence) FROM (
+                            SELECT ta.theme_id, ROUND(MAX(ta.confidence), 4) AS confidence
+                            FROM theme_analyses ta
+                            WHERE ta.article_id = a.id AND ta.theme_id IS NOT NULL
+                              AND ta.confidence >= {THEME_CONFIDENCE_THRESHOLD}
+                            GROUP BY ta.theme_id
+                       )) AS theme_scores,
+                       {corroborations} AS corroboration_count
+                FROM articles a
+                {'WHERE ' + where if where else ''}
+                ORDER BY a.pub_date DESC, a.id DESC
+            """, tuple(params))
+            names = [name for name, _ in EXPORT_COLUMNS]
+            while True:
+                rows = cursor.fetchmany(FETCH_SIZE)
+                if not rows:
+                    break
+                for row in rows:
+                    article = dict(zip(names, row))
+                    article['theme_scores'] = json.loads(article['theme_scores'] or '{}')
+                    yield article
+        finally:
+            conn.close()
+
+    # ------------------------------------------------------------------
+    # Encodeurs
+    # ------------------------------------------------------------------
+
+    def stream(self, fmt: str, where: str = '', params: Sequence[Any] = (),
+               compress: bool = False) -> Iterator[bytes]:
+        """
+        Octets du fichier d'export, produits au fil de la lecture
+
+        Raises:
+            ValueError: format inconnu ou non disponible (vérifié avant
+                le début du flux, donc avant l'envoi des en-têtes)
+        """
+        if fmt not in self.available_formats():
+            raise ValueError(f"Format d'export non disponible: {fmt} "
+                             f"(disponibles: {', '.join(self.available_formats())})")
+        return self._stream(fmt, where, params, compress)
+
+    def _stream(self, fmt: str, where: str, params: Sequence[Any], compress: bool) -> Iterator[bytes]:
+        encoders = {
+            'csv': self._encode_csv,
+            'ndjson': self._encode_ndjson,
+            'parquet': self._encode_parquet,
+            'arrow': self._encode_arrow,
+        }
+        chunks = encoders[fmt](self.iter_rows(where, params))
+        if compress:
+            chunks = self._gzip(chunks)
+
+        exported = 0
+        for chunk in chunks:
+            if chunk:
+                exported += len(chunk)
+                yield chunk
+        logger.info(f"📤 Export {fmt}{' gzip' if compress else ''} terminé : {exported} octets")
+
+    @staticmethod
+    def _encode_csv(articles: Iterator[Dict[str, Any]]) -> Iterator[bytes]:
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow([header for _, header in EXPORT_COLUMNS])
+        count = 0
+        for article in articles:
+            values = dict(article)
+            values['theme_scores'] = json.dumps(values['theme_scores'], ensure_ascii=False)
+            writer.writerow([values[name] for name, _ in EXPORT_COLUMNS])
+            count += 1
+            if count % FETCH_SIZE == 0:
+                yield buffer.getvalue().encode('utf-8')
+                buffer.seek(0)
+                buffer.truncate()
+        yield buffer.getvalue().encode('utf-8')
+
+    @staticmethod
+    def _encode_ndjson(articles: Iterator[Dict[str, Any]]) -> Iterator[bytes]:
+        lines = []
+        for article in articles:
+            lines.append(json.dumps(article, ensure_ascii=False))
+            if len(lines) >= FETCH_SIZE:
+                yield ('\n'.join(lines) + '\n').encode('utf-8')
+                lines = []
+        if lines:
+            yield ('\n'.join(lines) + '\n').encode('utf-8')
+
+    @staticmethod
+    def _record_batches(articles: Iterator[Dict[str, Any]]) -> Iterator['pa.RecordBatch']:
+        schema = _arrow_schema()
+        names = schema.names
+        batch: List[Dict[str, Any]] = []
+        for article in articles:
+            batch.append(article)
+            if len(batch) >= COLUMNAR_BATCH_ROWS:
+                yield ArticleExporter._to_record_batch(batch, schema, names)
+                batch = []
+        if batch:
+            yield ArticleExporter._to_record_batch(batch, schema, names)
+
+    @staticmethod
+    def _to_record_batch(batch: List[Dict[str, Any]], schema, names) -> 'pa.RecordBatch':
+        columns = {name: [article[name] for article in batch] for name in names}
+        columns['theme_scores'] = [list(scores.items()) for scores in columns['theme_scores']]
+        columns['pub_date'] = [None if value is None else str(value) for value in columns['pub_date']]
+        return pa.RecordBatch.from_pydict(columns, schema=schema)
+
+    def _encode_parquet(self, articles: Iterator[Dict[str, Any]]) -> Iterator[bytes]:
+        sink = _StreamSink()
+        writer = pq.ParquetWriter(sink, _arrow_schema(), compression='zstd')
+        try:
+            # Un row group par lot : le pied de page (métadonnées) est écrit à la fin
+            for batch in self._record_batches(articles):
+                writer.write_batch(batch)
+                yield sink.drain()
+        finally:
+            writer.close()
+        yield sink.drain()
+
+    def _encode_arrow(self, articles: Iterator[Dict[str, Any]]) -> Iterator[bytes]:
+        sink = _StreamSink()
+        writer = pa.ipc.new_stream(sink, _arrow_schema())
+        try:
+            for batch in self._record_batches(articles):
+                writer.write_batch(batch)
+                yield sink.drain()
+        finally:
+            writer.close()
+        yield sink.drain()
+
+    @staticmethod
+    def _gzip(chunks: Iterator[bytes]) -> Iterator[bytes]:
+        compressor = zlib.compressobj(6, zlib.DEFLATED, 31)  # 31 : en-tête gzip
+        for chunk in chunks:
+            yield compressor.compress(chunk)
+        yield compressor.flush()
+
+
+def export_filename(fmt: str, compress: bool = False) -> str:
+    extension = EXPORT_FORMATS[fmt][1]
+    return f"articles_export.{extension}{'.gz' if compress else ''}"
+
+
+def export_mimetype(fmt: str, compress: bool = False) -> str:
+    return 'application/gzip' if compress else EXPORT_FORMATS[fmt][0]
@@ -0,0 +1,142 @@
+# Flask/article_listing.py
+"""
+Listes d'articles : pagination par curseur (pub_date, id), extraits
+précalculés et sélection des champs renvoyés (fields=)
+"""
+
+import base64
+import json
+from typing import Any, Dict, List, Optional, Tuple
+
+# Longueur de l'extrait stocké dans articles.excerpt
+EXCERPT_LENGTH = 200
+
+
+def excerpt_sql(column: str = 'content') -> str:
+    """Même règle que make_excerpt(), en SQL (remplissage, articles non migrés)"""
+    return (f"CASE WHEN length({column}) > {EXCERPT_LENGTH} "
+            f"THEN substr({column}, 1, {EXCERPT_LENGTH}) || '...' ELSE {column} END")
+
+
+# Champ exposé -> expression SQL (table articles aliasée `a`)
+ARTICLE_FIELDS = {
+    'id': 'a.id',
+    'title': 'a.title',
+    'excerpt': 'a.excerpt',
+    'content': 'a.content',
+    'link': 'a.link',
+    'pub_date': 'a.pub_date',
+    'sentiment': 'a.sentiment_type',
+    'sentiment_score': 'a.sentiment_score',
+    'feed_url': 'a.feed_url',
+    'detailed_sentiment': 'a.detailed_sentiment',
+    'roberta_score': 'a.roberta_score',
+}
+
+DEFAULT_FIELDS = ['id', 'title', 'content', 'link', 'pub_date', 'sentiment',
+                  'sentiment_score', 'feed_url', 'detailed_sentiment', 'roberta_score']
+
+# Colonnes toujours lues : clé du curseur
+_CURSOR_FIELDS = ['id', 'pub_date']
+
+
+def make_excerpt(content: Optional[str]) -> Optional[str]:
+    """Extrait affiché dans les listes (calculé une fois, à l'ingestion)"""
+    if content and len(content) > EXCERPT_LENGTH:
+        return content[:EXCERPT_LENGTH] + '...'
+    return content
+
+
+def parse_fields(raw: Optional[str], default: List[str] = DEFAULT_FIELDS) -> List[str]:
+    """
+    Champs demandés via `fields=id,title,...`
+
+    Raises:
+        ValueError: si un champ est inconnu
+    """
+    if not raw:
+        return list(default)
+    fields = [f.strip() for f in raw.split(',') if f.strip()]
+    unknown = [f for f in fields if f not in ARTICLE_FIELDS]
+    if unknown:
+        raise ValueError(f"Champs inconnus: {', '.join(unknown)} "
+                         f"(disponibles: {', '.join(ARTICLE_FIELDS)})")
+    return fields
+
+
+def select_columns(fields: List[str], content_as_excerpt: bool = False) -> Tuple[str, List[str]]:
+    """
+    Liste SELECT pour les champs demandés (+ clé du curseur)
+
+    Args:
+        content_as_excerpt: 'content' renvoie l'extrait (réponse historique
+            de /api/articles, qui tronquait le contenu)
+
+    Returns:
+        (expression SELECT, noms des colonnes dans l'ordre)
+    """
+    excerpt = f"COALESCE(a.excerpt, {excerpt_sql('a.content')})"
+    names = list(dict.fromkeys(fields + _CURSOR_FIELDS))
+    expressions = []
+    for name in names:
+        if name == 'excerpt' or (name == 'content' and content_as_excerpt):
+            expressions.append(excerpt)
+        else:
+            expressions.append(ARTICLE_FIELDS[name])
+    return ', '.join(expressions), names
+
+
+def encode_cursor(pub_date: Any, article_id: int) -> str:
+    """Curseur opaque désignant la position après (pub_date, id)"""
+    raw = json.dumps([pub_date, article_id]).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor: str) -> Tuple[Optional[str], int]:
+    """
+    Raises:
+        ValueError: si le curseur est invalide
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        pub_date, article_id = json.loads(raw)
+        return pub_date, int(article_id)
+    except (ValueError, TypeError) as e:
+        raise ValueError(f"Curseur invalide: {cursor}") from e
+
+
+def cursor_condition(cursor: str) -> Tuple[str, list]:
+    """
+    Condition "après le curseur" pour un tri pub_date DESC, id DESC
+
+    Recherche dans l'index idx_articles_date (pub_date, rowid) à partir de
+    la position : le coût ne dépend pas de la profondeur de page, contrairement
+    à OFFSET. L'ingestion et la migration 05 garantissent une pub_date non
+    NULL ; un curseur sur une date NULL ne parcourt que les dates NULL.
+    """
+    pub_date, article_id = decode_cursor(cursor)
+    if pub_date is None:
+        return "(a.pub_date IS NULL AND a.id < ?)", [article_id]
+    return "(a.pub_date, a.id) < (?, ?)", [pub_date, article_id]
+
+
+def build_page(rows: List[Any], names: List[str], fields: List[str],
+               limit: int) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    """
+    Construit la page à partir de `limit + 1` lignes lues
+
+    Returns:
+        (articles limités aux champs demandés, curseur suivant ou None)
+    """
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    articles = []
+    for row in rows:
+        values = dict(zip(names, row))
+        articles.append({field: values[field] for field in fields})
+
+    next_cursor = None
+    if has_more and rows:
+        last = dict(zip(names, rows[-1]))
+        next_cursor = encode_cursor(last['pub_date'], last['id'])
+    return articles, next_cursor
@@ -0,0 +1,175 @@
+# Flask/article_search.py
+"""
+Index plein texte FTS5 des articles (titre + contenu)
+Synchronisé par triggers, classement bm25, extraits surlignés, requêtes par préfixe
+"""
+
+import html
+import logging
+import re
+from typing import Dict, Optional, Tuple
+
+from .database import DatabaseManager
+
+logger = logging.getLogger(__name__)
+
+BACKFILL_CHUNK_SIZE = 2000
+
+# Poids bm25 des colonnes (titre, contenu)
+TITLE_WEIGHT = 5.0
+CONTENT_WEIGHT = 1.0
+
+# Délimiteurs internes de snippet(), remplacés après échappement HTML
+_MARK_START = '\x02'
+_MARK_END = '\x03'
+
+_TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+# Table FTS5 autonome (pas external content) : la suppression par rowid
+# reste sûre même pour un article pas encore indexé pendant le remplissage
+_SCHEMA = [
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS articles_fts USING fts5(
+        title, content,
+        tokenize = 'unicode61 remove_diacritics 2',
+        prefix = '2 3'
+    )
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS trg_articles_fts_insert
+    AFTER INSERT ON articles
+    BEGIN
+        INSERT INTO articles_fts (rowid, title, content)
+        VALUES (NEW.id, COALESCE(NEW.title, ''), COALESCE(NEW.content, ''));
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS trg_articles_fts_delete
+    AFTER DELETE ON articles
+    BEGIN
+        DELETE FROM articles_fts WHERE rowid = OLD.id;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS trg_articles_fts_update
+    AFTER UPDATE OF title, content ON articles
+    BEGIN
+        DELETE FROM articles_fts WHERE rowid = OLD.id;
+        INSERT INTO articles_fts (rowid, title, content)
+        VALUES (NEW.id, COALESCE(NEW.title, ''), COALESCE(NEW.content, ''));
+    END
+    """,
+]
+
+
+def build_match_query(search: str) -> Optional[str]:
+    """
+    Convertit la saisie utilisateur en requête FTS5 sûre
+
+    Chaque mot devient un préfixe entre guillemets ("ukr"* trouve
+    "Ukraine") et tous doivent être présents. Retourne None si la saisie
+    ne contient aucun mot.
+    """
+    tokens = _TOKEN_RE.findall(search or '')
+    if not tokens:
+        return None
+    return ' '.join(f'"{token}"*' for token in tokens)
+
+
+def highlight_snippet(snippet: Optional[str]) -> Optional[str]:
+    """Échappe l'extrait en HTML puis matérialise le surlignage en <mark>"""
+    if snippet is None:
+        return None
+    return (html.escape(snippet)
+            .replace(_MARK_START, '<mark>')
+            .replace(_MARK_END, '</mark>'))
+
+
+class ArticleSearchIndex:
+    """Création, remplissage et interrogation de l'index articles_fts"""
+
+    def __init__(self, db_manager: DatabaseManager):
+        self.db_manager = db_manager
+        self._available = None
+
+    def is_available(self) -> bool:
+        """L'index existe-t-il (migration appliquée) ?"""
+        if self._available is None:
+            rows = self.db_manager.execute_query(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'articles_fts'"
+            )
+            self._available = bool(rows)
+        return self._available
+
+    def create(self):
+        """Crée la table FTS5 et ses triggers de synchronisation"""
+        with self.db_manager.connection() as conn:
+            for sql in _SCHEMA:
+                conn.execute(sql)
+        self._available = True
+
+    def backfill(self, chunk_size: int = BACKFILL_CHUNK_SIZE) -> int:
+        """
+        Indexe les articles existants par tranches d'identifiants
+
+        Une transaction par tranche : l'ingestion n'est jamais bloquée
+        longtemps. Les articles déjà indexés (triggers, exécution
+        interrompue) sont ignorés, le remplissage peut donc reprendre.
+        """
+        indexed = 0
+        last_id = 0
+        max_id = self.db_manager.execute_query("SELECT COALESCE(MAX(id), 0) FROM articles")[0][0]
+
+        while last_id < max_id:
+            with self.db_manager.connection() as conn:
+                upper = conn.execute("""
+                    SELECT MAX(id) FROM (
+                        SELECT id FROM articles WHERE id > ? ORDER BY id LIMIT ?
+                    )
+                """, (last_id, chunk_size)).fetchone()[0]
+                if upper is None:
+                    break
+                cursor = conn.execute("""
+                    INSERT INTO articles_fts (rowid, title, content)
+                    SELECT id, COALESCE(title, ''), COALESCE(content, '')
+                    FROM articles
+                    WHERE id > ? AND id <= ?
+                      AND id NOT IN (SELECT rowid FROM articles_fts WHERE rowid > ? AND rowid <= ?)
+                """, (last_id, upper, last_id, upper))
+                indexed += cursor.rowcount
+            last_id = upper
+            logger.info(f"  🔎 Index plein texte : {indexed} articles indexés (id ≤ {last_id}/{max_id})")
+
+        return indexed
+
+    def optimize(self):
+        """Fusionne les segments de l'index (après un gros remplissage)"""
+        with self.db_manager.connection() as conn:
+            conn.execute("INSERT INTO articles_fts (articles_fts) VALUES ('optimize')")
+
+    def search_clause(self, search: str, alias: str = 'a') -> Optional[Dict[str, str]]:
+        """
+        Fragments SQL pour filtrer et classer `alias` (table articles)
+
+        Returns:
+            {'join', 'condition', 'param', 'columns', 'order'}, ou None si
+            la saisie est vide ou l'index absent (recherche LIKE alors)
+        """
+        match = build_match_query(search)
+        if match is None or not self.is_available():
+            return None
+        return {
+            'join': f"JOIN articles_fts ON articles_fts.rowid = {alias}.id",
+            'condition': "articles_fts MATCH ?",
+            'param': match,
+            'columns': (f"snippet(articles_fts, -1, '{_MARK_START}', '{_MARK_END}', '…', 24) AS snippet, "
+                        f"bm25(articles_fts, {TITLE_WEIGHT}, {CONTENT_WEIGHT}) AS rank"),
+            'order': "rank"
+        }
+
+    def filter_condition(self, search: str, alias: str = 'a') -> Optional[Tuple[str, str]]:
+        """Condition seule (sans classement) : `alias`.id IN (résultats FTS)"""
+        match = build_match_query(search)
+        if match is None or not self.is_available():
+            return None
+        return f"{alias}.id IN (SELECT rowid FROM articles_fts WHERE articles_fts MATCH ?)", match
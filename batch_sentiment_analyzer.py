@@ -1,18 +1,69 @@
 import logging
-from typing import Dict, List, Any, Tuple
+from typing import Dict, List, Any, Callable, Optional, Tuple
 from datetime import datetime, timedelta
 import statistics
 from collections import defaultdict
 
+import numpy as np
+
+from .database import to_epoch
+
 logger = logging.getLogger(__name__)
 
 
+class _UnionFind:
+    """Union-find (compression de chemin, union par taille) sur des identifiants"""
+    
+    def __init__(self):
+        self.parent: Dict[Any, Any] = {}
+        self.size: Dict[Any, int] = {}
+    
+    def add(self, item):
+        if item not in self.parent:
+            self.parent[item] = item
+            self.size[item] = 1
+    
+    def find(self, item):
+        self.add(item)
+        root = item
+        while self.parent[root] != root:
+            root = self.parent[root]
+        while self.parent[item] != root:
+            self.parent[item], item = root, self.parent[item]
+        return root
+    
+    def union(self, a, b):
+        root_a, root_b = self.find(a), self.find(b)
+        if root_a == root_b:
+            return
+        if self.size[root_a] < self.size[root_b]:
+            root_a, root_b = root_b, root_a
+        self.parent[root_b] = root_a
+        self.size[root_a] += self.size[root_b]
+    
+    def groups(self) -> List[List[Any]]:
+        """Composantes dans l'ordre d'insertion de leur premier élément"""
+        groups: Dict[Any, List[Any]] = {}
+        for item in self.parent:
+            groups.setdefault(self.find(item), []).append(item)
+        return list(groups.values())
+
+
 class BatchSentimentAnalyzer:
     """
     Analyseur de sentiment par lots avec cohérence via corroboration
     Principe : Les articles similaires doivent avoir des sentiments cohérents
     """
     
+    # Étapes de analyze_batch_with_coherence (suivi de progression)
+    STAGES = [
+        "Analyse initiale",
+        "Identification des clusters",
+        "Harmonisation des clusters",
+        "Analyse bayésienne",
+        "Sauvegarde"
+    ]
+    
     def __init__(self, sentiment_analyzer, corroboration_engine, bayesian_analyzer):
         self.sentiment_analyzer = sentiment_analyzer
         self.corroboration_engine = corroboration_engine
@@ -21,10 +72,12 @@ class BatchSentimentAnalyzer:
         # Configuration
         self.similarity_threshold = 0.70  # Seuil pour considérer articles comme similaires
         self.min_cluster_size = 2  # Minimum d'articles pour former un cluster
+        self.max_neighbours = 20  # Arêtes conservées par article dans le graphe de similarité
         self.max_deviation = 0.3  # Déviation max acceptable dans un cluster
         
     def analyze_batch_with_coherence(self, articles: List[Dict], 
-                                     db_manager) -> Dict[str, Any]:
+                                     db_manager,
+                                     progress_callback: Optional[Callable[[int, str], None]] = None) -> Dict[str, Any]:
         """
         Analyse un lot d'articles avec garantie de cohérence
         
@@ -34,7 +87,15 @@ class BatchSentimentAnalyzer:
         3. Harmonisation des sentiments dans chaque cluster
         4. Application de l'analyse bayésienne
         5. Sauvegarde avec métriques de cohérence
+        
+        progress_callback(numéro, nom) est appelé au début de chaque étape
+        (voir STAGES) ; il peut lever une exception pour interrompre l'analyse.
         """
+        def stage(index: int, icon: str):
+            logger.info(f"{icon} Étape {index}/{len(self.STAGES)} : {self.STAGES[index - 1]}...")
+            if progress_callback is not None:
+                progress_callback(index, self.STAGES[index - 1])
+        
         logger.info(f"🔄 Démarrage analyse batch de {len(articles)} articles")
         
         results = {
@@ -48,28 +109,28 @@ class BatchSentimentAnalyzer:
         }
         
         # ÉTAPE 1 : Analyse initiale de tous les articles
-        logger.info("📊 Étape 1/5 : Analyse initiale...")
+        stage(1, "📊")
         analyzed_articles = self._initial_analysis(articles)
         results['analyzed'] = len(analyzed_articles)
         
         # ÉTAPE 2 : Identification des clusters
-        logger.info("🔍 Étape 2/5 : Identification des clusters...")
+        stage(2, "🔍")
         clusters = self._identify_clusters(analyzed_articles)
         results['clusters_found'] = len(clusters)
         
         # ÉTAPE 3 : Harmonisation par cluster
-        logger.info("⚖️ Étape 3/5 : Harmonisation des clusters...")
+        stage(3, "⚖️")
         harmonization_stats = self._harmonize_clusters(clusters, analyzed_articles)
         results['harmonized'] = harmonization_stats['harmonized']
         results['sentiment_changes'] = harmonization_stats['changes']
         
         # ÉTAPE 4 : Application bayésienne
-        logger.info("🧮 Étape 4/5 : Analyse bayésienne...")
+        stage(4, "🧮")
         bayesian_stats = self._apply_bayesian_refinement(analyzed_articles, db_manager)
         results['confidence_improved'] = bayesian_stats['improved']
         
         # ÉTAPE 5 : Sauvegarde
-        logger.info("💾 Étape 5/5 : Sauvegarde...")
+        stage(5, "💾")
         save_stats = self._save_batch_results(analyzed_articles, db_manager)
         
         logger.info(f"✅ Analyse batch terminée : {results['analyzed']} articles, "
@@ -84,13 +145,24 @@ class BatchSentimentAnalyzer:
         """
         analyzed = []
         
-        for article in articles:
+        # Inférence par lots (titres + contenus) quand l'analyseur le permet
+        batch_results = None
+        if hasattr(self.sentiment_analyzer, 'analyze_articles_batch'):
+            try:
+                batch_results = self.sentiment_analyzer.analyze_articles_batch(articles)
+            except Exception as e:
+                logger.error(f"Erreur analyse par lot, repli unitaire: {e}")
+        
+        for index, article in enumerate(articles):
             try:
                 # Analyse de sentiment
-                sentiment_result = self.sentiment_analyzer.analyze_article(
-                    article.get('title', ''),
-                    article.get('content', '')
-                )
+                if batch_results is not None:
+                    sentiment_result = batch_results[index]
+                else:
+                    sentiment_result = self.sentiment_analyzer.analyze_article(
+                        article.get('title', ''),
+                        article.get('content', '')
+                    )
                 
                 # Enrichir l'article avec les résultats
                 article['sentiment_analysis'] = {
@@ -114,33 +186,33 @@ class BatchSentimentAnalyzer:
     def _identify_clusters(self, articles: List[Dict]) -> List[List[int]]:
         """
         Identifie les clusters d'articles similaires
-        Utilise le moteur de corroboration
-        """
-        clusters = []
-        processed = set()
         
-        for i, article in enumerate(articles):
+        Un graphe creux est construit en une passe vectorisée (les
+        max_neighbours plus proches voisins de chaque article au-dessus du
+        seuil), puis les clusters sont ses composantes connexes (union-find).
+        Le résultat ne dépend pas de l'ordre des articles.
+        """
+        all_similar = self.corroboration_engine.find_corroborations_batch(
+            articles,
+            articles,
+            threshold=self.similarity_threshold,
+            top_n=self.max_neighbours
+        )
+        
+        components = _UnionFind()
+        for article, similar in zip(articles, all_similar):
             article_id = article.get('id')
-            
-            if article_id in processed:
-                continue
-            
-            # Trouver les articles similaires
-            similar = self.corroboration_engine.find_corroborations(
-                article,
-                articles,
-                threshold=self.similarity_threshold,
-                top_n=20
-            )
-            
-            if len(similar) >= self.min_cluster_size - 1:  # -1 car on ne compte pas l'article lui-même
-                # Créer un cluster
-                cluster_ids = [article_id] + [s['id'] for s in similar]
-                clusters.append(cluster_ids)
-                processed.update(cluster_ids)
-                
-                logger.debug(f"📦 Cluster trouvé : {len(cluster_ids)} articles similaires "
-                           f"(article principal: {article_id})")
+            components.add(article_id)
+            for neighbour in similar:
+                components.union(article_id, neighbour['id'])
+        
+        clusters = [
+            cluster_ids for cluster_ids in components.groups()
+            if len(cluster_ids) >= self.min_cluster_size
+        ]
+        
+        for cluster_ids in clusters:
+            logger.debug(f"📦 Cluster trouvé : {len(cluster_ids)} articles similaires")
         
         logger.info(f"🔍 {len(clusters)} clusters identifiés sur {len(articles)} articles")
         return clusters
@@ -150,6 +222,137 @@ class BatchSentimentAnalyzer:
         """
         Harmonise les sentiments au sein de chaque cluster
         Stratégie : utiliser la médiane pondérée par la confiance
+        
+        Version vectorisée : scores, confiances et étiquettes de cluster sont
+        rangés dans des tableaux NumPy, médianes pondérées et écarts-types
+        sont calculés par groupe, puis les articles sont mis à jour en une
+        passe. Mêmes résultats que _harmonize_clusters_iterative (mélange
+        60/40 identique au bit près).
+        """
+        stats = {'harmonized': 0, 'changes': 0}
+        
+        article_index = {a.get('id'): a for a in articles}
+        
+        members, labels = [], []
+        label = 0
+        for cluster_ids in clusters:
+            cluster_articles = [article_index[aid] for aid in cluster_ids if aid in article_index]
+            if len(cluster_articles) < self.min_cluster_size:
+                continue
+            members.extend(cluster_articles)
+            labels.extend([label] * len(cluster_articles))
+            label += 1
+        
+        if not members:
+            return stats
+        
+        # Un article présent dans plusieurs clusters serait mis à jour
+        # successivement : seul le parcours itératif reproduit ce cas
+        if len({id(a) for a in members}) != len(members):
+            return self._harmonize_clusters_iterative(clusters, articles)
+        
+        labels = np.asarray(labels)
+        scores = np.array([a['sentiment_analysis']['score'] for a in members], dtype=float)
+        confidences = np.array([a['sentiment_analysis']['confidence'] for a in members], dtype=float)
+        
+        consensus_scores, consensus_confidences = self._cluster_consensus_arrays(
+            labels, scores, confidences
+        )
+        deviations = self._cluster_deviation_arrays(labels, scores)
+        
+        to_harmonize = deviations[labels] > self.max_deviation
+        if not to_harmonize.any():
+            return stats
+        
+        # 60% consensus, 40% analyse originale (pour préserver les nuances)
+        harmonized_scores = (consensus_scores[labels] * 0.6) + (scores * 0.4)
+        new_types = self._categorize_harmonized_sentiment_batch(
+            harmonized_scores, consensus_confidences[labels]
+        )
+        cluster_sizes = np.bincount(labels)
+        
+        for i in np.flatnonzero(to_harmonize):
+            article = members[i]
+            analysis = article['sentiment_analysis']
+            old_type = analysis['type']
+            
+            analysis['score'] = float(harmonized_scores[i])
+            analysis['type'] = new_types[i]
+            analysis['harmonized'] = True
+            analysis['cluster_size'] = int(cluster_sizes[labels[i]])
+            analysis['original_score'] = float(scores[i])
+            analysis['deviation_reduced'] = float(deviations[labels[i]])
+            
+            stats['harmonized'] += 1
+            if new_types[i] != old_type:
+                stats['changes'] += 1
+        
+        return stats
+    
+    @staticmethod
+    def _cluster_consensus_arrays(labels: np.ndarray, scores: np.ndarray,
+                                  confidences: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Équivalent groupé de _calculate_cluster_consensus : médiane des scores
+        répétés max(1, int(confiance * 10)) fois, et confiance déduite de la
+        variance de cet échantillon pondéré
+        """
+        weights = np.maximum(1, (confidences * 10).astype(np.int64))
+        
+        order = np.lexsort((scores, labels))
+        sorted_scores, sorted_weights = scores[order], weights[order]
+        starts = np.flatnonzero(np.r_[True, labels[order][1:] != labels[order][:-1]])
+        
+        cumulative = np.cumsum(sorted_weights)
+        totals = np.add.reduceat(sorted_weights, starts)
+        offsets = cumulative[starts] - sorted_weights[starts]
+        
+        # Éléments du milieu de l'échantillon étendu (sans le matérialiser)
+        low = sorted_scores[np.searchsorted(cumulative, offsets + (totals - 1) // 2, side='right')]
+        high = sorted_scores[np.searchsorted(cumulative, offsets + totals // 2, side='right')]
+        medians = np.where(totals % 2 == 1, low, (low + high) / 2)
+        
+        weighted_means = np.bincount(labels, weights=weights * scores) / totals
+        squared = np.bincount(labels, weights=weights * (scores - weighted_means[labels]) ** 2)
+        variances = np.divide(squared, totals - 1, out=np.zeros_like(squared), where=totals > 1)
+        confidences_out = np.minimum(0.95, np.maximum(0.5, 1.0 - (variances * 2)))
+        
+        return medians, confidences_out
+    
+    @staticmethod
+    def _cluster_deviation_arrays(labels: np.ndarray, scores: np.ndarray) -> np.ndarray:
+        """Écart-type (échantillon) des scores de chaque cluster"""
+        counts = np.bincount(labels)
+        means = np.bincount(labels, weights=scores) / counts
+        squared = np.bincount(labels, weights=(scores - means[labels]) ** 2)
+        variances = np.divide(squared, counts - 1, out=np.zeros_like(squared), where=counts > 1)
+        return np.sqrt(variances)
+    
+    def _categorize_harmonized_sentiment_batch(self, scores: np.ndarray,
+                                               confidences: np.ndarray) -> List[str]:
+        """Version vectorisée de _categorize_harmonized_sentiment"""
+        categories = np.select(
+            [
+                confidences < 0.4,
+                scores >= 0.25,
+                scores >= 0.08,
+                scores >= -0.08
+            ],
+            [
+                np.where(scores >= 0, 'neutral_positive', 'neutral_negative'),
+                'positive',
+                'neutral_positive',
+                'neutral_negative'
+            ],
+            default='negative'
+        )
+        return categories.tolist()
+    
+    def _harmonize_clusters_iterative(self, clusters: List[List[int]],
+                                      articles: List[Dict]) -> Dict[str, int]:
+        """
+        Harmonisation cluster par cluster (référence de la version vectorisée,
+        utilisée quand des clusters se chevauchent)
         """
         stats = {'harmonized': 0, 'changes': 0}
         
@@ -267,148 +470,124 @@ class BatchSentimentAnalyzer:
         """
         stats = {'improved': 0, 'errors': 0}
         
-        for article in articles:
-            try:
-                # Récupérer les corroborations depuis la DB
-                corroboration_data = self._get_corroboration_from_db(
-                    article.get('id'),
-                    db_manager
-                )
-                
-                # Préparer les données pour l'analyse bayésienne
-                article_data = {
-                    'sentiment_score': article['sentiment_analysis']['score'],
-                    'sentiment_confidence': article['sentiment_analysis']['confidence'],
-                    'sentiment_type': article['sentiment_analysis']['type'],
-                    'pub_date': article.get('pub_date'),
-                    'themes': article.get('themes', [])
-                }
-                
-                # Analyse bayésienne
-                bayesian_result = self.bayesian_analyzer.analyze_article_sentiment(
-                    article_data,
-                    corroboration_data
-                )
-                
-                # Vérifier si la confiance s'est améliorée
-                old_confidence = article['sentiment_analysis']['confidence']
-                new_confidence = bayesian_result['bayesian_confidence']
-                
-                if new_confidence > old_confidence:
-                    stats['improved'] += 1
-                
-                # Enrichir l'article
-                article['sentiment_analysis']['bayesian_score'] = bayesian_result['bayesian_score']
-                article['sentiment_analysis']['bayesian_confidence'] = new_confidence
-                article['sentiment_analysis']['evidence_count'] = bayesian_result['evidence_count']
-                
-                # Utiliser le score bayésien comme score final
-                article['sentiment_analysis']['final_score'] = bayesian_result['bayesian_score']
-                article['sentiment_analysis']['final_type'] = bayesian_result['sentiment_type']
-                
-            except Exception as e:
-                logger.error(f"Erreur bayésienne article {article.get('id')}: {e}")
+        # Précharger les corroborations de tout le lot
+        corroborations_by_article = self._get_corroborations_from_db_batch(
+            [article.get('id') for article in articles],
+            db_manager
+        )
+        
+        # Préparer les données pour l'analyse bayésienne
+        articles_data = [
+            {
+                'id': article.get('id'),
+                'sentiment_score': article['sentiment_analysis']['score'],
+                'sentiment_confidence': article['sentiment_analysis']['confidence'],
+                'sentiment_type': article['sentiment_analysis']['type'],
+                'pub_date': article.get('pub_date'),
+                'themes': article.get('themes', [])
+            }
+            for article in articles
+        ]
+        
+        # Analyse bayésienne de tout le lot (fusion matricielle)
+        bayesian_results = self.bayesian_analyzer.analyze_articles_sentiment_batch(
+            articles_data,
+            [corroborations_by_article.get(article.get('id'), []) for article in articles]
+        )
+        
+        for article, bayesian_result in zip(articles, bayesian_results):
+            if bayesian_result is None:
                 stats['errors'] += 1
                 # En cas d'erreur, garder l'analyse harmonisée
                 article['sentiment_analysis']['final_score'] = article['sentiment_analysis']['score']
                 article['sentiment_analysis']['final_type'] = article['sentiment_analysis']['type']
+                continue
+            
+            # Vérifier si la confiance s'est améliorée
+            old_confidence = article['sentiment_analysis']['confidence']
+            new_confidence = bayesian_result['bayesian_confidence']
+            
+            if new_confidence > old_confidence:
+                stats['improved'] += 1
+            
+            # Enrichir l'article
+            article['sentiment_analysis']['bayesian_score'] = bayesian_result['bayesian_score']
+            article['sentiment_analysis']['bayesian_confidence'] = new_confidence
+            article['sentiment_analysis']['evidence_count'] = bayesian_result['evidence_count']
+            
+            # Utiliser le score bayésien comme score final
+            article['sentiment_analysis']['final_score'] = bayesian_result['bayesian_score']
+            article['sentiment_analysis']['final_type'] = bayesian_result['sentiment_type']
         
         return stats
     
-    def _get_corroboration_from_db(self, article_id: int, db_manager) -> List[Dict]:
-        """Récupère les données de corroboration depuis la base"""
-        conn = db_manager.get_connection()
-        cursor = conn.cursor()
-        
-        try:
-            cursor.execute("""
-                SELECT c.similar_article_id, c.similarity_score,
-                       a.sentiment_score, a.sentiment_type
-                FROM article_corroborations c
-                JOIN articles a ON c.similar_article_id = a.id
-                WHERE c.article_id = ? AND c.similarity_score >= 0.65
-                ORDER BY c.similarity_score DESC
-                LIMIT 10
-            """, (article_id,))
-            
-            corroborations = []
-            for row in cursor.fetchall():
-                corroborations.append({
-                    'similar_article_id': row[0],
-                    'similarity': row[1],
-                    'sentiment_score': row[2],
-                    'sentiment_type': row[3]
-                })
-            
-            return corroborations
-        finally:
-            conn.close()
+    def _get_corroborations_from_db_batch(self, article_ids: List[int],
+                                          db_manager) -> Dict[int, List[Dict]]:
+        """Récupère les données de corroboration de tout le lot depuis la base"""
+        return self.bayesian_analyzer._get_corroborations_from_db_batch(article_ids, db_manager)
     
     def _save_batch_results(self, articles: List[Dict], db_manager) -> Dict[str, int]:
         """
         Sauvegarde les résultats de l'analyse batch
         """
-        conn = db_manager.get_connection()
-        cursor = conn.cursor()
         stats = {'saved': 0, 'errors': 0}
         
+        rows = []
+        for article in articles:
+            try:
+                analysis = article['sentiment_analysis']
+                rows.append((
+                    analysis.get('final_score', analysis['score']),
+                    analysis.get('final_type', analysis['type']),
+                    analysis['confidence'],
+                    analysis.get('bayesian_confidence', analysis['confidence']),
+                    analysis.get('evidence_count', 0),
+                    1 if analysis.get('harmonized', False) else 0,
+                    analysis.get('cluster_size', 1),
+                    str({
+                        'initial_score': analysis.get('original_score', analysis['score']),
+                        'harmonized': analysis.get('harmonized', False),
+                        'model': analysis['model'],
+                        'deviation_reduced': analysis.get('deviation_reduced', 0)
+                    }),
+                    article.get('id')
+                ))
+            except Exception as e:
+                logger.error(f"Erreur sauvegarde article {article.get('id')}: {e}")
+                stats['errors'] += 1
+        
         try:
-            for article in articles:
-                try:
-                    analysis = article['sentiment_analysis']
-                    
-                    cursor.execute("""
-                        UPDATE articles
-                        SET sentiment_score = ?,
-                            sentiment_type = ?,
-                            sentiment_confidence = ?,
-                            bayesian_confidence = ?,
-                            bayesian_evidence_count = ?,
-                            harmonized = ?,
-                            cluster_size = ?,
-                            analysis_metadata = ?
-                        WHERE id = ?
-                    """, (
-                        analysis.get('final_score', analysis['score']),
-                        analysis.get('final_type', analysis['type']),
-                        analysis['confidence'],
-                        analysis.get('bayesian_confidence', analysis['confidence']),
-                        analysis.get('evidence_count', 0),
-                        1 if analysis.get('harmonized', False) else 0,
-                        analysis.get('cluster_size', 1),
-                        str({
-                            'initial_score': analysis.get('original_score', analysis['score']),
-                            'harmonized': analysis.get('harmonized', False),
-                            'model': analysis['model'],
-                            'deviation_reduced': analysis.get('deviation_reduced', 0)
-                        }),
-                        article.get('id')
-                    ))
-                    
-                    stats['saved'] += 1
-                    
-                except Exception as e:
-                    logger.error(f"Erreur sauvegarde article {article.get('id')}: {e}")
-                    stats['errors'] += 1
+            with db_manager.connection() as conn:
+                conn.executemany("""
+                    UPDATE articles
+                    SET sentiment_score = ?,
+                        sentiment_type = ?,
+                        sentiment_confidence = ?,
+                        bayesian_confidence = ?,
+                        bayesian_evidence_count = ?,
+                        harmonized = ?,
+                        cluster_size = ?,
+                        analysis_metadata = ?
+                    WHERE id = ?
+                """, rows)
             
-            conn.commit()
+            stats['saved'] = len(rows)
             logger.info(f"💾 {stats['saved']}/{len(articles)} articles sauvegardés")
             
         except Exception as e:
             logger.error(f"Erreur globale sauvegarde: {e}")
-            conn.rollback()
-        finally:
-            conn.close()
         
         return stats
     
-    def analyze_recent_articles(self, db_manager, days: int = 7) -> Dict[str, Any]:
+    def analyze_recent_articles(self, db_manager, days: int = 7,
+                                progress_callback: Optional[Callable[[int, str], None]] = None) -> Dict[str, Any]:
         """
         Analyse les articles récents (helper method)
         
         Args:
             db_manager: Gestionnaire de base de données
             days: Nombre de jours à analyser
+            progress_callback: Voir analyze_batch_with_coherence
             
         Returns:
             Résultats de l'analyse
@@ -421,9 +600,9 @@ class BatchSentimentAnalyzer:
             cursor.execute("""
                 SELECT id, title, content, pub_date, feed_url, sentiment_score, sentiment_type
                 FROM articles
-                WHERE pub_date >= datetime('now', '-' || ? || ' days')
-                ORDER BY pub_date DESC
-            """, (days,))
+                WHERE pub_ts >= ?
+                ORDER BY pub_ts DESC
+            """, (to_epoch(datetime.now() - timedelta(days=days)),))
             
             articles = []
             for row in cursor.fetchall():
@@ -441,7 +620,7 @@ class BatchSentimentAnalyzer:
             
             # Lancer l'analyse batch
             if articles:
-                return self.analyze_batch_with_coherence(articles, db_manager)
+                return self.analyze_batch_with_coherence(articles, db_manager, progress_callback)
             else:
                 return {'error': 'Aucun article à analyser'}
             
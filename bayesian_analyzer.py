@@ -5,11 +5,16 @@ Intégration directe sans pont JavaScript
 """
 
 import logging
-from typing import Dict, List, Any
+from typing import Dict, List, Any, Optional, Tuple
 from datetime import datetime, timedelta
 
+import numpy as np
+
 logger = logging.getLogger(__name__)
 
+# Taille maximale des listes IN (...) envoyées à SQLite
+IN_CHUNK_SIZE = 500
+
 
 class BayesianSentimentAnalyzer:
     """
@@ -105,6 +110,22 @@ class BayesianSentimentAnalyzer:
         Returns:
             Analyse enrichie avec score bayésien
         """
+        evidences = self._build_evidences(article_data, corroboration_data)
+        
+        # Fusion bayésienne
+        result = self.fusion_multiple_evidences(evidences)
+        
+        return self._format_analysis(
+            article_data.get('sentiment_score', 0.0),
+            result['posterior'],
+            result['confidence'],
+            result['evidence_count'],
+            [e['type'] for e in evidences]
+        )
+    
+    def _build_evidences(self, article_data: Dict[str, Any],
+                         corroboration_data: List[Dict] = None) -> List[Dict]:
+        """Construit la liste ordonnée des évidences d'un article"""
         evidences = []
         
         # 1. Évidence principale : sentiment TextBlob/VADER
@@ -172,11 +193,14 @@ class BayesianSentimentAnalyzer:
                 'confidence': theme_confidence * 0.5
             })
         
-        # Fusion bayésienne
-        result = self.fusion_multiple_evidences(evidences)
-        
+        return evidences
+    
+    @staticmethod
+    def _format_analysis(initial_sentiment: float, posterior: float, confidence: float,
+                         evidence_count: int, evidences_used: List[str]) -> Dict[str, Any]:
+        """Convertit le posterior fusionné en résultat d'analyse"""
         # Conversion du posterior vers échelle de sentiment (-1, 1)
-        bayesian_sentiment = (result['posterior'] * 2) - 1
+        bayesian_sentiment = (posterior * 2) - 1
         
         # Détermination du type de sentiment avec le score bayésien
         if bayesian_sentiment > 0.1:
@@ -189,12 +213,126 @@ class BayesianSentimentAnalyzer:
         return {
             'original_score': initial_sentiment,
             'bayesian_score': round(bayesian_sentiment, 4),
-            'bayesian_confidence': result['confidence'],
+            'bayesian_confidence': confidence,
             'sentiment_type': sentiment_type,
-            'evidence_count': result['evidence_count'],
-            'evidences_used': [e['type'] for e in evidences]
+            'evidence_count': evidence_count,
+            'evidences_used': evidences_used
         }
     
+    def fusion_multiple_evidences_batch(self, values: np.ndarray, confidences: np.ndarray,
+                                        mask: np.ndarray) -> Dict[str, np.ndarray]:
+        """
+        Fusion vectorisée de fusion_multiple_evidences pour une matrice
+        (articles × évidences)
+        
+        La mise à jour bayésienne s'écrit en log-odds :
+        logit(P(H|E)) = logit(prior) + logit(vraisemblance), puis le posterior
+        est pondéré par la confiance de l'évidence comme dans bayesian_update.
+        Chaque colonne est appliquée à tous les articles à la fois ; le masque
+        ignore les cases vides des articles ayant moins d'évidences.
+        
+        Args:
+            values: Vraisemblances (n_articles × n_évidences)
+            confidences: Confiances des évidences (même forme)
+            mask: True là où une évidence existe (rangées de gauche à droite)
+            
+        Returns:
+            Dict de tableaux 'posterior', 'confidence', 'evidence_count'
+        """
+        values = np.asarray(values, dtype=float)
+        confidences = np.asarray(confidences, dtype=float)
+        mask = np.asarray(mask, dtype=bool)
+        
+        n_articles = values.shape[0]
+        posterior = np.full(n_articles, self.default_prior)
+        cumulative_confidence = np.zeros(n_articles)
+        
+        for column in range(values.shape[1] if values.ndim == 2 else 0):
+            present = mask[:, column]
+            prior = np.clip(posterior, 0.01, 0.99)
+            likelihood = np.clip(values[:, column], 0.01, 0.99)
+            weight = np.clip(confidences[:, column], 0.0, 1.0)
+            
+            # Mise à jour en log-odds
+            log_odds = np.log(prior / (1 - prior)) + np.log(likelihood / (1 - likelihood))
+            updated = 1.0 / (1.0 + np.exp(-log_odds))
+            
+            # Application du poids
+            updated = prior + (updated - prior) * weight
+            step_confidence = np.clip(np.abs(updated - prior) * weight, 0.1, 0.95)
+            
+            posterior = np.where(present, np.round(updated, 4), posterior)
+            cumulative_confidence += np.where(
+                present, np.round(step_confidence, 4) * confidences[:, column], 0.0
+            )
+        
+        counts = mask.sum(axis=1) if mask.ndim == 2 else np.zeros(n_articles, dtype=int)
+        average = np.divide(cumulative_confidence, counts,
+                            out=np.zeros(n_articles), where=counts > 0)
+        
+        return {
+            'posterior': np.round(posterior, 4),
+            'confidence': np.round(np.minimum(0.95, average), 4),
+            'evidence_count': counts
+        }
+    
+    def analyze_articles_sentiment_batch(self, articles_data: List[Dict[str, Any]],
+                                         corroborations: List[List[Dict]] = None,
+                                         errors: List[str] = None) -> List[Optional[Dict[str, Any]]]:
+        """
+        Équivalent de analyze_article_sentiment pour un lot d'articles : les
+        évidences sont rangées dans une matrice et fusionnées en une passe
+        
+        Args:
+            articles_data: Données des articles avec sentiment initial
+            corroborations: Corroborations de chaque article (même ordre)
+            errors: Liste recevant les erreurs par article (optionnelle)
+            
+        Returns:
+            Analyses enrichies dans l'ordre de articles_data (None pour un
+            article dont les données sont invalides)
+        """
+        if corroborations is None:
+            corroborations = [None] * len(articles_data)
+        
+        all_evidences = []
+        for article_data, corroboration_data in zip(articles_data, corroborations):
+            try:
+                all_evidences.append(self._build_evidences(article_data, corroboration_data))
+            except Exception as e:
+                logger.error(f"Erreur analyse article {article_data.get('id')}: {e}")
+                if errors is not None:
+                    errors.append(str(e))
+                all_evidences.append(None)
+        
+        valid = [i for i, evidences in enumerate(all_evidences) if evidences is not None]
+        results: List[Optional[Dict[str, Any]]] = [None] * len(articles_data)
+        if not valid:
+            return results
+        
+        width = max(len(all_evidences[i]) for i in valid)
+        values = np.full((len(valid), width), 0.5)
+        confidences = np.zeros((len(valid), width))
+        mask = np.zeros((len(valid), width), dtype=bool)
+        for row, i in enumerate(valid):
+            for column, evidence in enumerate(all_evidences[i]):
+                values[row, column] = evidence.get('value', 0.5)
+                confidences[row, column] = evidence.get('confidence', 0.5)
+                mask[row, column] = True
+        
+        fused = self.fusion_multiple_evidences_batch(values, confidences, mask)
+        
+        for row, i in enumerate(valid):
+            results[i] = self._format_analysis(
+                articles_data[i].get('sentiment_score', 0.0),
+                float(fused['posterior'][row]),
+                float(fused['confidence'][row]),
+                int(fused['evidence_count'][row]),
+                [e['type'] for e in all_evidences[i]]
+            )
+        
+        return results
+    
     def batch_analyze_articles(self, articles: List[Dict], 
                                db_manager) -> Dict[str, Any]:
         """
@@ -213,93 +351,119 @@ class BayesianSentimentAnalyzer:
             'errors': []
         }
         
-        for article in articles:
-            try:
-                # Récupérer les données de corroboration depuis la DB
-                corroboration_data = self._get_corroboration_from_db(
-                    article.get('id'), 
-                    db_manager
-                )
-                
-                # Analyse bayésienne
-                analysis = self.analyze_article_sentiment(
-                    article, 
-                    corroboration_data
-                )
-                
-                # Mise à jour dans la base
-                self._save_bayesian_analysis(
-                    article.get('id'),
-                    analysis,
-                    db_manager
-                )
-                
-                results['analyzed'] += 1
-                
-                # Vérifier si le sentiment a changé
-                if analysis['sentiment_type'] != article.get('sentiment_type'):
-                    results['updated'] += 1
-                    
-            except Exception as e:
-                logger.error(f"Erreur analyse article {article.get('id')}: {e}")
-                results['errors'].append(str(e))
+        # Corroborations de tout le lot en quelques requêtes
+        corroborations_by_article = self._get_corroborations_from_db_batch(
+            [article.get('id') for article in articles],
+            db_manager
+        )
+        
+        # Analyse bayésienne de tout le lot (fusion matricielle)
+        batch_analyses = self.analyze_articles_sentiment_batch(
+            articles,
+            [corroborations_by_article.get(article.get('id'), []) for article in articles],
+            errors=results['errors']
+        )
+        
+        analyses = []
+        for article, analysis in zip(articles, batch_analyses):
+            if analysis is None:
+                continue
+            analyses.append((article.get('id'), analysis))
+            
+            # Vérifier si le sentiment a changé
+            if analysis['sentiment_type'] != article.get('sentiment_type'):
+                results['updated'] += 1
+        
+        # Mise à jour dans la base (une transaction)
+        if self._save_bayesian_analyses(analyses, db_manager):
+            results['analyzed'] = len(analyses)
+        else:
+            results['updated'] = 0
+            results['errors'].append("Échec de la sauvegarde des analyses bayésiennes")
         
         return results
     
     def _get_corroboration_from_db(self, article_id: int, db_manager) -> List[Dict]:
         """Récupère les données de corroboration depuis la base"""
-        conn = db_manager.get_connection()
-        cursor = conn.cursor()
+        return self._get_corroborations_from_db_batch([article_id], db_manager).get(article_id, [])
+    
+    def _get_corroborations_from_db_batch(self, article_ids: List[int], db_manager,
+                                          min_similarity: float = 0.65,
+                                          limit: int = 10) -> Dict[int, List[Dict]]:
+        """
+        Précharge les corroborations de plusieurs articles (requêtes IN par
+        blocs) : les `limit` meilleures par article, comme la requête unitaire
+        """
+        article_ids = list(dict.fromkeys(i for i in article_ids if i is not None))
+        corroborations: Dict[int, List[Dict]] = {}
         
+        conn = db_manager.get_connection()
         try:
-            cursor.execute("""
-                SELECT c.similar_article_id, c.similarity_score,
-                       a.sentiment_score, a.sentiment_type
-                FROM article_corroborations c
-                JOIN articles a ON c.similar_article_id = a.id
-                WHERE c.article_id = ? AND c.similarity_score >= 0.65
-                ORDER BY c.similarity_score DESC
-                LIMIT 10
-            """, (article_id,))
-            
-            corroborations = []
-            for row in cursor.fetchall():
-                corroborations.append({
-                    'similar_article_id': row[0],
-                    'similarity': row[1],
-                    'sentiment_score': row[2],
-                    'sentiment_type': row[3]
-                })
-            
-            return corroborations
+            for start in range(0, len(article_ids), IN_CHUNK_SIZE):
+                chunk = article_ids[start:start + IN_CHUNK_SIZE]
+                placeholders = ','.join('?' * len(chunk))
+                rows = conn.execute(f"""
+                    SELECT article_id, similar_article_id, similarity_score,
+                           sentiment_score, sentiment_type
+                    FROM (
+                        SELECT c.article_id, c.similar_article_id, c.similarity_score,
+                               a.sentiment_score, a.sentiment_type,
+                               ROW_NUMBER() OVER (
+                                   PARTITION BY c.article_id
+                                   ORDER BY c.similarity_score DESC
+                               ) AS rank
+                        FROM article_corroborations c
+                        JOIN articles a ON c.similar_article_id = a.id
+                        WHERE c.article_id IN ({placeholders}) AND c.similarity_score >= ?
+                    )
+                    WHERE rank <= ?
+                    ORDER BY article_id, rank
+                """, (*chunk, min_similarity, limit)).fetchall()
+                
+                for row in rows:
+                    corroborations.setdefault(row[0], []).append({
+                        'similar_article_id': row[1],
+                        'similarity': row[2],
+                        'sentiment_score': row[3],
+                        'sentiment_type': row[4]
+                    })
         finally:
             conn.close()
+        
+        return corroborations
     
     def _save_bayesian_analysis(self, article_id: int, analysis: Dict, db_manager):
         """Sauvegarde l'analyse bayésienne dans la base"""
-        conn = db_manager.get_connection()
-        cursor = conn.cursor()
+        if self._save_bayesian_analyses([(article_id, analysis)], db_manager):
+            logger.info(f"✅ Analyse bayésienne sauvegardée pour article {article_id}")
+    
+    def _save_bayesian_analyses(self, analyses: List[Tuple[int, Dict]], db_manager) -> bool:
+        """Sauvegarde un lot d'analyses bayésiennes (UPDATE groupé, une transaction)"""
+        if not analyses:
+            return True
         
         try:
-            cursor.execute("""
-                UPDATE articles
-                SET sentiment_score = ?,
-                    sentiment_type = ?,
-                    bayesian_confidence = ?,
-                    bayesian_evidence_count = ?
-                WHERE id = ?
-            """, (
-                analysis['bayesian_score'],
-                analysis['sentiment_type'],
-                analysis['bayesian_confidence'],
-                analysis['evidence_count'],
-                article_id
-            ))
+            with db_manager.connection() as conn:
+                conn.executemany("""
+                    UPDATE articles
+                    SET sentiment_score = ?,
+                        sentiment_type = ?,
+                        bayesian_confidence = ?,
+                        bayesian_evidence_count = ?
+                    WHERE id = ?
+                """, [
+                    (
+                        analysis['bayesian_score'],
+                        analysis['sentiment_type'],
+                        analysis['bayesian_confidence'],
+                        analysis['evidence_count'],
+                        article_id
+                    )
+                    for article_id, analysis in analyses
+                ])
             
-            conn.commit()
-            logger.info(f"✅ Analyse bayésienne sauvegardée pour article {article_id}")
+            logger.debug(f"💾 {len(analyses)} analyses bayésiennes sauvegardées")
+            return True
         except Exception as e:
             logger.error(f"Erreur sauvegarde: {e}")
-            conn.rollback()
-        finally:
-            conn.close()
+            return False
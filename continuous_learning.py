@@ -29,6 +29,9 @@ class FeedbackDataset(Dataset):
     def __init__(self, feedback_data: List[Dict], sentiment_analyzer: SentimentAnalyzer):
         self.feedback_data = feedback_data
         self.sentiment_analyzer = sentiment_analyzer
+        self.texts = [f"{item.get('title', '')} {item.get('content', '')}" for item in feedback_data]
+        # Sentiments calculés une fois pour tout le dataset (inférence par lots)
+        self.sentiment_results = sentiment_analyzer.analyze_batch(self.texts)
         self.label_mapping = {
             'positive': 0,
             'neutral_positive': 1,
@@ -43,8 +46,8 @@ class FeedbackDataset(Dataset):
         item = self.feedback_data[idx]
         
         # Extraire les features à partir du texte
-        text = f"{item.get('title', '')} {item.get('content', '')}"
-        sentiment_result = self.sentiment_analyzer.analyze_sentiment_with_score(text)
+        text = self.texts[idx]
+        sentiment_result = self.sentiment_results[idx]
         
         # Features vector
         features = [
@@ -5,23 +5,20 @@ Sans dépendances lourdes obligatoires
 """
 
 import logging
+import math
 import re
-import difflib
-from typing import List, Dict, Optional, Tuple
-from datetime import datetime, timedelta
+from collections import Counter, defaultdict
+from typing import List, Dict, Optional, Tuple, Iterator
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
 
 logger = logging.getLogger(__name__)
 
 # Tentative d'import des bibliothèques optionnelles
-HAVE_RAPIDFUZZ = False
-try:
-    from rapidfuzz import fuzz
-    HAVE_RAPIDFUZZ = True
-except ImportError:
-    logger.info("rapidfuzz non disponible - utilisation de difflib")
-
 HAVE_SKLEARN = False
 try:
+    from sklearn.base import clone
     from sklearn.feature_extraction.text import TfidfVectorizer
     from sklearn.metrics.pairwise import cosine_similarity
     HAVE_SKLEARN = True
@@ -29,24 +26,128 @@ except ImportError:
     logger.info("sklearn non disponible - utilisation de similarité textuelle basique")
 
 
+# Similarité textuelle : cosinus des fréquences de termes (unigrammes et
+# bigrammes), sans IDF pour que le score d'une paire ne dépende pas du lot.
+# Même découpage que le token_pattern par défaut de sklearn : le mode batch
+# (TfidfVectorizer(use_idf=False)) et compute_similarity donnent le même score.
+TERM_PATTERN = r'(?u)\b\w\w+\b'
+_TERM_RE = re.compile(TERM_PATTERN)
+
+
+def _term_counts(text: str) -> Counter:
+    words = _TERM_RE.findall(text)
+    counts = Counter(words)
+    counts.update(f"{a} {b}" for a, b in zip(words, words[1:]))
+    return counts
+
+
+def _cosine(counts1: Counter, counts2: Counter) -> float:
+    if len(counts1) > len(counts2):
+        counts1, counts2 = counts2, counts1
+    dot = sum(n * counts2[t] for t, n in counts1.items() if t in counts2)
+    if not dot:
+        return 0.0
+    norm1 = math.sqrt(sum(n * n for n in counts1.values()))
+    norm2 = math.sqrt(sum(n * n for n in counts2.values()))
+    return dot / (norm1 * norm2)
+
+
+class CandidateIndex:
+    """
+    Index inversé de tokens (titre + début du contenu) pour la génération de
+    candidats : seuls les articles partageant au moins un token discriminant
+    et publiés dans la même fenêtre temporelle sont comparés finement.
+    
+    Les tokens trop fréquents (présents dans plus de max_df du lot) sont
+    ignorés : ils n'apportent aucun pouvoir de discrimination.
+    """
+    
+    TOKEN_RE = re.compile(r'\w{3,}')
+    
+    def __init__(self, engine: 'CorroborationEngine', articles: List[Dict],
+                 window_days: Optional[int] = None, max_df: float = 0.3,
+                 min_shared: int = 1):
+        self.articles = articles
+        self.window_days = window_days
+        self.min_shared = min_shared
+        self.dates = [
+            engine._parse_date(a.get('pub_date') or a.get('date')) for a in articles
+        ]
+        self.tokens = [self.tokenize(engine, a) for a in articles]
+        
+        postings = defaultdict(list)
+        for i, tokens in enumerate(self.tokens):
+            for token in tokens:
+                postings[token].append(i)
+        
+        # Les petits lots gardent tous les tokens
+        max_postings = max(50, int(max_df * len(articles)))
+        self.postings = {t: ids for t, ids in postings.items() if len(ids) <= max_postings}
+        self.positions = {id(a): i for i, a in enumerate(articles)}
+    
+    @classmethod
+    def tokenize(cls, engine: 'CorroborationEngine', article: Dict) -> set:
+        text = f"{article.get('title', '')} {(article.get('content') or '')[:500]}"
+        return set(cls.TOKEN_RE.findall(engine._normalize_text(text)))
+    
+    def _within_window(self, date1: Optional[datetime], date2: Optional[datetime]) -> bool:
+        if self.window_days is None or not date1 or not date2:
+            return True
+        try:
+            return abs((date1 - date2).days) <= self.window_days
+        except TypeError:
+            # Dates naïves / avec fuseau : pas de filtrage possible
+            return True
+    
+    def query(self, engine: 'CorroborationEngine', article: Dict) -> List[Dict]:
+        """Retourne les candidats plausibles pour un article"""
+        position = self.positions.get(id(article))
+        if position is not None:
+            tokens, date = self.tokens[position], self.dates[position]
+        else:
+            tokens = self.tokenize(engine, article)
+            date = engine._parse_date(article.get('pub_date') or article.get('date'))
+        
+        shared = defaultdict(int)
+        for token in tokens:
+            for i in self.postings.get(token, ()):
+                shared[i] += 1
+        
+        return [
+            self.articles[i] for i in sorted(shared)
+            if shared[i] >= self.min_shared and self._within_window(date, self.dates[i])
+        ]
+
+
 class CorroborationEngine:
     """
     Moteur de recherche d'articles corroborants
     Fonctionne avec ou sans bibliothèques ML
     """
     
+    # Pondération des composantes de compute_similarity
+    WEIGHTS = {'content': 0.5, 'title': 0.2, 'themes': 0.15, 'temporal': 0.1, 'source': 0.05}
+    
+    # Nombre de lignes de la matrice de similarité calculées à la fois,
+    # réduit pour les gros lots afin de borner la mémoire (cellules par bloc)
+    BATCH_BLOCK_SIZE = 512
+    BATCH_BLOCK_CELLS = 4_000_000
+    
     def __init__(self):
         self.tfidf = None
         self.window_days = 7  # Fenêtre temporelle par défaut
         
         if HAVE_SKLEARN:
             try:
+                # Pas d'IDF ni de max_features : chaque score ne dépend que
+                # de la paire, comme _text_similarity
                 self.tfidf = TfidfVectorizer(
-                    max_features=2000,
+                    token_pattern=TERM_PATTERN,
                     ngram_range=(1, 2),
+                    use_idf=False,
                     min_df=1
                 )
-                logger.info("✅ TF-IDF initialisé")
+                logger.info("✅ Vectoriseur TF initialisé")
             except Exception as e:
                 logger.warning(f"Erreur init TF-IDF: {e}")
     
@@ -60,8 +161,8 @@ class CorroborationEngine:
     
     def _text_similarity(self, text1: str, text2: str) -> float:
         """
-        Calcule la similarité entre deux textes
-        Utilise rapidfuzz si disponible, sinon difflib
+        Calcule la similarité entre deux textes (cosinus des fréquences
+        d'unigrammes et de bigrammes, identique au mode batch)
         """
         text1 = self._normalize_text(text1)
         text2 = self._normalize_text(text2)
@@ -69,19 +170,12 @@ class CorroborationEngine:
         if not text1 or not text2:
             return 0.0
         
-        if HAVE_RAPIDFUZZ:
-            try:
-                return fuzz.token_sort_ratio(text1, text2) / 100.0
-            except Exception:
-                pass
-        
-        # Fallback sur difflib
-        return difflib.SequenceMatcher(None, text1, text2).ratio()
+        return _cosine(_term_counts(text1), _term_counts(text2))
     
     def _semantic_similarity(self, target: str, candidates: List[str]) -> List[float]:
         """
         Calcule la similarité sémantique
-        Utilise TF-IDF si disponible, sinon similarité textuelle
+        Utilise le vectoriseur sklearn si disponible, sinon similarité textuelle
         """
         if HAVE_SKLEARN and self.tfidf:
             try:
@@ -179,7 +273,7 @@ class CorroborationEngine:
         
         content_sim = self._text_similarity(target_text, cand_text)
         scores.append(content_sim)
-        weights.append(0.5)  # Poids le plus important
+        weights.append(self.WEIGHTS['content'])  # Poids le plus important
         
         # 2. Similarité de titre seul
         title_sim = self._text_similarity(
@@ -187,7 +281,7 @@ class CorroborationEngine:
             candidate.get('title', '')
         )
         scores.append(title_sim)
-        weights.append(0.2)
+        weights.append(self.WEIGHTS['title'])
         
         # 3. Similarité thématique
         article_themes = article.get('themes', [])
@@ -203,7 +297,7 @@ class CorroborationEngine:
         
         theme_sim = self._theme_similarity(article_themes, cand_themes)
         scores.append(theme_sim)
-        weights.append(0.15)
+        weights.append(self.WEIGHTS['themes'])
         
         # 4. Proximité temporelle
         date1 = self._parse_date(article.get('pub_date') or article.get('date'))
@@ -212,7 +306,7 @@ class CorroborationEngine:
         if date1 and date2:
             temporal_sim = self._temporal_proximity(date1, date2)
             scores.append(temporal_sim)
-            weights.append(0.1)
+            weights.append(self.WEIGHTS['temporal'])
         
         # 5. Similarité de source
         source_sim = self._source_similarity(
@@ -220,7 +314,7 @@ class CorroborationEngine:
             candidate.get('feed_url', '')
         )
         scores.append(source_sim)
-        weights.append(0.05)
+        weights.append(self.WEIGHTS['source'])
         
         # Moyenne pondérée
         total_weight = sum(weights)
@@ -230,8 +324,223 @@ class CorroborationEngine:
         
         return 0.0
     
+    # ------------------------------------------------------------------
+    # Mode batch : matrice de similarité vectorisée
+    # ------------------------------------------------------------------
+    
+    def _article_features(self, articles: List[Dict]) -> Dict[str, object]:
+        """Pré-calcule une fois par article ce que compute_similarity recalcule par paire"""
+        texts, titles, themes, sources = [], [], [], []
+        timestamps = np.full(len(articles), np.nan)
+        aware = np.zeros(len(articles), dtype=bool)
+        epoch_naive = datetime(1970, 1, 1)
+        epoch_aware = datetime(1970, 1, 1, tzinfo=timezone.utc)
+        
+        for i, article in enumerate(articles):
+            texts.append(self._normalize_text(
+                f"{article.get('title', '')} {(article.get('content') or '')[:500]}"
+            ))
+            titles.append(self._normalize_text(article.get('title', '')))
+            
+            article_themes = article.get('themes', [])
+            if isinstance(article_themes, list) and article_themes and isinstance(article_themes[0], dict):
+                article_themes = [t.get('id') or t.get('name') for t in article_themes]
+            themes.append(set(article_themes) if isinstance(article_themes, list) else set())
+            
+            sources.append((article.get('feed_url') or '').lower())
+            
+            date = self._parse_date(article.get('pub_date') or article.get('date'))
+            if date is not None:
+                aware[i] = date.tzinfo is not None
+                epoch = epoch_aware if aware[i] else epoch_naive
+                timestamps[i] = (date - epoch).total_seconds()
+        
+        return {
+            'ids': [a.get('id') for a in articles],
+            'texts': texts, 'titles': titles, 'themes': themes,
+            'sources': sources, 'timestamps': timestamps, 'aware': aware
+        }
+    
+    @staticmethod
+    def _tfidf_vectors(vectorizer, left: List[str], right: List[str], same: bool):
+        """Vectorise les deux côtés avec un seul fit (lignes normalisées L2)"""
+        if same:
+            matrix = vectorizer.fit_transform(left)
+            return matrix, matrix
+        matrix = vectorizer.fit_transform(left + right)
+        return matrix[:len(left)], matrix[len(left):]
+    
+    def _temporal_block(self, ts_left: np.ndarray, aware_left: np.ndarray,
+                        ts_right: np.ndarray, aware_right: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Version vectorisée de _temporal_proximity (et masque des paires datées)"""
+        has_dates = ~np.isnan(ts_left)[:, None] & ~np.isnan(ts_right)[None, :]
+        # Même arrondi que timedelta.days (vers -inf)
+        delta_days = np.abs(np.floor((ts_left[:, None] - ts_right[None, :]) / 86400.0))
+        temporal = np.select(
+            [delta_days == 0, delta_days <= 1, delta_days <= 3, delta_days <= 7, delta_days <= 14],
+            [1.0, 0.9, 0.7, 0.5, 0.3],
+            default=0.1
+        )
+        # Date naïve contre date avec fuseau : comparaison impossible
+        temporal[aware_left[:, None] != aware_right[None, :]] = 0.0
+        temporal[~has_dates] = 0.0
+        return temporal, has_dates
+    
+    def iter_similarity_top_k(self, articles: List[Dict], candidates: List[Dict],
+                              threshold: float = 0.65,
+                              top_n: int = 10) -> Iterator[Tuple[int, List[Tuple[int, float]]]]:
+        """
+        Calcule la matrice de similarité articles × candidats par blocs de lignes
+        et produit, pour chaque article, ses top_n candidats au-dessus du seuil.
+        
+        Le vectoriseur TF est ajusté une seule fois pour tout le lot (contenu
+        et titres), avec la même métrique que _text_similarity ;
+        les composantes thèmes, temps et source sont combinées avec NumPy.
+        Nécessite sklearn.
+        
+        Yields:
+            (index de l'article, [(index du candidat, score), ...]) trié par score décroissant
+        """
+        same = articles is candidates
+        left = self._article_features(articles)
+        right = left if same else self._article_features(candidates)
+        
+        content_left, content_right = self._tfidf_vectors(
+            clone(self.tfidf), left['texts'], right['texts'], same)
+        title_left, title_right = self._tfidf_vectors(
+            clone(self.tfidf), left['titles'], right['titles'], same)
+        content_right_t = content_right.T.tocsr()
+        title_right_t = title_right.T.tocsr()
+        
+        # Thèmes : matrice binaire creuse → intersections par produit matriciel
+        theme_vocab = {}
+        for theme_set in left['themes'] + right['themes']:
+            for theme in theme_set:
+                theme_vocab.setdefault(theme, len(theme_vocab))
+        
+        def theme_matrix(theme_sets):
+            matrix = np.zeros((len(theme_sets), max(1, len(theme_vocab))), dtype=np.float32)
+            for i, theme_set in enumerate(theme_sets):
+                matrix[i, [theme_vocab[t] for t in theme_set]] = 1.0
+            return matrix
+        
+        themes_left, themes_right = theme_matrix(left['themes']), theme_matrix(right['themes'])
+        themes_right_count = themes_right.sum(axis=1)
+        
+        source_codes = {}
+        def encode_sources(sources):
+            return np.array([source_codes.setdefault(s, len(source_codes)) if s else -1 for s in sources])
+        sources_left, sources_right = encode_sources(left['sources']), encode_sources(right['sources'])
+        
+        # Identifiants encodés en entiers pour exclure l'article lui-même (-1: sans id)
+        id_codes = {}
+        def encode_ids(ids):
+            return np.array([id_codes.setdefault(i, len(id_codes)) if i is not None else -1 for i in ids])
+        ids_left, ids_right = encode_ids(left['ids']), encode_ids(right['ids'])
+        weights = self.WEIGHTS
+        
+        block_size = max(1, min(self.BATCH_BLOCK_SIZE, self.BATCH_BLOCK_CELLS // max(1, len(candidates))))
+        
+        for start in range(0, len(articles), block_size):
+            rows = slice(start, min(start + block_size, len(articles)))
+            
+            content_sim = (content_left[rows] @ content_right_t).toarray()
+            title_sim = (title_left[rows] @ title_right_t).toarray()
+            # Textes vides : similarité nulle, comme _text_similarity
+            content_sim[[not t for t in left['texts'][rows]], :] = 0.0
+            title_sim[[not t for t in left['titles'][rows]], :] = 0.0
+            
+            block_themes = themes_left[rows]
+            intersection = block_themes @ themes_right.T
+            union = block_themes.sum(axis=1)[:, None] + themes_right_count[None, :] - intersection
+            theme_sim = np.divide(intersection, union, out=np.zeros_like(intersection), where=union > 0)
+            
+            temporal_sim, has_dates = self._temporal_block(
+                left['timestamps'][rows], left['aware'][rows], right['timestamps'], right['aware']
+            )
+            
+            block_sources = sources_left[rows]
+            source_sim = ((block_sources[:, None] == sources_right[None, :])
+                          & (block_sources[:, None] >= 0)).astype(float)
+            
+            weighted = (weights['content'] * content_sim
+                        + weights['title'] * title_sim
+                        + weights['themes'] * theme_sim
+                        + weights['temporal'] * temporal_sim
+                        + weights['source'] * source_sim)
+            total_weight = (weights['content'] + weights['title'] + weights['themes']
+                            + weights['source'] + weights['temporal'] * has_dates)
+            scores = np.round(weighted / total_weight, 4)
+            
+            # Exclure l'article lui-même
+            block_ids = ids_left[rows]
+            scores[(block_ids[:, None] == ids_right[None, :]) & (block_ids[:, None] >= 0)] = -1.0
+            
+            k = min(top_n, scores.shape[1])
+            if k <= 0:
+                for offset in range(scores.shape[0]):
+                    yield start + offset, []
+                continue
+            top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+            
+            for offset, row_top in enumerate(top):
+                row_scores = scores[offset, row_top]
+                keep = row_scores >= threshold
+                order = np.argsort(-row_scores[keep], kind='stable')
+                yield start + offset, [
+                    (int(j), float(score))
+                    for j, score in zip(row_top[keep][order], row_scores[keep][order])
+                ]
+    
+    def find_corroborations_batch(self, articles: List[Dict], candidates: List[Dict],
+                                  threshold: float = 0.65, top_n: int = 10) -> List[List[Dict]]:
+        """
+        Équivalent de find_corroborations pour tout un lot d'articles
+        
+        Utilise la matrice de similarité vectorisée (TF) si sklearn est
+        disponible, sinon la comparaison par paires limitée par l'index de
+        candidats.
+        
+        Returns:
+            Une liste de corroborations par article, dans l'ordre de articles
+        """
+        if not articles or not candidates:
+            return [[] for _ in articles]
+        
+        if not (HAVE_SKLEARN and self.tfidf):
+            candidate_index = self.build_candidate_index(candidates)
+            return [
+                self.find_corroborations(article, candidates, threshold=threshold,
+                                         top_n=top_n, candidate_index=candidate_index)
+                for article in articles
+            ]
+        
+        results = [[] for _ in articles]
+        for i, neighbours in self.iter_similarity_top_k(articles, candidates, threshold, top_n):
+            results[i] = [
+                {
+                    'id': candidates[j].get('id'),
+                    'title': candidates[j].get('title'),
+                    'source': candidates[j].get('feed_url', 'Unknown'),
+                    'similarity': score,
+                    'pub_date': candidates[j].get('pub_date'),
+                    'sentiment_type': candidates[j].get('sentiment_type'),
+                    'sentiment_score': candidates[j].get('sentiment_score')
+                }
+                for j, score in neighbours
+            ]
+        
+        logger.info(f"✅ Matrice de similarité calculée: {len(articles)} × {len(candidates)} "
+                    f"({sum(len(r) for r in results)} corroborations, seuil: {threshold})")
+        return results
+    
+    def build_candidate_index(self, articles: List[Dict]) -> CandidateIndex:
+        """Construit l'index de candidats d'un lot (fenêtre: self.window_days)"""
+        return CandidateIndex(self, articles, window_days=self.window_days)
+    
     def find_corroborations(self, article: Dict, candidates: List[Dict],
-                          threshold: float = 0.65, top_n: int = 10) -> List[Dict]:
+                          threshold: float = 0.65, top_n: int = 10,
+                          candidate_index: Optional[CandidateIndex] = None) -> List[Dict]:
         """
         Trouve les articles corroborants pour un article donné
         
@@ -240,6 +549,8 @@ class CorroborationEngine:
             candidates: Liste d'articles candidats
             threshold: Seuil minimal de similarité (0.65 par défaut)
             top_n: Nombre maximal de résultats
+            candidate_index: Index construit sur candidates ; si fourni, seuls
+                les candidats plausibles sont comparés
             
         Returns:
             Liste d'articles similaires avec leur score
@@ -251,6 +562,9 @@ class CorroborationEngine:
         article_id = article.get('id')
         results = []
         
+        if candidate_index is not None:
+            candidates = candidate_index.query(self, article)
+        
         logger.info(f"🔍 Recherche de corroboration pour article {article_id} parmi {len(candidates)} candidats")
         
         for candidate in candidates:
@@ -302,30 +616,25 @@ class CorroborationEngine:
             'errors': 0
         }
         
-        for article in articles:
-            try:
-                # Trouver les corroborations
-                corroborations = self.find_corroborations(
-                    article,
-                    recent_articles,
-                    threshold=0.65,
-                    top_n=10
-                )
-                
-                # Sauvegarder dans la base
-                if corroborations:
-                    self._save_corroborations(
-                        article.get('id'),
-                        corroborations,
-                        db_manager
-                    )
-                    stats['corroborations_found'] += len(corroborations)
-                
-                stats['processed'] += 1
-                
-            except Exception as e:
-                logger.error(f"Erreur traitement article {article.get('id')}: {e}")
-                stats['errors'] += 1
+        # Similarités calculées pour tout le lot en une passe
+        all_corroborations = self.find_corroborations_batch(
+            articles,
+            recent_articles,
+            threshold=0.65,
+            top_n=10
+        )
+        
+        # Sauvegarde de toutes les paires du lot en une transaction
+        to_save = {
+            article.get('id'): corroborations
+            for article, corroborations in zip(articles, all_corroborations)
+            if corroborations
+        }
+        if to_save and not self._save_corroborations_batch(to_save, db_manager):
+            stats['errors'] += len(to_save)
+        else:
+            stats['corroborations_found'] = sum(len(c) for c in to_save.values())
+        stats['processed'] = len(articles) - stats['errors']
         
         return stats
     
@@ -333,33 +642,39 @@ class CorroborationEngine:
                            corroborations: List[Dict],
                            db_manager):
         """Sauvegarde les corroborations dans la base de données"""
-        conn = db_manager.get_connection()
-        cursor = conn.cursor()
+        self._save_corroborations_batch({article_id: corroborations}, db_manager)
+    
+    def _save_corroborations_batch(self, corroborations_by_article: Dict[int, List[Dict]],
+                                   db_manager) -> bool:
+        """
+        Remplace les corroborations de plusieurs articles en une seule
+        transaction (executemany pour les suppressions et les insertions)
+        """
+        article_ids = [(article_id,) for article_id in corroborations_by_article]
+        rows = [
+            (article_id, corr['id'], corr['similarity'])
+            for article_id, corroborations in corroborations_by_article.items()
+            for corr in corroborations
+        ]
         
         try:
-            # Supprimer les anciennes corroborations
-            cursor.execute("""
-                DELETE FROM article_corroborations 
-                WHERE article_id = ?
-            """, (article_id,))
-            
-            # Insérer les nouvelles
-            for corr in corroborations:
-                cursor.execute("""
+            with db_manager.connection() as conn:
+                # Supprimer les anciennes corroborations
+                conn.executemany("""
+                    DELETE FROM article_corroborations 
+                    WHERE article_id = ?
+                """, article_ids)
+                
+                # Insérer les nouvelles
+                conn.executemany("""
                     INSERT INTO article_corroborations 
                     (article_id, similar_article_id, similarity_score, created_at)
                     VALUES (?, ?, ?, CURRENT_TIMESTAMP)
-                """, (
-                    article_id,
-                    corr['id'],
-                    corr['similarity']
-                ))
+                """, rows)
             
-            conn.commit()
-            logger.debug(f"💾 {len(corroborations)} corroborations sauvegardées pour article {article_id}")
+            logger.debug(f"💾 {len(rows)} corroborations sauvegardées pour {len(article_ids)} articles")
+            return True
             
         except Exception as e:
             logger.error(f"Erreur sauvegarde corroborations: {e}")
-            conn.rollback()
-        finally:
-            conn.close()
+            return False
@@ -1,20 +1,225 @@
 import sqlite3
+import calendar
 import logging
 import os
-from typing import Optional, List, Dict, Any
+import queue
+import threading
+from contextlib import contextmanager
+from datetime import date, datetime, timedelta
+from typing import Optional, List, Dict, Any, Iterator, Union
 
 logger = logging.getLogger(__name__)
 
+# Réglages SQLite appliqués à chaque connexion du pool
+POOL_SIZE = 8
+BUSY_TIMEOUT = 30.0
+CACHED_STATEMENTS = 256
+CONNECTION_PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA cache_size=-65536",      # 64 Mo de cache de pages
+    "PRAGMA mmap_size=268435456",    # 256 Mo mappés en mémoire
+    "PRAGMA temp_store=MEMORY",
+)
+
+
+# articles.pub_ts : pub_date (heure murale) en secondes epoch, comme strftime('%s')
+PUB_TS_SQL = "CAST(strftime('%s', {column}) AS INTEGER)"
+
+
+def to_epoch(value: Union[datetime, date, str, None]) -> Optional[int]:
+    """
+    Convertit une date en secondes epoch comparables à articles.pub_ts
+
+    L'heure murale est lue telle quelle (sans fuseau), comme SQLite le fait
+    pour pub_date ; une date seule ('2024-03-01') désigne minuit.
+    """
+    if value is None:
+        return None
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value.strip().replace('Z', '+00:00'))
+    if isinstance(value, datetime) and value.tzinfo is not None:
+        value = value.astimezone().replace(tzinfo=None)
+    return calendar.timegm(value.timetuple())
+
+
+def day_range(date_from: Optional[str] = None, date_to: Optional[str] = None,
+              column: str = 'a.pub_ts') -> List[tuple]:
+    """
+    Conditions (SQL, paramètre) sur pub_ts pour un intervalle de jours inclusif
+
+    Remplace DATE(pub_date) >= ? / <= ?, qui empêchent l'usage d'un index.
+
+    Raises:
+        ValueError: date invalide
+    """
+    conditions = []
+    if date_from:
+        conditions.append((f"{column} >= ?", to_epoch(date_from[:10])))
+    if date_to:
+        end = datetime.fromisoformat(date_to[:10]) + timedelta(days=1)
+        conditions.append((f"{column} < ?", to_epoch(end)))
+    return conditions
+
+
+class PooledConnection:
+    """
+    Proxy autour d'une sqlite3.Connection issue du pool.
+
+    S'utilise exactement comme une connexion classique ; close() rend la
+    connexion au pool au lieu de la fermer, ce qui conserve le cache de
+    requêtes préparées et les pragmas entre deux appels.
+    """
+
+    def __init__(self, pool: 'ConnectionPool', raw: sqlite3.Connection):
+        self._pool = pool
+        self._raw = raw
+
+    def __getattr__(self, name):
+        raw = self.__dict__.get('_raw')
+        if raw is None:
+            raise sqlite3.ProgrammingError("Cannot operate on a closed database.")
+        return getattr(raw, name)
+
+    def __setattr__(self, name, value):
+        if name in ('_pool', '_raw'):
+            object.__setattr__(self, name, value)
+        else:
+            setattr(self._raw, name, value)
+
+    def __enter__(self):
+        # Même sémantique que sqlite3.Connection : transaction, sans fermeture
+        self._raw.__enter__()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        return self._raw.__exit__(exc_type, exc_val, exc_tb)
+
+    def close(self):
+        """Rend la connexion au pool"""
+        raw = self.__dict__.get('_raw')
+        if raw is not None:
+            object.__setattr__(self, '_raw', None)
+            self._pool.release(raw)
+
+    def __del__(self):
+        # Filet de sécurité pour les appelants qui oublient close()
+        try:
+            self.close()
+        except Exception:
+            pass
+
+
+class ConnectionPool:
+    """Pool borné de connexions SQLite en mode WAL pour un fichier donné"""
+
+    def __init__(self, db_path: str, size: int = POOL_SIZE):
+        self.db_path = db_path
+        self.size = size
+        self._idle: 'queue.LifoQueue[sqlite3.Connection]' = queue.LifoQueue(maxsize=size)
+        self._wal_checked = False
+        self._lock = threading.Lock()
+
+    def _connect(self) -> sqlite3.Connection:
+        raw = sqlite3.connect(
+            self.db_path,
+            timeout=BUSY_TIMEOUT,
+            check_same_thread=False,
+            cached_statements=CACHED_STATEMENTS,
+        )
+        for pragma in CONNECTION_PRAGMAS:
+            try:
+                raw.execute(pragma)
+            except sqlite3.DatabaseError as e:
+                logger.debug(f"Pragma ignoré ({pragma}): {e}")
+
+        if not self._wal_checked:
+            with self._lock:
+                if not self._wal_checked:
+                    mode = raw.execute("PRAGMA journal_mode").fetchone()[0]
+                    if str(mode).lower() != 'wal':
+                        logger.warning(f"⚠️ Mode WAL indisponible pour {self.db_path} (mode: {mode})")
+                    self._wal_checked = True
+
+        return raw
+
+    def acquire(self) -> PooledConnection:
+        try:
+            raw = self._idle.get_nowait()
+        except queue.Empty:
+            raw = self._connect()
+        raw.row_factory = sqlite3.Row
+        return PooledConnection(self, raw)
+
+    def release(self, raw: sqlite3.Connection):
+        try:
+            if raw.in_transaction:
+                raw.rollback()
+            raw.row_factory = sqlite3.Row
+            raw.text_factory = str
+            self._idle.put_nowait(raw)
+        except (queue.Full, sqlite3.Error):
+            try:
+                raw.close()
+            except sqlite3.Error:
+                pass
+
+    def close_all(self):
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                break
+            except sqlite3.Error:
+                pass
+
+
+_pools: Dict[str, ConnectionPool] = {}
+_pools_lock = threading.Lock()
+_pools_pid = os.getpid()
+
+
+def get_pool(db_path: str) -> ConnectionPool:
+    """Retourne le pool partagé par tous les DatabaseManager d'un même fichier"""
+    global _pools_pid
+    key = os.path.abspath(db_path) if db_path != ':memory:' else db_path
+    with _pools_lock:
+        if _pools_pid != os.getpid():
+            # Processus enfant (fork) : ne jamais réutiliser les connexions du parent
+            _pools.clear()
+            _pools_pid = os.getpid()
+        pool = _pools.get(key)
+        if pool is None:
+            pool = ConnectionPool(db_path)
+            _pools[key] = pool
+        return pool
+
+
 class DatabaseManager:
     def __init__(self, db_path: str = "rss_analyzer.db"):
         self.db_path = db_path
+        self.pool = get_pool(db_path)
         self._init_db()
 
     def get_connection(self) -> sqlite3.Connection:
-        """Retourne une connexion à la base de données"""
-        conn = sqlite3.connect(self.db_path)
-        conn.row_factory = sqlite3.Row
-        return conn
+        """Retourne une connexion du pool (close() la rend au pool)"""
+        return self.pool.acquire()
+
+    @contextmanager
+    def connection(self) -> Iterator[sqlite3.Connection]:
+        """
+        Connexion transactionnelle : commit en sortie normale, rollback en
+        cas d'exception, puis retour au pool.
+        """
+        conn = self.get_connection()
+        try:
+            yield conn
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            conn.close()
 
     def _init_db(self):
         """Initialise la base de données avec les tables nécessaires"""
@@ -28,6 +233,7 @@ class DatabaseManager:
                     id INTEGER PRIMARY KEY AUTOINCREMENT,
                     title TEXT NOT NULL,
                     content TEXT,
+                    excerpt TEXT,
                     link TEXT UNIQUE,
                     pub_date TIMESTAMP,
                     sentiment_type TEXT,
@@ -89,11 +295,10 @@ class DatabaseManager:
         """Exécute une requête SELECT et retourne les résultats"""
         try:
             conn = self.get_connection()
-            cursor = conn.cursor()
-            cursor.execute(query, params)
-            results = cursor.fetchall()
-            conn.close()
-            return results
+            try:
+                return conn.execute(query, params).fetchall()
+            finally:
+                conn.close()
         except Exception as e:
             logger.error(f"Erreur exécution requête: {e}")
             raise
@@ -101,16 +306,23 @@ class DatabaseManager:
     def execute_update(self, query: str, params: tuple = ()) -> bool:
         """Exécute une requête UPDATE/INSERT/DELETE"""
         try:
-            conn = self.get_connection()
-            cursor = conn.cursor()
-            cursor.execute(query, params)
-            conn.commit()
-            conn.close()
+            with self.connection() as conn:
+                conn.execute(query, params)
             return True
         except Exception as e:
             logger.error(f"Erreur exécution mise à jour: {e}")
             return False
 
+    def execute_many(self, query: str, params_seq) -> bool:
+        """Exécute une requête pour chaque jeu de paramètres, en une transaction"""
+        try:
+            with self.connection() as conn:
+                conn.executemany(query, params_seq)
+            return True
+        except Exception as e:
+            logger.error(f"Erreur exécution par lot: {e}")
+            return False
+
     def get_article_count(self) -> int:
         """Retourne le nombre total d'articles"""
         try:
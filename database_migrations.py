@@ -5,10 +5,14 @@ Migrations de base de données pour ajouter les fonctionnalités avancées
 
 import logging
 from typing import Optional
-from .database import DatabaseManager
+from .database import DatabaseManager, PUB_TS_SQL
+from .article_search import ArticleSearchIndex
+from .article_listing import excerpt_sql
 
 logger = logging.getLogger(__name__)
 
+BACKFILL_CHUNK_SIZE = 5000
+
 
 class DatabaseMigrations:
     """Gestionnaire de migrations de la base de données"""
@@ -24,6 +28,9 @@ class DatabaseMigrations:
             ("01_add_bayesian_columns", self._add_bayesian_columns),
             ("02_create_corroboration_table", self._create_corroboration_table),
             ("03_add_indices", self._add_performance_indices),
+            ("04_create_articles_fts", self._create_articles_fts),
+            ("05_add_article_excerpt", self._add_article_excerpt),
+            ("06_add_pub_ts_and_composite_indices", self._add_pub_ts_and_composite_indices),
         ]
         
         for name, migration_func in migrations:
@@ -170,6 +177,96 @@ class DatabaseMigrations:
         finally:
             conn.close()
     
+    def _create_articles_fts(self):
+        """Crée l'index plein texte des articles et le remplit par tranches"""
+        search_index = ArticleSearchIndex(self.db_manager)
+        search_index.create()
+        logger.info("  ➕ Table articles_fts et triggers créés")
+        indexed = search_index.backfill()
+        search_index.optimize()
+        logger.info(f"  ➕ {indexed} articles existants indexés")
+    
+    def _add_article_excerpt(self):
+        """Ajoute l'extrait précalculé des listes (rempli par tranches) et date les articles sans pub_date"""
+        with self.db_manager.connection() as conn:
+            try:
+                conn.execute("ALTER TABLE articles ADD COLUMN excerpt TEXT")
+                logger.info("  ➕ Colonne ajoutée: excerpt")
+            except Exception as e:
+                if "duplicate column" in str(e).lower():
+                    logger.debug("  ⏭️  Colonne excerpt existe déjà")
+                else:
+                    raise
+            # Clé de pagination (pub_date, id) : comme à l'ingestion, date par défaut
+            cursor = conn.execute("""
+                UPDATE articles SET pub_date = COALESCE(created_at, CURRENT_TIMESTAMP)
+                WHERE pub_date IS NULL
+            """)
+            if cursor.rowcount:
+                logger.info(f"  ➕ {cursor.rowcount} articles sans date datés de leur insertion")
+            max_id = conn.execute("SELECT COALESCE(MAX(id), 0) FROM articles").fetchone()[0]
+        
+        updated = 0
+        for start in range(0, max_id, BACKFILL_CHUNK_SIZE):
+            with self.db_manager.connection() as conn:
+                cursor = conn.execute(f"""
+                    UPDATE articles SET excerpt = {excerpt_sql('content')}
+                    WHERE id > ? AND id <= ? AND excerpt IS NULL AND content IS NOT NULL
+                """, (start, start + BACKFILL_CHUNK_SIZE))
+                updated += cursor.rowcount
+        logger.info(f"  ➕ {updated} extraits calculés")
+    
+    def _add_pub_ts_and_composite_indices(self):
+        """
+        Ajoute articles.pub_ts (epoch entier, tenu à jour par triggers) et
+        les index composites des requêtes par période, thème et source
+        """
+        pub_ts_sql = PUB_TS_SQL.format(column='NEW.pub_date')
+        with self.db_manager.connection() as conn:
+            try:
+                conn.execute("ALTER TABLE articles ADD COLUMN pub_ts INTEGER")
+                logger.info("  ➕ Colonne ajoutée: pub_ts")
+            except Exception as e:
+                if "duplicate column" in str(e).lower():
+                    logger.debug("  ⏭️  Colonne pub_ts existe déjà")
+                else:
+                    raise
+            conn.execute(f"""
+                CREATE TRIGGER IF NOT EXISTS trg_articles_pub_ts_insert
+                AFTER INSERT ON articles
+                BEGIN
+                    UPDATE articles SET pub_ts = {pub_ts_sql} WHERE id = NEW.id;
+                END
+            """)
+            conn.execute(f"""
+                CREATE TRIGGER IF NOT EXISTS trg_articles_pub_ts_update
+                AFTER UPDATE OF pub_date ON articles
+                BEGIN
+                    UPDATE articles SET pub_ts = {pub_ts_sql} WHERE id = NEW.id;
+                END
+            """)
+            max_id = conn.execute("SELECT COALESCE(MAX(id), 0) FROM articles").fetchone()[0]
+        
+        updated = 0
+        for start in range(0, max_id, BACKFILL_CHUNK_SIZE):
+            with self.db_manager.connection() as conn:
+                cursor = conn.execute(f"""
+                    UPDATE articles SET pub_ts = {PUB_TS_SQL.format(column='pub_date')}
+                    WHERE id > ? AND id <= ? AND pub_ts IS NULL
+                """, (start, start + BACKFILL_CHUNK_SIZE))
+                updated += cursor.rowcount
+        logger.info(f"  ➕ pub_ts calculé pour {updated} articles")
+        
+        indices = [
+            ("idx_articles_pub_ts", "articles", "pub_ts"),
+            ("idx_articles_feed_pub_ts", "articles", "feed_url, pub_ts"),
+            ("idx_theme_analyses_theme_conf_article", "theme_analyses", "theme_id, confidence, article_id"),
+        ]
+        with self.db_manager.connection() as conn:
+            for idx_name, table_name, columns in indices:
+                conn.execute(f"CREATE INDEX IF NOT EXISTS {idx_name} ON {table_name}({columns})")
+                logger.info(f"  ➕ Index créé: {idx_name}")
+    
     def get_migration_status(self) -> dict:
         """Retourne le statut des migrations"""
         conn = self.db_manager.get_connection()
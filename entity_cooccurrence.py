@@ -0,0 +1,291 @@
+# Flask/entity_cooccurrence.py
+"""
+Matrice creuse des co-occurrences d'entités par jour
+(entité, entité, jour) -> nombre d'articles, tenue à jour par différence à
+chaque stockage d'entités ; classement des voisins par nombre d'articles,
+PMI ou lift sur une fenêtre de jours quelconque
+"""
+
+import json
+import logging
+import math
+from collections import Counter
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+from .database import DatabaseManager
+
+logger = logging.getLogger(__name__)
+
+RANKINGS = ('count', 'pmi', 'lift')
+
+# Co-occurrences minimales d'une paire classée par PMI/lift (paires rares)
+MIN_PAIR_COUNT = 2
+
+# Paires d'entités co-citées exposées comme relations (source, cible)
+RELATION_TYPES = [('location', 'organization'), ('organization', 'person')]
+
+# Ensemble (identifiants, jours) passé en un seul paramètre JSON
+_JSON_SET = "(SELECT value FROM json_each(?))"
+
+
+def day_window(days: int, end: Optional[date] = None) -> List[str]:
+    """Jours (AAAA-MM-JJ) des `days` derniers jours, aujourd'hui compris"""
+    end = end or datetime.now().date()
+    return [(end - timedelta(days=offset)).isoformat() for offset in range(days, -1, -1)]
+
+
+class EntityCooccurrenceMatrix:
+    """
+    Stockage symétrique : chaque paire est enregistrée dans les deux sens.
+    Clé primaire (day, entity_id, other_id), sans autre index : une fenêtre
+    est une liste de jours, les voisins d'une entité une recherche par jour.
+    Les effectifs par entité et par jour sont ceux d'entity_temporal_stats ;
+    le nombre d'articles par jour est tenu dans entity_daily_articles.
+    """
+
+    def __init__(self, db_manager: DatabaseManager):
+        self.db_manager = db_manager
+        self._init_tables()
+
+    def _init_tables(self):
+        with self.db_manager.connection() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            created = conn.execute("""
+                SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'entity_cooccurrence_daily'
+            """).fetchone() is None
+
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS entity_cooccurrence_daily (
+                    entity_id INTEGER NOT NULL,
+                    other_id INTEGER NOT NULL,
+                    day TEXT NOT NULL,
+                    article_count INTEGER NOT NULL,
+                    PRIMARY KEY (day, entity_id, other_id)
+                ) WITHOUT ROWID
+            """)
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS entity_daily_articles (
+                    day TEXT PRIMARY KEY,
+                    article_count INTEGER NOT NULL
+                )
+            """)
+
+            if created:
+                counts = self._rebuild(conn)
+                logger.info(f"✅ Matrice de co-occurrences initialisée : {counts['cells']} cellules, "
+                            f"{counts['days']} jours")
+
+    # ------------------------------------------------------------------
+    # Mise à jour
+    # ------------------------------------------------------------------
+
+    def rebuild(self) -> Dict[str, int]:
+        """Recalcule la matrice depuis article_entities"""
+        with self.db_manager.connection() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            counts = self._rebuild(conn)
+        logger.info(f"✅ Matrice de co-occurrences reconstruite : {counts['cells']} cellules")
+        return counts
+
+    def _rebuild(self, conn) -> Dict[str, int]:
+        conn.execute("DELETE FROM entity_cooccurrence_daily")
+        conn.execute("DELETE FROM entity_daily_articles")
+        cells = conn.execute("""
+            INSERT INTO entity_cooccurrence_daily (entity_id, other_id, day, article_count)
+            SELECT x.entity_id, y.entity_id, DATE(a.pub_date), COUNT(*)
+            FROM article_entities x
+            JOIN article_entities y ON y.article_id = x.article_id AND y.entity_id <> x.entity_id
+            JOIN articles a ON a.id = x.article_id
+            WHERE DATE(a.pub_date) IS NOT NULL
+            GROUP BY x.entity_id, y.entity_id, DATE(a.pub_date)
+        """).rowcount
+        days = conn.execute("""
+            INSERT INTO entity_daily_articles (day, article_count)
+            SELECT DATE(a.pub_date), COUNT(DISTINCT ae.article_id)
+            FROM article_entities ae
+            JOIN articles a ON a.id = ae.article_id
+            WHERE DATE(a.pub_date) IS NOT NULL
+            GROUP BY DATE(a.pub_date)
+        """).rowcount
+        return {'cells': cells, 'days': days}
+
+    def apply_deltas(self, cursor, pair_deltas: Counter, article_deltas: Counter):
+        """
+        Applique des différences dans la transaction de l'appelant
+
+        Args:
+            pair_deltas: (jour, entity1_id, entity2_id) -> variation du nombre d'articles
+            article_deltas: jour -> variation du nombre d'articles ayant des entités
+        """
+        cells = []
+        for (day, entity1_id, entity2_id), delta in pair_deltas.items():
+            if delta:
+                cells.append((entity1_id, entity2_id, day, delta))
+                cells.append((entity2_id, entity1_id, day, delta))
+        # Dans l'ordre de la clé primaire : écritures groupées par page
+        cells.sort(key=lambda cell: (cell[2], cell[0], cell[1]))
+        cursor.executemany("""
+            INSERT INTO entity_cooccurrence_daily (entity_id, other_id, day, article_count)
+            VALUES (?, ?, ?, ?)
+            ON CONFLICT(day, entity_id, other_id) DO UPDATE SET
+                article_count = article_count + excluded.article_count
+        """, cells)
+
+        removed = sorted({day for _, _, day, delta in cells if delta < 0})
+        if removed:
+            cursor.execute(f"""
+                DELETE FROM entity_cooccurrence_daily
+                WHERE day IN {_JSON_SET} AND article_count <= 0
+            """, (json.dumps(removed),))
+
+        cursor.executemany("""
+            INSERT INTO entity_daily_articles (day, article_count) VALUES (?, ?)
+            ON CONFLICT(day) DO UPDATE SET article_count = article_count + excluded.article_count
+        """, [(day, delta) for day, delta in article_deltas.items() if delta])
+        if any(delta < 0 for delta in article_deltas.values()):
+            cursor.execute("DELETE FROM entity_daily_articles WHERE article_count <= 0")
+
+    # ------------------------------------------------------------------
+    # Requêtes
+    # ------------------------------------------------------------------
+
+    def article_total(self, window: List[str]) -> int:
+        """Articles ayant au moins une entité sur la fenêtre"""
+        rows = self.db_manager.execute_query("""
+            SELECT COALESCE(SUM(article_count), 0) FROM entity_daily_articles
+            WHERE day BETWEEN ? AND ?
+        """, (window[0], window[-1]))
+        return rows[0][0]
+
+    def entity_counts(self, window: List[str], category: Optional[str] = None,
+                      limit: Optional[int] = None) -> List[Tuple[str, int]]:
+        """(texte, articles) des entités citées sur la fenêtre, plus citées d'abord"""
+        rows = self.db_manager.execute_query(f"""
+            SELECT e.entity_text, SUM(s.mention_count) AS n
+            FROM entity_temporal_stats s
+            JOIN geopolitical_entities e ON e.id = s.entity_id
+            WHERE s.date BETWEEN ? AND ? {'AND e.category = ?' if category else ''}
+            GROUP BY e.entity_text
+            ORDER BY n DESC, e.entity_text
+            {'LIMIT ?' if limit else ''}
+        """, tuple([window[0], window[-1]] + ([category] if category else []) + ([limit] if limit else [])))
+        return [(row[0], row[1]) for row in rows]
+
+    def _ranked(self, pairs_sql: str, params: List[Any], window: List[str],
+                k: int, rank: str, min_count: Optional[int]) -> List[Dict[str, Any]]:
+        """
+        Classe les paires de `pairs_sql` (entity_id, other_id, c) ; PMI et
+        lift croissent ensemble, le tri SQL se fait sur le lift
+        """
+        if rank not in RANKINGS:
+            raise ValueError(f"Classement inconnu: {rank} (disponibles: {', '.join(RANKINGS)})")
+        total = self.article_total(window)
+        if min_count is None:
+            min_count = 1 if rank == 'count' else MIN_PAIR_COUNT
+        order = 'p.c DESC' if rank == 'count' else 'lift DESC, p.c DESC'
+
+        rows = self.db_manager.execute_query(f"""
+            WITH pairs AS ({pairs_sql}),
+            margins AS (
+                SELECT entity_id, SUM(mention_count) AS n
+                FROM entity_temporal_stats
+                WHERE date BETWEEN ? AND ?
+                  AND entity_id IN (SELECT entity_id FROM pairs UNION SELECT other_id FROM pairs)
+                GROUP BY entity_id
+            )
+            SELECT p.entity_id, s.entity_text, s.category, p.other_id, t.entity_text, t.category,
+                   p.c, ms.n, mt.n, (p.c * ?) / (ms.n * mt.n * 1.0) AS lift
+            FROM pairs p
+            JOIN margins ms ON ms.entity_id = p.entity_id
+            JOIN margins mt ON mt.entity_id = p.other_id
+            JOIN geopolitical_entities s ON s.id = p.entity_id
+            JOIN geopolitical_entities t ON t.id = p.other_id
+            WHERE p.c >= ?
+            ORDER BY {order}, p.entity_id, p.other_id
+            LIMIT ?
+        """, tuple(params + [window[0], window[-1], total, min_count, k]))
+
+        return [
+            {
+                'source_id': row[0], 'source': row[1], 'source_category': row[2],
+                'target_id': row[3], 'target': row[4], 'target_category': row[5],
+                'count': row[6], 'source_count': row[7], 'target_count': row[8],
+                'lift': round(row[9], 4),
+                'pmi': round(math.log2(row[9]), 4) if row[9] > 0 else None
+            }
+            for row in rows
+        ]
+
+    def neighbours(self, entity_id: int, days: int = 7, k: int = 20, rank: str = 'count',
+                   min_count: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Entités les plus associées à `entity_id` sur les `days` derniers jours"""
+        window = day_window(days)
+        return self._ranked(f"""
+            SELECT entity_id, other_id, SUM(article_count) AS c
+            FROM entity_cooccurrence_daily
+            WHERE day IN {_JSON_SET} AND entity_id = ?
+            GROUP BY other_id
+        """, [json.dumps(window), entity_id], window, k, rank, min_count)
+
+    def _typed_pairs_sql(self, relation_types: List[Tuple[str, str]]) -> Tuple[str, List[Any]]:
+        pair_filter = ' OR '.join("(s.category = ? AND t.category = ?)" for _ in relation_types)
+        params = [value for relation in relation_types for value in relation]
+        return f"""
+            SELECT m.entity_id, m.other_id, SUM(m.article_count) AS c
+            FROM entity_cooccurrence_daily m
+            JOIN geopolitical_entities s ON s.id = m.entity_id
+            JOIN geopolitical_entities t ON t.id = m.other_id
+            WHERE m.day IN {_JSON_SET} AND ({pair_filter})
+            GROUP BY m.entity_id, m.other_id
+        """, params
+
+    def top_pairs(self, days: int = 7, k: int = 50, rank: str = 'count',
+                  relation_types: Optional[List[Tuple[str, str]]] = None,
+                  min_count: Optional[int] = None) -> List[Dict[str, Any]]:
+        """
+        Paires les plus associées sur la fenêtre ; avec relation_types,
+        seules les paires (catégorie source, catégorie cible) listées
+        """
+        window = day_window(days)
+        if relation_types:
+            pairs_sql, type_params = self._typed_pairs_sql(relation_types)
+            params = [json.dumps(window)] + type_params
+        else:
+            pairs_sql = f"""
+                SELECT entity_id, other_id, SUM(article_count) AS c
+                FROM entity_cooccurrence_daily
+                WHERE day IN {_JSON_SET} AND entity_id < other_id
+                GROUP BY entity_id, other_id
+            """
+            params = [json.dumps(window)]
+        return self._ranked(pairs_sql, params, window, k, rank, min_count)
+
+    def pair_count(self, days: int = 7, relation_types: List[Tuple[str, str]] = RELATION_TYPES) -> int:
+        """Nombre de paires distinctes co-citées sur la fenêtre"""
+        pairs_sql, type_params = self._typed_pairs_sql(relation_types)
+        rows = self.db_manager.execute_query(f"SELECT COUNT(*) FROM ({pairs_sql})",
+                                             tuple([json.dumps(day_window(days))] + type_params))
+        return rows[0][0]
+
+    def network(self, days: int = 7, top_n: int = 20) -> Dict[str, Any]:
+        """
+        Entités et relations lieu-organisation les plus citées sur la fenêtre,
+        densité = paires observées / paires possibles
+        """
+        window = day_window(days)
+        locations = self.entity_counts(window, 'location')
+        organizations = self.entity_counts(window, 'organization')
+        relation = [('location', 'organization')]
+
+        return {
+            'top_locations': locations[:top_n],
+            'top_organizations': organizations[:top_n],
+            'top_persons': self.entity_counts(window, 'person', top_n),
+            'top_relations': [
+                ((pair['source'], pair['target']), pair['count'])
+                for pair in self.top_pairs(days, top_n, 'count', relation)
+            ],
+            'total_articles_analyzed': self.article_total(window),
+            'network_density': self.pair_count(days, relation) / max(len(locations) * len(organizations), 1)
+        }
@@ -1,12 +1,26 @@
 # Flask/entity_database_manager.py - Gestion BDD pour entités géopolitiques
 import logging
-from typing import List, Dict, Any, Optional
+from collections import Counter, defaultdict
+from typing import List, Dict, Any, Optional, Tuple
 from datetime import datetime
 import json
 from .database import DatabaseManager
+from .entity_cooccurrence import EntityCooccurrenceMatrix
 
 logger = logging.getLogger(__name__)
 
+# Clés du résultat de l'extracteur -> catégorie stockée
+CATEGORY_MAP = {
+    'locations': 'location',
+    'organizations': 'organization',
+    'persons': 'person',
+    'events': 'event',
+    'groups': 'group'
+}
+
+# Ensemble d'identifiants passé en un seul paramètre JSON
+_IDS = "(SELECT value FROM json_each(?))"
+
 class EntityDatabaseManager:
     """
     Gestionnaire de base de données pour les entités géopolitiques
@@ -16,6 +30,7 @@ class EntityDatabaseManager:
     def __init__(self, db_manager: DatabaseManager):
         self.db_manager = db_manager
         self._init_tables()
+        self.cooccurrence = EntityCooccurrenceMatrix(db_manager)
     
     def _init_tables(self):
         """Crée les tables pour les entités géopolitiques"""
@@ -82,6 +97,18 @@ class EntityDatabaseManager:
             )
         """)
         
+        # Extraction effectuée par article : empreinte du texte et version du modèle
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS article_entity_extractions (
+                article_id INTEGER PRIMARY KEY,
+                content_hash TEXT NOT NULL,
+                model_version TEXT NOT NULL,
+                entity_count INTEGER DEFAULT 0,
+                extracted_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+                FOREIGN KEY (article_id) REFERENCES articles(id) ON DELETE CASCADE
+            )
+        """)
+        
         # Index pour performances
         cursor.execute("CREATE INDEX IF NOT EXISTS idx_entities_text ON geopolitical_entities(entity_text)")
         cursor.execute("CREATE INDEX IF NOT EXISTS idx_entities_type ON geopolitical_entities(entity_type)")
@@ -95,133 +122,255 @@ class EntityDatabaseManager:
         conn.close()
         logger.info("✅ Tables d'entités géopolitiques créées")
     
-    def store_article_entities(self, article_id: int, entities: Dict[str, Any]) -> bool:
+    def store_article_entities(self, article_id: int, entities: Dict[str, Any],
+                               content_hash: Optional[str] = None,
+                               model_version: Optional[str] = None) -> bool:
         """
         Stocke les entités extraites d'un article
         
+        Les entités déjà liées à l'article (extraction précédente) sont
+        d'abord retirées, compteurs compris : ré-extraire ne compte pas
+        deux fois. Avec content_hash et model_version, l'extraction est
+        enregistrée et ne sera pas refaite tant qu'ils ne changent pas.
+        
         Args:
             article_id: ID de l'article
             entities: Dictionnaire d'entités (résultat de GeopoliticalEntityExtractor)
+            content_hash: Empreinte du texte analysé
+            model_version: Version du modèle d'extraction
             
         Returns:
             True si succès
         """
-        try:
-            conn = self.db_manager.get_connection()
-            cursor = conn.cursor()
-            
-            entity_ids = []
-            
-            # Mapper catégories
-            category_map = {
-                'locations': 'location',
-                'organizations': 'organization',
-                'persons': 'person',
-                'events': 'event',
-                'groups': 'group'
-            }
+        return self.store_entities_batch([(article_id, entities, content_hash, model_version)])
+    
+    def store_entities_batch(self, batch: List[Tuple[int, Dict[str, Any], Optional[str], Optional[str]]]) -> bool:
+        """
+        Stocke les entités d'un lot d'articles en une transaction
+        
+        Ancien et nouvel état des liens article-entité sont comparés en
+        Python ; seules les différences agrégées (occurrences, paires
+        co-citées, mentions par jour) sont écrites, par executemany.
+        Les entités passent par une table temporaire : un upsert et une
+        jointure résolvent tous les identifiants.
+        
+        Args:
+            batch: (article_id, entités, content_hash, model_version) par article
             
-            # Traiter chaque catégorie
-            for category_key, entity_list in entities.items():
-                if category_key == 'all_entities':
-                    continue
+        Returns:
+            True si succès (le lot entier est annulé en cas d'erreur)
+        """
+        if not batch:
+            return True
+        
+        try:
+            with self.db_manager.connection() as conn:
+                conn.execute("BEGIN IMMEDIATE")
+                cursor = conn.cursor()
+                article_ids = [article_id for article_id, _, _, _ in batch]
+                ids_json = json.dumps(article_ids)
                 
-                category = category_map.get(category_key, 'other')
+                # Liens actuels (extraction précédente) des articles du lot
+                cursor.execute(f"""
+                    SELECT article_id, entity_id FROM article_entities
+                    WHERE article_id IN {_IDS}
+                """, (ids_json,))
+                old_links = defaultdict(list)
+                for article_id, entity_id in cursor.fetchall():
+                    old_links[article_id].append(entity_id)
                 
-                for entity in entity_list:
-                    entity_text = entity['text']
-                    entity_type = entity['label']
-                    
-                    # Insérer ou mettre à jour l'entité
-                    cursor.execute("""
-                        INSERT INTO geopolitical_entities 
-                        (entity_text, entity_type, category, last_seen, occurrence_count)
-                        VALUES (?, ?, ?, CURRENT_TIMESTAMP, 1)
-                        ON CONFLICT(entity_text, entity_type) DO UPDATE SET
-                            last_seen = CURRENT_TIMESTAMP,
-                            occurrence_count = occurrence_count + 1
-                    """, (entity_text, entity_type, category))
-                    
-                    # Récupérer l'ID de l'entité
-                    cursor.execute("""
-                        SELECT id FROM geopolitical_entities
-                        WHERE entity_text = ? AND entity_type = ?
-                    """, (entity_text, entity_type))
-                    
-                    entity_id = cursor.fetchone()[0]
-                    entity_ids.append(entity_id)
-                    
-                    # Lier à l'article
-                    cursor.execute("""
-                        INSERT OR IGNORE INTO article_entities
-                        (article_id, entity_id, position_start, position_end, context)
-                        VALUES (?, ?, ?, ?, ?)
-                    """, (
-                        article_id,
-                        entity_id,
-                        entity.get('start', -1),
-                        entity.get('end', -1),
-                        entity.get('context', '')[:500]  # Limiter contexte
-                    ))
-            
-            # Créer les relations (co-occurrence)
-            self._create_relations(cursor, entity_ids, article_id)
-            
-            # Mettre à jour statistiques temporelles
-            self._update_temporal_stats(cursor, entity_ids, article_id)
-            
-            conn.commit()
-            conn.close()
+                # Nouvelles entités, dédoublonnées par article
+                new_mentions = {}
+                staged = {}
+                for article_id, entities, _, _ in batch:
+                    mentions = {}
+                    for category_key, entity_list in entities.items():
+                        if category_key == 'all_entities':
+                            continue
+                        category = CATEGORY_MAP.get(category_key, 'other')
+                        for entity in entity_list:
+                            key = (entity['text'], entity['label'])
+                            if key not in mentions:
+                                mentions[key] = entity
+                                staged.setdefault(key, category)
+                    new_mentions[article_id] = mentions
+                
+                entity_ids = self._upsert_entities(cursor, staged)
+                new_links = {
+                    article_id: [entity_ids[key] for key in mentions]
+                    for article_id, mentions in new_mentions.items()
+                }
+                
+                cursor.execute(f"""
+                    SELECT id, DATE(pub_date), COALESCE(sentiment_score, 0)
+                    FROM articles WHERE id IN {_IDS}
+                """, (ids_json,))
+                article_days = {row[0]: (row[1], row[2]) for row in cursor.fetchall()}
+                
+                occurrence_deltas = Counter()
+                pair_deltas = Counter()
+                temporal_deltas = defaultdict(lambda: [0, 0.0])
+                daily_pair_deltas = Counter()
+                daily_article_deltas = Counter()
+                for links, sign in ((old_links, -1), (new_links, 1)):
+                    for article_id, ids in links.items():
+                        ids = sorted(set(ids))
+                        day = article_days.get(article_id, (None, 0))
+                        if day[0] and ids:
+                            daily_article_deltas[day[0]] += sign
+                        for i, entity_id in enumerate(ids):
+                            occurrence_deltas[entity_id] += sign
+                            for other_id in ids[i + 1:]:
+                                pair_deltas[(entity_id, other_id)] += sign
+                                if day[0]:
+                                    daily_pair_deltas[(day[0], entity_id, other_id)] += sign
+                            if day[0]:
+                                delta = temporal_deltas[(entity_id, day[0])]
+                                delta[0] += sign
+                                delta[1] += sign * day[1]
+                
+                # Liens article-entité
+                cursor.execute(f"DELETE FROM article_entities WHERE article_id IN {_IDS}", (ids_json,))
+                cursor.executemany("""
+                    INSERT INTO article_entities
+                    (article_id, entity_id, position_start, position_end, context)
+                    VALUES (?, ?, ?, ?, ?)
+                """, [
+                    (article_id, entity_ids[key], entity.get('start', -1), entity.get('end', -1),
+                     (entity.get('context') or '')[:500])  # Limiter contexte
+                    for article_id, mentions in new_mentions.items()
+                    for key, entity in mentions.items()
+                ])
+                
+                cursor.executemany("""
+                    UPDATE geopolitical_entities
+                    SET occurrence_count = occurrence_count + ?
+                    WHERE id = ?
+                """, [(delta, entity_id) for entity_id, delta in occurrence_deltas.items() if delta])
+                
+                # Créer les relations (co-occurrence)
+                self._apply_relation_deltas(cursor, pair_deltas)
+                
+                # Mettre à jour statistiques temporelles et co-occurrences par jour
+                self._apply_temporal_deltas(cursor, temporal_deltas)
+                self.cooccurrence.apply_deltas(cursor, daily_pair_deltas, daily_article_deltas)
+                
+                cursor.executemany("""
+                    INSERT OR REPLACE INTO article_entity_extractions
+                    (article_id, content_hash, model_version, entity_count, extracted_at)
+                    VALUES (?, ?, ?, ?, CURRENT_TIMESTAMP)
+                """, [
+                    (article_id, content_hash, model_version, len(new_links[article_id]))
+                    for article_id, _, content_hash, model_version in batch
+                    if content_hash is not None
+                ])
             
-            logger.info(f"✅ {len(entity_ids)} entités stockées pour article {article_id}")
+            stored = sum(len(ids) for ids in new_links.values())
+            logger.info(f"✅ {stored} entités stockées pour {len(batch)} article(s)")
             return True
             
         except Exception as e:
-            logger.error(f"❌ Erreur stockage entités article {article_id}: {e}")
+            logger.error(f"❌ Erreur stockage entités articles {article_ids[:5]}...: {e}")
             return False
     
-    def _create_relations(self, cursor, entity_ids: List[int], article_id: int):
-        """Crée les relations de co-occurrence entre entités"""
-        for i, entity1_id in enumerate(entity_ids):
-            for entity2_id in entity_ids[i+1:]:
-                # Toujours mettre le plus petit ID en premier
-                if entity1_id > entity2_id:
-                    entity1_id, entity2_id = entity2_id, entity1_id
-                
-                cursor.execute("""
-                    INSERT INTO entity_relations
-                    (entity1_id, entity2_id, article_count, updated_at)
-                    VALUES (?, ?, 1, CURRENT_TIMESTAMP)
-                    ON CONFLICT(entity1_id, entity2_id, relation_type) DO UPDATE SET
-                        article_count = article_count + 1,
-                        strength = strength + 0.1,
-                        updated_at = CURRENT_TIMESTAMP
-                """, (entity1_id, entity2_id))
-    
-    def _update_temporal_stats(self, cursor, entity_ids: List[int], article_id: int):
-        """Met à jour les statistiques temporelles"""
-        # Récupérer date et sentiment de l'article
+    def _upsert_entities(self, cursor, staged: Dict[tuple, str]) -> Dict[tuple, int]:
+        """Insère les entités absentes et retourne {(texte, label): id}"""
         cursor.execute("""
-            SELECT DATE(pub_date), sentiment_score
-            FROM articles
-            WHERE id = ?
-        """, (article_id,))
+            CREATE TEMP TABLE IF NOT EXISTS entity_stage (
+                entity_text TEXT NOT NULL,
+                entity_type TEXT NOT NULL,
+                category TEXT NOT NULL,
+                PRIMARY KEY (entity_text, entity_type)
+            )
+        """)
+        cursor.execute("DELETE FROM entity_stage")
+        cursor.executemany(
+            "INSERT INTO entity_stage (entity_text, entity_type, category) VALUES (?, ?, ?)",
+            [(text, label, category) for (text, label), category in staged.items()]
+        )
         
-        row = cursor.fetchone()
-        if not row:
-            return
-        
-        date, sentiment = row
-        
-        for entity_id in entity_ids:
-            cursor.execute("""
-                INSERT INTO entity_temporal_stats
-                (entity_id, date, mention_count, sentiment_avg)
-                VALUES (?, ?, 1, ?)
-                ON CONFLICT(entity_id, date) DO UPDATE SET
-                    mention_count = mention_count + 1,
-                    sentiment_avg = ((sentiment_avg * (mention_count - 1)) + ?) / mention_count
-            """, (entity_id, date, sentiment, sentiment))
+        # occurrence_count est ensuite ajusté par différence
+        cursor.execute("""
+            INSERT INTO geopolitical_entities
+            (entity_text, entity_type, category, last_seen, occurrence_count)
+            SELECT entity_text, entity_type, category, CURRENT_TIMESTAMP, 0
+            FROM entity_stage WHERE true
+            ON CONFLICT(entity_text, entity_type) DO UPDATE SET
+                last_seen = CURRENT_TIMESTAMP
+        """)
+        cursor.execute("""
+            SELECT s.entity_text, s.entity_type, e.id
+            FROM entity_stage s
+            JOIN geopolitical_entities e
+              ON e.entity_text = s.entity_text AND e.entity_type = s.entity_type
+        """)
+        return {(row[0], row[1]): row[2] for row in cursor.fetchall()}
+    
+    def get_extraction_states(self, article_ids: List[int]) -> Dict[int, tuple]:
+        """(content_hash, model_version) des articles déjà traités"""
+        states = {}
+        for i in range(0, len(article_ids), 500):
+            chunk = article_ids[i:i + 500]
+            placeholders = ','.join('?' * len(chunk))
+            rows = self.db_manager.execute_query(f"""
+                SELECT article_id, content_hash, model_version
+                FROM article_entity_extractions
+                WHERE article_id IN ({placeholders})
+            """, tuple(chunk))
+            states.update({row[0]: (row[1], row[2]) for row in rows})
+        return states
+    
+    def _apply_relation_deltas(self, cursor, pair_deltas: Counter):
+        """
+        Ajoute les co-occurrences (plus petit ID en premier) ; la force
+        vaut 1.0 pour un article, +0.1 par article supplémentaire
+        """
+        deltas = [(entity1_id, entity2_id, delta, 0.9 + 0.1 * delta)
+                  for (entity1_id, entity2_id), delta in pair_deltas.items() if delta]
+        cursor.executemany("""
+            INSERT INTO entity_relations
+            (entity1_id, entity2_id, article_count, strength, updated_at)
+            VALUES (?, ?, ?, ?, CURRENT_TIMESTAMP)
+            ON CONFLICT(entity1_id, entity2_id, relation_type) DO UPDATE SET
+                article_count = article_count + excluded.article_count,
+                strength = strength + 0.1 * excluded.article_count,
+                updated_at = CURRENT_TIMESTAMP
+        """, deltas)
+        
+        removed = sorted({entity1_id for entity1_id, _, delta, _ in deltas if delta < 0})
+        if removed:
+            cursor.execute(f"""
+                DELETE FROM entity_relations
+                WHERE article_count <= 0 AND entity1_id IN {_IDS}
+            """, (json.dumps(removed),))
+    
+    def _apply_temporal_deltas(self, cursor, temporal_deltas: Dict[tuple, list]):
+        """
+        Mentions par entité et par jour ; sentiment_avg est la moyenne
+        exacte des articles (sentiment absent compté comme neutre)
+        """
+        # Un article ré-extrait peut changer les mentions d'un jour sans
+        # changer leur nombre : compte et somme des sentiments sont distincts
+        deltas = [(entity_id, date, count, total)
+                  for (entity_id, date), (count, total) in temporal_deltas.items() if count or total]
+        cursor.executemany("""
+            INSERT OR IGNORE INTO entity_temporal_stats (entity_id, date, mention_count)
+            VALUES (?, ?, 0)
+        """, [(entity_id, date) for entity_id, date, _, _ in deltas])
+        cursor.executemany("""
+            UPDATE entity_temporal_stats
+            SET sentiment_avg = CASE WHEN mention_count + ?1 > 0 THEN
+                    (COALESCE(sentiment_avg, 0) * mention_count + ?2) / (mention_count + ?1) END,
+                mention_count = mention_count + ?1
+            WHERE entity_id = ?3 AND date = ?4
+        """, [(count, total, entity_id, date) for entity_id, date, count, total in deltas])
+        
+        removed = sorted({entity_id for entity_id, _, count, _ in deltas if count < 0})
+        if removed:
+            cursor.execute(f"""
+                DELETE FROM entity_temporal_stats
+                WHERE mention_count <= 0 AND entity_id IN {_IDS}
+            """, (json.dumps(removed),))
     
     def get_entity_statistics(self, entity_text: str) -> Dict[str, Any]:
         """
@@ -1,8 +1,10 @@
 # Flask/entity_routes.py - Routes API pour entités géopolitiques
-from flask import Blueprint, jsonify, request
+from flask import Blueprint, current_app, jsonify, request
 import logging
 from typing import Optional
 
+from .article_entity_cache import ArticleEntityCache
+
 logger = logging.getLogger(__name__)
 
 def register_entity_routes(app, db_manager, entity_extractor, entity_db_manager):
@@ -16,6 +18,8 @@ def register_entity_routes(app, db_manager, entity_extractor, entity_db_manager)
         entity_db_manager: EntityDatabaseManager
     """
     
+    entity_cache = ArticleEntityCache(entity_extractor, entity_db_manager)
+    
     @app.route('/api/entities/extract', methods=['POST'])
     def extract_entities():
         """Extrait les entités d'un texte donné"""
@@ -76,8 +80,12 @@ def register_entity_routes(app, db_manager, entity_extractor, entity_db_manager)
             full_text = f"{article['title']}. {article['content']}"
             entities = entity_extractor.extract_entities(full_text)
             
-            # Stocker en base
-            success = entity_db_manager.store_article_entities(article_id, entities)
+            # Stocker en base (l'extraction est enregistrée dans le cache)
+            success = entity_db_manager.store_article_entities(
+                article_id, entities,
+                content_hash=entity_cache.content_hash(article),
+                model_version=entity_extractor.model_version
+            )
             
             if success:
                 return jsonify({
@@ -95,48 +103,35 @@ def register_entity_routes(app, db_manager, entity_extractor, entity_db_manager)
     
     @app.route('/api/entities/batch-analyze', methods=['POST'])
     def batch_analyze_articles():
-        """Analyse en masse les articles non traités"""
+        """
+        Analyse en masse les articles non traités (absents du cache
+        d'entités, modifiés ou extraits par une autre version du modèle)
+        
+        Body JSON:
+            - limit: nombre maximal d'articles (défaut: 100, null = tous)
+            - async: true pour lancer le rattrapage en tâche de fond (202)
+        """
         try:
             data = request.get_json() or {}
             limit = data.get('limit', 100)
             
-            # Récupérer articles sans entités
-            conn = db_manager.get_connection()
-            cursor = conn.cursor()
-            
-            cursor.execute("""
-                SELECT a.id, a.title, a.content
-                FROM articles a
-                LEFT JOIN article_entities ae ON a.id = ae.article_id
-                WHERE ae.id IS NULL
-                LIMIT ?
-            """, (limit,))
-            
-            articles = cursor.fetchall()
-            conn.close()
-            
-            processed = 0
-            errors = 0
+            job_queue = current_app.config.get('JOB_QUEUE')
+            if job_queue is not None and data.get('async'):
+                job, created = job_queue.submit('entity_backfill', {'limit': limit})
+                return jsonify({
+                    'success': True,
+                    'reused': not created,
+                    'job': job,
+                    'status_url': f"/api/jobs/{job['id']}"
+                }), 202
             
-            for article_id, title, content in articles:
-                try:
-                    full_text = f"{title}. {content}"
-                    entities = entity_extractor.extract_entities(full_text)
-                    
-                    if entity_db_manager.store_article_entities(article_id, entities):
-                        processed += 1
-                    else:
-                        errors += 1
-                
-                except Exception as e:
-                    logger.error(f"Erreur traitement article {article_id}: {e}")
-                    errors += 1
+            stats = entity_cache.backfill(limit=limit)
             
             return jsonify({
                 'success': True,
-                'processed': processed,
-                'errors': errors,
-                'total': len(articles)
+                'processed': stats['extracted'],
+                'errors': stats['errors'],
+                'total': stats['extracted'] + stats['errors']
             })
         
         except Exception as e:
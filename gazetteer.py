@@ -0,0 +1,192 @@
+# Flask/gazetteer.py
+"""
+Gazetteer d'entités géopolitiques connues (pays, organisations, dirigeants)
+Fichier JSON externe rechargé à chaud ; les alias sont compilés une fois en
+table de phrases indexée par premier mot : le coût d'une recherche dépend
+de la longueur du texte, pas du nombre d'alias
+"""
+
+import json
+import logging
+import os
+import re
+import threading
+import time
+import unicodedata
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_GAZETTEER_PATH = os.getenv(
+    'GEOPOL_GAZETTEER_PATH',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'instance', 'geopolitical_gazetteer.json')
+)
+
+# Intervalle minimal entre deux vérifications de la date du fichier (secondes)
+RELOAD_CHECK_INTERVAL = 5.0
+
+_WORD_RE = re.compile(r'\w+')
+
+# Séparateurs admis entre les mots d'un même alias (« États-Unis », « l'ONU »)
+_JOINER_RE = re.compile(r"[\s\-'’]*")
+
+
+def _accent_table() -> Dict[int, str]:
+    """Lettres accentuées latines -> lettre de base (un caractère pour un)"""
+    table = {}
+    for code in range(0xC0, 0x250):
+        base = unicodedata.normalize('NFD', chr(code))[0]
+        if base != chr(code) and base.isascii():
+            table[code] = base
+    return table
+
+
+_ACCENTS = _accent_table()
+
+
+def fold(text: str) -> str:
+    """
+    Minuscules sans accents, à longueur égale : les positions dans le texte
+    replié sont celles du texte d'origine
+    """
+    folded = text.translate(_ACCENTS).lower()
+    if len(folded) != len(text):
+        # Rares minuscules sur plusieurs caractères : repli caractère par caractère
+        folded = ''.join(c.translate(_ACCENTS).lower()[0] for c in text)
+    return folded
+
+
+def _phrase_key(text: str) -> str:
+    return ' '.join(_WORD_RE.findall(fold(text)))
+
+
+class _CompiledGazetteer:
+    """Alias repliés -> entrée, et longueur maximale (en mots) par premier mot"""
+
+    def __init__(self, entries: List[Dict[str, Any]]):
+        self.entries = entries
+        self.phrases: Dict[str, Dict[str, Any]] = {}
+        self.max_words: Dict[str, int] = {}
+
+        for entry in entries:
+            for alias in [entry['text']] + list(entry.get('aliases', [])):
+                key = _phrase_key(alias)
+                if not key:
+                    continue
+                if key in self.phrases and self.phrases[key] is not entry:
+                    logger.debug(f"Alias en double ignoré: {alias} ({entry['text']})")
+                    continue
+                self.phrases[key] = entry
+                words = key.split(' ')
+                self.max_words[words[0]] = max(self.max_words.get(words[0], 0), len(words))
+
+
+class Gazetteer:
+    """
+    Recherche des entités connues dans un texte (plus longs alias d'abord,
+    sans chevauchement, sur des mots entiers)
+
+    Format du fichier :
+        {"entities": [{"text": "États-Unis", "label": "GPE",
+                       "aliases": ["USA", "Amérique"]}, ...]}
+    """
+
+    def __init__(self, path: str = DEFAULT_GAZETTEER_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._signature: Optional[Tuple[int, int]] = None
+        self._next_check = 0.0
+        self._compiled = _CompiledGazetteer([])
+        self.reload()
+
+    def __len__(self) -> int:
+        return len(self._compiled.entries)
+
+    def _file_signature(self) -> Optional[Tuple[int, int]]:
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def reload(self) -> bool:
+        """
+        Relit et recompile le fichier ; en cas d'erreur, la version
+        précédente reste en service
+
+        Returns:
+            True si une nouvelle version a été chargée
+        """
+        with self._lock:
+            self._next_check = time.monotonic() + RELOAD_CHECK_INTERVAL
+            signature = self._file_signature()
+            if signature is None:
+                if self._signature is None:
+                    logger.warning(f"⚠️ Gazetteer introuvable: {self.path}")
+                return False
+            if signature == self._signature:
+                return False
+
+            try:
+                with open(self.path, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+                entries = [
+                    {'text': entry['text'], 'label': entry['label'],
+                     'aliases': list(entry.get('aliases', []))}
+                    for entry in data.get('entities', [])
+                ]
+                compiled = _CompiledGazetteer(entries)
+            except (OSError, ValueError, KeyError, TypeError) as e:
+                logger.error(f"❌ Gazetteer invalide ({self.path}), version précédente conservée: {e}")
+                self._signature = signature
+                return False
+
+            self._compiled = compiled
+            self._signature = signature
+            logger.info(f"✅ Gazetteer chargé : {len(entries)} entités, {len(compiled.phrases)} alias")
+            return True
+
+    def _maybe_reload(self):
+        if time.monotonic() >= self._next_check:
+            self.reload()
+
+    def find(self, text: str) -> Iterator[Dict[str, Any]]:
+        """
+        Entités connues citées dans le texte
+
+        Yields:
+            {'text': nom canonique, 'label', 'start', 'end', 'matched': texte trouvé}
+        """
+        if not text:
+            return
+        self._maybe_reload()
+        compiled = self._compiled
+        if not compiled.phrases:
+            return
+
+        tokens = [(m.start(), m.end(), m.group()) for m in _WORD_RE.finditer(fold(text))]
+        i = 0
+        while i < len(tokens):
+            longest = compiled.max_words.get(tokens[i][2])
+            matched = 0
+            if longest:
+                for length in range(min(longest, len(tokens) - i), 0, -1):
+                    window = tokens[i:i + length]
+                    entry = compiled.phrases.get(' '.join(word for _, _, word in window))
+                    if entry is None:
+                        continue
+                    # Mots de l'alias contigus (pas de ponctuation entre eux)
+                    if any(not _JOINER_RE.fullmatch(text, window[k][1], window[k + 1][0])
+                           for k in range(length - 1)):
+                        continue
+                    start, end = window[0][0], window[-1][1]
+                    yield {
+                        'text': entry['text'],
+                        'label': entry['label'],
+                        'start': start,
+                        'end': end,
+                        'matched': text[start:end]
+                    }
+                    matched = length
+                    break
+            i += matched or 1
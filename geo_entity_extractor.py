@@ -1,13 +1,31 @@
 # Flask/geopolitical_entity_extractor.py - Extraction d'entités géopolitiques
 import spacy
 import logging
-from typing import List, Dict, Any, Set
+import os
+from typing import List, Dict, Any, Iterator, Optional, Set
 from collections import Counter
 from datetime import datetime
 import json
 
+from .gazetteer import Gazetteer, fold
+
 logger = logging.getLogger(__name__)
 
+# Textes tronqués à cette longueur (caractères), en unitaire comme en lot
+MAX_TEXT_LENGTH = 10000
+
+# Documents par lot transmis à nlp.pipe()
+NER_BATCH_SIZE = 64
+
+# En dessous, le coût de démarrage des processus dépasse le gain
+MULTIPROCESS_MIN_TEXTS = 200
+
+# Composants conservés : seule la NER est exploitée (doc.ents)
+NER_COMPONENTS = {'ner', 'entity_ruler'}
+
+# À incrémenter quand la logique d'extraction change (ré-extraction en cache)
+EXTRACTION_VERSION = 2
+
 class GeopoliticalEntityExtractor:
     """
     Extracteur d'entités géopolitiques utilisant SpaCy
@@ -24,38 +42,34 @@ class GeopoliticalEntityExtractor:
         'NORP': 'group'         # Nationalités, groupes religieux/politiques
     }
     
-    # Liste étendue de pays et régions (pour enrichissement)
-    KNOWN_COUNTRIES = {
-        'france', 'états-unis', 'usa', 'chine', 'russie', 'inde', 'japon',
-        'allemagne', 'royaume-uni', 'italie', 'espagne', 'canada', 'mexique',
-        'brésil', 'argentine', 'australie', 'corée du sud', 'iran', 'irak',
-        'syrie', 'israël', 'palestine', 'égypte', 'arabie saoudite', 'turquie',
-        'ukraine', 'pologne', 'suède', 'norvège', 'finlande', 'belgique',
-        'pays-bas', 'suisse', 'autriche', 'portugal', 'grèce', 'hongrie'
-    }
-    
-    # Organisations internationales importantes
-    KNOWN_ORGANIZATIONS = {
-        'onu', 'otan', 'union européenne', 'ue', 'omc', 'fmi', 'banque mondiale',
-        'oms', 'unesco', 'opep', 'g7', 'g20', 'brics', 'asean', 'osce',
-        'conseil de sécurité', 'parlement européen', 'commission européenne'
+    # Catégorie -> clé du résultat
+    CATEGORY_KEYS = {
+        'location': 'locations',
+        'organization': 'organizations',
+        'person': 'persons',
+        'event': 'events',
+        'group': 'groups'
     }
     
-    def __init__(self, model_name: str = "fr_core_news_lg"):
+    def __init__(self, model_name: str = "fr_core_news_lg", gazetteer: Optional[Gazetteer] = None):
         """
         Initialise l'extracteur avec le modèle SpaCy français
         
         Args:
             model_name: Nom du modèle SpaCy à utiliser
+            gazetteer: Entités connues (pays, organisations, dirigeants) ;
+                par défaut instance/geopolitical_gazetteer.json
         """
         self.model_name = model_name
         self.nlp = None
+        self.gazetteer = gazetteer if gazetteer is not None else Gazetteer()
         self._load_model()
     
     def _load_model(self):
         """Charge le modèle SpaCy"""
         try:
             self.nlp = spacy.load(self.model_name)
+            self._disable_unused_pipes()
             logger.info(f"✅ Modèle SpaCy '{self.model_name}' chargé avec succès")
         except OSError:
             logger.error(f"❌ Modèle '{self.model_name}' non trouvé")
@@ -67,11 +81,45 @@ class GeopoliticalEntityExtractor:
                     check=True
                 )
                 self.nlp = spacy.load(self.model_name)
+                self._disable_unused_pipes()
                 logger.info(f"✅ Modèle '{self.model_name}' installé et chargé")
             except Exception as e:
                 logger.error(f"❌ Impossible d'installer le modèle: {e}")
                 raise
     
+    def _disable_unused_pipes(self):
+        """
+        Désactive les composants inutiles à la NER (parser, morphologizer,
+        lemmatizer...) ; un tok2vec partagé écouté par la NER est conservé
+        """
+        keep = set(NER_COMPONENTS)
+        for name, pipe in self.nlp.pipeline:
+            if any(listener in NER_COMPONENTS for listener in getattr(pipe, 'listening_components', [])):
+                keep.add(name)
+        disabled = [name for name in self.nlp.pipe_names if name not in keep]
+        if disabled:
+            self.nlp.select_pipes(disable=disabled)
+            logger.info(f"⚡ Composants SpaCy désactivés (inutiles à la NER): {', '.join(disabled)}")
+    
+    @property
+    def model_version(self) -> str:
+        """Version du modèle et de la logique d'extraction (clé du cache d'entités)"""
+        version = self.nlp.meta.get('version', '?') if self.nlp else 'none'
+        return f"{self.model_name}-{version}/v{EXTRACTION_VERSION}"
+    
+    @staticmethod
+    def prepare_text(text: Optional[str]) -> str:
+        """Tronque le texte à MAX_TEXT_LENGTH, sur une limite de mot"""
+        if not text or len(text) <= MAX_TEXT_LENGTH:
+            return text or ''
+        cut = text.rfind(' ', 0, MAX_TEXT_LENGTH)
+        return text[:cut if cut > 0 else MAX_TEXT_LENGTH]
+    
+    @staticmethod
+    def article_text(article: Dict[str, Any]) -> str:
+        """Texte analysé pour un article : titre puis contenu"""
+        return f"{article.get('title', '')}. {article.get('content', '')}"
+    
     def extract_entities(self, text: str) -> Dict[str, Any]:
         """
         Extrait toutes les entités géopolitiques d'un texte
@@ -86,90 +134,129 @@ class GeopoliticalEntityExtractor:
             return self._empty_result()
         
         try:
-            doc = self.nlp(text)
+            text = self.prepare_text(text)
+            return self._entities_from_doc(self.nlp(text), text)
             
-            entities = {
-                'locations': [],
-                'organizations': [],
-                'persons': [],
-                'events': [],
-                'groups': [],
-                'all_entities': []
-            }
+        except Exception as e:
+            logger.error(f"❌ Erreur extraction entités: {e}")
+            return self._empty_result()
+    
+    def extract_entities_batch(self, texts: List[str], batch_size: int = NER_BATCH_SIZE,
+                               n_process: Optional[int] = None) -> List[Dict[str, Any]]:
+        """
+        Extrait les entités d'une liste de textes via nlp.pipe()
+        
+        Args:
+            texts: Textes à analyser
+            batch_size: Documents par lot
+            n_process: Processus SpaCy (défaut: tous les cœurs au-delà de
+                MULTIPROCESS_MIN_TEXTS textes, sinon 1)
             
-            seen_entities = set()
+        Returns:
+            Un résultat par texte, dans l'ordre, au format de extract_entities()
+        """
+        return list(self.iter_entities_batch(texts, batch_size=batch_size, n_process=n_process))
+    
+    def iter_entities_batch(self, texts: List[str], batch_size: int = NER_BATCH_SIZE,
+                            n_process: Optional[int] = None) -> Iterator[Dict[str, Any]]:
+        """
+        Comme extract_entities_batch(), mais produit les résultats au fil de
+        l'eau : un seul nlp.pipe() (et un seul pool de processus) pour tous
+        les textes, que l'appelant peut enregistrer par tranches
+        """
+        if not self.nlp:
+            for _ in texts:
+                yield self._empty_result()
+            return
+        
+        prepared = [(i, self.prepare_text(text)) for i, text in enumerate(texts) if text]
+        if n_process is None:
+            n_process = (os.cpu_count() or 1) if len(prepared) >= MULTIPROCESS_MIN_TEXTS else 1
+        
+        position, done = 0, 0
+        try:
+            if prepared:
+                docs = self.nlp.pipe((text for _, text in prepared),
+                                     batch_size=batch_size, n_process=n_process)
+                for (i, text), doc in zip(prepared, docs):
+                    result = self._entities_from_doc(doc, text)
+                    for _ in range(i - position):
+                        yield self._empty_result()
+                    yield result
+                    position, done = i + 1, done + 1
+                logger.info(f"🧠 NER par lots: {len(prepared)} textes ({n_process} processus)")
+            
+        except Exception as e:
+            logger.error(f"❌ Erreur extraction par lots, repli unitaire: {e}")
+            for i, text in prepared[done:]:
+                for _ in range(i - position):
+                    yield self._empty_result()
+                yield self.extract_entities(text)
+                position = i + 1
+        
+        for _ in range(len(texts) - position):
+            yield self._empty_result()
+    
+    def _entities_from_doc(self, doc, text: str) -> Dict[str, Any]:
+        """Structure par catégorie à partir d'un Doc SpaCy (+ enrichissement)"""
+        entities = self._empty_result()
+        
+        seen_entities = set()
+        
+        for ent in doc.ents:
+            entity_text = ent.text.strip()
+            entity_lower = entity_text.lower()
             
-            for ent in doc.ents:
-                entity_text = ent.text.strip()
-                entity_lower = entity_text.lower()
-                
-                # Éviter les doublons
-                if entity_lower in seen_entities:
-                    continue
-                seen_entities.add(entity_lower)
-                
-                entity_data = {
-                    'text': entity_text,
-                    'label': ent.label_,
-                    'start': ent.start_char,
-                    'end': ent.end_char
-                }
-                
-                # Catégoriser selon le type SpaCy
-                category = self.ENTITY_CATEGORIES.get(ent.label_, 'other')
-                
-                if category == 'location':
-                    entities['locations'].append(entity_data)
-                elif category == 'organization':
-                    entities['organizations'].append(entity_data)
-                elif category == 'person':
-                    entities['persons'].append(entity_data)
-                elif category == 'event':
-                    entities['events'].append(entity_data)
-                elif category == 'group':
-                    entities['groups'].append(entity_data)
-                
-                entities['all_entities'].append(entity_data)
+            # Éviter les doublons
+            if entity_lower in seen_entities:
+                continue
+            seen_entities.add(entity_lower)
             
-            # Enrichir avec détection personnalisée
-            self._enrich_with_known_entities(text, entities)
+            entity_data = {
+                'text': entity_text,
+                'label': ent.label_,
+                'start': ent.start_char,
+                'end': ent.end_char
+            }
             
-            return entities
+            # Catégoriser selon le type SpaCy
+            category_key = self.CATEGORY_KEYS.get(self.ENTITY_CATEGORIES.get(ent.label_))
+            if category_key:
+                entities[category_key].append(entity_data)
             
-        except Exception as e:
-            logger.error(f"❌ Erreur extraction entités: {e}")
-            return self._empty_result()
+            entities['all_entities'].append(entity_data)
+        
+        # Enrichir avec détection personnalisée
+        self._enrich_with_known_entities(text, entities)
+        
+        return entities
     
     def _enrich_with_known_entities(self, text: str, entities: Dict[str, Any]):
         """
-        Enrichit la détection avec des listes prédéfinies
+        Enrichit la détection avec le gazetteer (mots entiers, sans
+        distinction de casse ni d'accents)
         """
-        text_lower = text.lower()
-        
-        # Détecter pays connus
-        for country in self.KNOWN_COUNTRIES:
-            if country in text_lower:
-                # Vérifier si déjà détecté
-                if not any(e['text'].lower() == country for e in entities['locations']):
-                    entities['locations'].append({
-                        'text': country.title(),
-                        'label': 'GPE',
-                        'start': -1,
-                        'end': -1,
-                        'source': 'enrichment'
-                    })
-        
-        # Détecter organisations connues
-        for org in self.KNOWN_ORGANIZATIONS:
-            if org in text_lower:
-                if not any(e['text'].lower() == org for e in entities['organizations']):
-                    entities['organizations'].append({
-                        'text': org.upper() if len(org) <= 4 else org.title(),
-                        'label': 'ORG',
-                        'start': -1,
-                        'end': -1,
-                        'source': 'enrichment'
-                    })
+        # Entités déjà détectées, par catégorie (texte replié)
+        detected = {
+            key: {fold(e['text']) for e in entities[key]}
+            for key in self.CATEGORY_KEYS.values()
+        }
+        
+        for match in self.gazetteer.find(text):
+            category_key = self.CATEGORY_KEYS.get(self.ENTITY_CATEGORIES.get(match['label']))
+            if not category_key:
+                continue
+            known = detected[category_key]
+            if fold(match['text']) in known or fold(match['matched']) in known:
+                continue
+            known.add(fold(match['text']))
+            entities[category_key].append({
+                'text': match['text'],
+                'label': match['label'],
+                'start': match['start'],
+                'end': match['end'],
+                'source': 'enrichment'
+            })
     
     def _empty_result(self) -> Dict[str, Any]:
         """Retourne un résultat vide"""
@@ -216,8 +303,10 @@ class GeopoliticalEntityExtractor:
         Returns:
             Dictionnaire des entités les plus fréquentes avec leur compte
         """
-        entities = self.extract_entities(text)
-        
+        return self._most_frequent(self.extract_entities(text), top_n)
+    
+    @staticmethod
+    def _most_frequent(entities: Dict[str, Any], top_n: int) -> Dict[str, List[tuple]]:
         result = {}
         
         for category in ['locations', 'organizations', 'persons', 'groups']:
@@ -237,13 +326,21 @@ class GeopoliticalEntityExtractor:
         Returns:
             Analyse complète avec entités et statistiques
         """
-        title = article.get('title', '')
-        content = article.get('content', '')
-        full_text = f"{title}. {content}"
-        
-        # Extraction des entités
-        entities = self.extract_entities(full_text)
+        return self._build_analysis(self.extract_entities(self.article_text(article)))
+    
+    def analyze_articles(self, articles: List[Dict[str, Any]], batch_size: int = NER_BATCH_SIZE,
+                         n_process: Optional[int] = None) -> List[Dict[str, Any]]:
+        """
+        Version par lots de analyze_article() (une passe nlp.pipe())
         
+        Returns:
+            Une analyse par article, dans l'ordre
+        """
+        texts = [self.article_text(article) for article in articles]
+        batch = self.extract_entities_batch(texts, batch_size=batch_size, n_process=n_process)
+        return [self._build_analysis(entities) for entities in batch]
+    
+    def _build_analysis(self, entities: Dict[str, Any]) -> Dict[str, Any]:
         # Statistiques
         stats = {
             'total_entities': len(entities['all_entities']),
@@ -254,8 +351,8 @@ class GeopoliticalEntityExtractor:
             'groups_count': len(entities['groups'])
         }
         
-        # Entités les plus fréquentes
-        frequent = self.get_most_frequent_entities(full_text, top_n=5)
+        # Entités les plus fréquentes (sans seconde passe NER)
+        frequent = self._most_frequent(entities, top_n=5)
         
         return {
             'entities': entities,
@@ -279,10 +376,8 @@ class GeopoliticalEntityExtractor:
         all_persons = []
         location_org_pairs = []
         
-        for article in articles:
-            analysis = self.analyze_article(article)
-            entities = analysis['entities']
-            
+        batch = self.extract_entities_batch([self.article_text(article) for article in articles])
+        for entities in batch:
             # Collecter toutes les entités
             all_locations.extend([e['text'] for e in entities['locations']])
             all_organizations.extend([e['text'] for e in entities['organizations']])
@@ -5,6 +5,9 @@ from typing import Dict, List, Any, Optional
 from datetime import datetime
 from collections import defaultdict, Counter
 
+from .article_entity_cache import ArticleEntityCache
+from .entity_cooccurrence import RELATION_TYPES
+
 logger = logging.getLogger(__name__)
 
 class GeoEntityIntegration:
@@ -13,7 +16,7 @@ class GeoEntityIntegration:
     Permet d'enrichir les patterns transnationaux avec des entités géopolitiques.
     """
     
-    def __init__(self, geo_narrative_analyzer, entity_extractor, entity_db_manager):
+    def __init__(self, geo_narrative_analyzer, entity_extractor, entity_db_manager, entity_cache=None):
         """
         Initialise l'intégrateur
         
@@ -21,10 +24,12 @@ class GeoEntityIntegration:
             geo_narrative_analyzer: Instance de GeoNarrativeAnalyzer
             entity_extractor: Instance de GeopoliticalEntityExtractor
             entity_db_manager: Instance de EntityDatabaseManager
+            entity_cache: Instance de ArticleEntityCache (créée si absente)
         """
         self.geo_analyzer = geo_narrative_analyzer
         self.entity_extractor = entity_extractor
         self.entity_db = entity_db_manager
+        self.entity_cache = entity_cache or ArticleEntityCache(entity_extractor, entity_db_manager)
         
         logger.info("✅ GeoEntityIntegration initialisé")
     
@@ -58,10 +63,18 @@ class GeoEntityIntegration:
             
             logger.info(f"📊 {len(patterns)} patterns détectés, enrichissement en cours...")
             
-            # 2. Enrichir chaque pattern avec des entités
+            # 2. Enrichir chaque pattern avec les entités en cache des articles de la période
+            articles = self._recent_articles(days)
+            if articles:
+                self.entity_cache.ensure(articles)
+                known = self.entity_cache.window_entities([article['id'] for article in articles])
+                batch = self.geo_analyzer.match_known_entities(patterns, known)
+            else:
+                # Patterns de repli : pas d'articles, NER sur leur texte
+                batch = self.entity_extractor.extract_entities_batch([p['pattern'] for p in patterns])
             enriched_patterns = []
-            for pattern in patterns:
-                enriched = self._enrich_pattern_with_entities(pattern)
+            for pattern, entities in zip(patterns, batch):
+                enriched = self._enrich_pattern_with_entities(pattern, entities)
                 enriched_patterns.append(enriched)
             
             # 3. Calculer des statistiques globales
@@ -77,21 +90,22 @@ class GeoEntityIntegration:
             traceback.print_exc()
             return []
     
-    def _enrich_pattern_with_entities(self, pattern: Dict[str, Any]) -> Dict[str, Any]:
+    def _enrich_pattern_with_entities(self, pattern: Dict[str, Any],
+                                      entities: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
         """
         Enrichit un pattern avec les entités géopolitiques extraites
         
         Args:
             pattern: Pattern brut de geo_narrative_analyzer
+            entities: Entités déjà extraites (lot), sinon extraites ici
             
         Returns:
             Pattern enrichi avec entités
         """
         try:
-            pattern_text = pattern['pattern']
-            
             # Extraire les entités du pattern
-            entities = self.entity_extractor.extract_entities(pattern_text)
+            if entities is None:
+                entities = self.entity_extractor.extract_entities(pattern['pattern'])
             
             # Enrichir le pattern
             pattern['entities'] = {
@@ -125,6 +139,11 @@ class GeoEntityIntegration:
             pattern['entity_richness_score'] = 0
             return pattern
     
+    def _recent_articles(self, days: int) -> List[Dict[str, Any]]:
+        """Articles de la période (tous pays confondus)"""
+        articles_by_country = self.geo_analyzer._get_recent_articles_by_country(days)
+        return [article for articles in articles_by_country.values() for article in articles]
+    
     def _add_global_statistics(self, patterns: List[Dict]) -> List[Dict]:
         """
         Ajoute des statistiques globales sur les entités
@@ -187,14 +206,14 @@ class GeoEntityIntegration:
             
             logger.info(f"📚 {len(all_articles)} articles à analyser")
             
-            # 2. Analyser les patterns
-            patterns = self.analyze_patterns_with_entities(days=days, min_countries=2)
+            # 2. Extraire les entités des seuls articles pas encore en cache
+            self._save_entities_to_db(all_articles)
             
-            # 3. Créer le réseau d'entités global
-            entity_network = self.entity_extractor.extract_geopolitical_network(all_articles)
+            # 3. Analyser les patterns
+            patterns = self.analyze_patterns_with_entities(days=days, min_countries=2)
             
-            # 4. Sauvegarder les entités en base de données
-            self._save_entities_to_db(all_articles)
+            # 4. Réseau d'entités global (matrice de co-occurrences de la période)
+            entity_network = self.entity_db.cooccurrence.network(days)
             
             # 5. Compiler le rapport
             report = {
@@ -229,56 +248,15 @@ class GeoEntityIntegration:
     def _save_entities_to_db(self, articles: List[Dict]) -> None:
         """
         Sauvegarde les entités extraites en base de données
+        (NER uniquement pour les articles absents du cache ou modifiés)
         
         Args:
             articles: Liste d'articles à traiter
         """
         try:
-            saved_count = 0
-            
-            for article in articles:
-                # Extraire les entités
-                analysis = self.entity_extractor.analyze_article(article)
-                entities = analysis['entities']
-                
-                # Sauvegarder pour chaque catégorie
-                article_id = article.get('id')
-                if not article_id:
-                    continue
-                
-                # Locations
-                for entity in entities.get('locations', []):
-                    self.entity_db.save_entity(
-                        article_id=article_id,
-                        entity_text=entity['text'],
-                        entity_type='location',
-                        entity_label=entity.get('label', 'GPE'),
-                        context=entity.get('context', '')
-                    )
-                
-                # Organizations
-                for entity in entities.get('organizations', []):
-                    self.entity_db.save_entity(
-                        article_id=article_id,
-                        entity_text=entity['text'],
-                        entity_type='organization',
-                        entity_label=entity.get('label', 'ORG'),
-                        context=entity.get('context', '')
-                    )
-                
-                # Persons
-                for entity in entities.get('persons', []):
-                    self.entity_db.save_entity(
-                        article_id=article_id,
-                        entity_text=entity['text'],
-                        entity_type='person',
-                        entity_label=entity.get('label', 'PERSON'),
-                        context=entity.get('context', '')
-                    )
-                
-                saved_count += 1
-            
-            logger.info(f"💾 Entités sauvegardées pour {saved_count} articles")
+            stats = self.entity_cache.ensure(articles)
+            logger.info(f"💾 Entités sauvegardées pour {stats['extracted']} articles "
+                        f"({stats['checked'] - stats['extracted']} déjà en cache)")
             
         except Exception as e:
             logger.error(f"❌ Erreur sauvegarde entités: {e}")
@@ -389,62 +367,26 @@ class GeoEntityIntegration:
     
     def get_entity_relations(
         self, 
-        days: int = 7
+        days: int = 7,
+        rank: str = 'count'
     ) -> Dict[str, Any]:
         """
         Extrait les relations entre entités (co-occurrences)
         
         Args:
             days: Période d'analyse
+            rank: Classement des relations ('count', 'pmi' ou 'lift')
             
         Returns:
             Graphe de relations entre entités
         """
         try:
-            # Analyser les articles
-            articles_by_country = self.geo_analyzer._get_recent_articles_by_country(days)
-            all_articles = []
-            for articles in articles_by_country.values():
-                all_articles.extend(articles)
-            
-            # Créer le graphe de relations
-            relations = []
+            # Articles de la période, entités en cache (NER des seuls non traités)
+            self._save_entities_to_db(self._recent_articles(days))
             
-            for article in all_articles:
-                # Extraire les entités de l'article
-                analysis = self.entity_extractor.analyze_article(article)
-                entities = analysis['entities']
-                
-                # Créer des relations entre locations et organizations
-                locations = [e['text'] for e in entities.get('locations', [])]
-                organizations = [e['text'] for e in entities.get('organizations', [])]
-                persons = [e['text'] for e in entities.get('persons', [])]
-                
-                # Relations location-organization
-                for loc in locations:
-                    for org in organizations:
-                        relations.append({
-                            'source': loc,
-                            'target': org,
-                            'type': 'location-organization',
-                            'article_id': article.get('id')
-                        })
-                
-                # Relations organization-person
-                for org in organizations:
-                    for person in persons:
-                        relations.append({
-                            'source': org,
-                            'target': person,
-                            'type': 'organization-person',
-                            'article_id': article.get('id')
-                        })
-            
-            # Compter les relations
-            relation_counts = Counter(
-                (r['source'], r['target'], r['type']) 
-                for r in relations
-            )
+            # Relations location-organization et organization-person (matrice par jour)
+            cooccurrence = self.entity_db.cooccurrence
+            relations = cooccurrence.top_pairs(days, k=50, rank=rank, relation_types=RELATION_TYPES)
             
             # Formater pour visualisation (format D3.js/vis.js)
             nodes = set()
@@ -456,16 +398,19 @@ class GeoEntityIntegration:
                 'nodes': [{'id': node, 'label': node} for node in nodes],
                 'edges': [
                     {
-                        'source': source,
-                        'target': target,
-                        'weight': count,
-                        'type': rel_type
+                        'source': relation['source'],
+                        'target': relation['target'],
+                        'weight': relation['count'],
+                        'pmi': relation['pmi'],
+                        'lift': relation['lift'],
+                        'type': f"{relation['source_category']}-{relation['target_category']}"
                     }
-                    for (source, target, rel_type), count in relation_counts.most_common(50)
+                    for relation in relations
                 ],
                 'metadata': {
                     'total_nodes': len(nodes),
-                    'total_edges': len(relation_counts),
+                    'total_edges': cooccurrence.pair_count(days, RELATION_TYPES),
+                    'rank': rank,
                     'analysis_date': datetime.now().isoformat(),
                     'period_days': days
                 }
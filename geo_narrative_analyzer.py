@@ -7,12 +7,15 @@ from datetime import datetime, timedelta
 from typing import Dict, List, Any, Set, Tuple
 import unicodedata
 
+from .article_entity_cache import CATEGORY_KEYS
+
 logger = logging.getLogger(__name__)
 
 class GeoNarrativeAnalyzer:
-    def __init__(self, db_manager, entity_extractor=None):
+    def __init__(self, db_manager, entity_extractor=None, entity_cache=None):
         self.db_manager = db_manager
         self.entity_extractor = entity_extractor
+        self.entity_cache = entity_cache
         
         # Lexique géopolitique enrichi pour la production
         self.geopolitical_lexicon = {
@@ -66,7 +69,8 @@ class GeoNarrativeAnalyzer:
             )
             
             # 4. Enrichir avec les entités SpaCy
-            enriched_patterns = self._enrich_patterns_with_entities(transnational_patterns)
+            articles = [article for items in articles_by_country.values() for article in items]
+            enriched_patterns = self._enrich_patterns_with_entities(transnational_patterns, articles)
             
             logger.info(f"✅ {len(enriched_patterns)} patterns transnationaux détectés")
             return enriched_patterns
@@ -235,17 +239,62 @@ class GeoNarrativeAnalyzer:
         """Calcule la force d'un pattern"""
         return min(10, (country_count * 2) + min(5, occurrences // 2))
 
-    def _enrich_patterns_with_entities(self, patterns: List[Dict]) -> List[Dict]:
+    def pattern_entities(self, patterns: List[Dict], articles: List[Dict] = None) -> List[Dict[str, Any]]:
+        """
+        Entités de chaque pattern, au format de l'extracteur
+        
+        Avec le cache d'entités et les articles de la période, ce sont les
+        entités déjà extraites de ces articles dont le texte nettoyé figure
+        dans le pattern (aucune NER sauf articles non traités) ; sinon NER
+        sur le texte des patterns.
+        """
+        if self.entity_cache is None or articles is None:
+            return self.entity_extractor.extract_entities_batch([pattern["pattern"] for pattern in patterns])
+        
+        self.entity_cache.ensure(articles)
+        known = self.entity_cache.window_entities([article['id'] for article in articles])
+        return self.match_known_entities(patterns, known)
+    
+    def match_known_entities(self, patterns: List[Dict], known: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Associe aux patterns les entités connues dont le texte nettoyé y apparaît"""
+        index = defaultdict(list)
+        for entity in known:
+            cleaned = self._deep_clean_text(entity['text'])
+            if cleaned:
+                index[cleaned].append(entity)
+        keys = {category: key for key, category in CATEGORY_KEYS.items()}
+        
+        results = []
+        for pattern in patterns:
+            words = pattern["pattern"].split()
+            entities = {key: [] for key in CATEGORY_KEYS}
+            entities['all_entities'] = []
+            for n in range(len(words), 0, -1):
+                for i in range(len(words) - n + 1):
+                    for entity in index.get(" ".join(words[i:i + n]), []):
+                        entity_data = {
+                            'text': entity['text'],
+                            'label': entity['label'],
+                            'start': -1,
+                            'end': -1,
+                            'source': 'cache'
+                        }
+                        if entity['category'] in keys:
+                            entities[keys[entity['category']]].append(entity_data)
+                        entities['all_entities'].append(entity_data)
+            results.append(entities)
+        return results
+    
+    def _enrich_patterns_with_entities(self, patterns: List[Dict], articles: List[Dict] = None) -> List[Dict]:
         """Enrichit les patterns avec les entités SpaCy"""
         if not self.entity_extractor:
             return patterns
         
         enriched_patterns = []
+        batch = self.pattern_entities(patterns, articles)
         
-        for pattern in patterns:
+        for pattern, entities in zip(patterns, batch):
             try:
-                entities = self.entity_extractor.extract_entities(pattern["pattern"])
-                
                 pattern["entities"] = {
                     'locations': [e['text'] for e in entities.get('locations', [])][:5],
                     'organizations': [e['text'] for e in entities.get('organizations', [])][:5],
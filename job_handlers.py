@@ -0,0 +1,166 @@
+# Flask/job_handlers.py
+"""
+Tâches longues exécutées par les processus de travail de la file (job_queue)
+Les analyseurs sont construits une fois par processus, à la première tâche
+"""
+
+import logging
+from datetime import datetime, timedelta
+from typing import Dict, Any, List, Optional
+
+from .batch_sentiment_analyzer import BatchSentimentAnalyzer
+from .database import to_epoch
+from .job_queue import job_handler, JobContext
+
+logger = logging.getLogger(__name__)
+
+
+# ----------------------------------------------------------------------
+# Services partagés du processus
+# ----------------------------------------------------------------------
+
+def _sentiment_analyzer(context: JobContext):
+    from .sentiment_analyzer import SentimentAnalyzer
+    return context.service('sentiment_analyzer', SentimentAnalyzer)
+
+
+def _corroboration_engine(context: JobContext):
+    from .corroboration_engine import CorroborationEngine
+    return context.service('corroboration_engine', CorroborationEngine)
+
+
+def _bayesian_analyzer(context: JobContext):
+    from .bayesian_analyzer import BayesianSentimentAnalyzer
+    return context.service('bayesian_analyzer', BayesianSentimentAnalyzer)
+
+
+def _batch_analyzer(context: JobContext) -> BatchSentimentAnalyzer:
+    return context.service('batch_analyzer', lambda: BatchSentimentAnalyzer(
+        _sentiment_analyzer(context),
+        _corroboration_engine(context),
+        _bayesian_analyzer(context)
+    ))
+
+
+def _entity_cache(context: JobContext):
+    def build():
+        from .geopolitical_entity_extractor import GeopoliticalEntityExtractor
+        from .entity_database_manager import EntityDatabaseManager
+        from .article_entity_cache import ArticleEntityCache
+
+        return ArticleEntityCache(
+            GeopoliticalEntityExtractor(model_name="fr_core_news_lg"),
+            EntityDatabaseManager(context.db_manager)
+        )
+    return context.service('entity_cache', build)
+
+
+def _geo_entity_integration(context: JobContext):
+    def build():
+        from .geo_narrative_analyzer import GeoNarrativeAnalyzer
+        from .geo_entity_integration import GeoEntityIntegration
+
+        entity_cache = _entity_cache(context)
+        return GeoEntityIntegration(
+            GeoNarrativeAnalyzer(context.db_manager, entity_cache.entity_extractor, entity_cache),
+            entity_cache.entity_extractor,
+            entity_cache.entity_db,
+            entity_cache
+        )
+    return context.service('geo_entity_integration', build)
+
+
+def _recent_articles(context: JobContext, days: int, columns: List[str]) -> List[Dict[str, Any]]:
+    """Articles des `days` derniers jours, plus récents d'abord"""
+    rows = context.db_manager.execute_query(f"""
+        SELECT {', '.join(columns)}
+        FROM articles
+        WHERE pub_ts >= ?
+        ORDER BY pub_ts DESC
+    """, (to_epoch(datetime.now() - timedelta(days=days)),))
+    return [dict(zip(columns, row)) for row in rows]
+
+
+# ----------------------------------------------------------------------
+# Tâches
+# ----------------------------------------------------------------------
+
+@job_handler('batch_analyze_coherent', stages=BatchSentimentAnalyzer.STAGES)
+def analyze_coherent(context: JobContext, days: int = 7) -> Dict[str, Any]:
+    """Analyse batch cohérente (POST /api/batch/analyze-coherent)"""
+    return _batch_analyzer(context).analyze_recent_articles(
+        context.db_manager,
+        days=days,
+        progress_callback=context.stage
+    )
+
+
+@job_handler('corroboration_batch_process',
+             stages=["Chargement des articles", "Corroboration et sauvegarde"])
+def corroboration_batch_process(context: JobContext, days: int = 7) -> Dict[str, Any]:
+    """Corroboration par lots (POST /api/corroboration/batch-process)"""
+    context.stage(1)
+    articles = _recent_articles(context, days, [
+        'id', 'title', 'content', 'pub_date', 'feed_url',
+        'sentiment_type', 'sentiment_score', 'detailed_sentiment'
+    ])
+    if not articles:
+        return {
+            'stats': {'processed': 0, 'corroborations_found': 0, 'errors': 0},
+            'message': 'Aucun article à traiter'
+        }
+
+    context.stage(2)
+    stats = _corroboration_engine(context).batch_process_articles(
+        articles,
+        articles,  # Utiliser la même liste comme pool de candidats
+        context.db_manager
+    )
+    logger.info(f"✅ Corroboration terminée : {stats['processed']} articles, "
+                f"{stats['corroborations_found']} corroborations trouvées")
+    return {'stats': stats}
+
+
+@job_handler('bayesian_batch_analyze',
+             stages=["Chargement des articles", "Analyse bayésienne et sauvegarde"])
+def bayesian_batch_analyze(context: JobContext, days: int = 7) -> Dict[str, Any]:
+    """Analyse bayésienne par lots (POST /api/bayesian/batch-analyze)"""
+    context.stage(1)
+    articles = _recent_articles(context, days, [
+        'id', 'title', 'content', 'pub_date', 'sentiment_type',
+        'sentiment_score', 'detailed_sentiment', 'roberta_score'
+    ])
+    if not articles:
+        return {
+            'results': {'analyzed': 0, 'updated': 0, 'errors': []},
+            'message': 'Aucun article à analyser'
+        }
+
+    context.stage(2)
+    results = _bayesian_analyzer(context).batch_analyze_articles(articles, context.db_manager)
+    logger.info(f"✅ Analyse bayésienne terminée : {results['analyzed']} articles, "
+                f"{results['updated']} mis à jour")
+    return {'results': results}
+
+
+@job_handler('geo_comprehensive_analysis', stages=["Analyse complète geo-entités"])
+def geo_comprehensive_analysis(context: JobContext, days: int = 7) -> Dict[str, Any]:
+    """Analyse complète geo-narrative + entités (GET /api/geo-entity/comprehensive-analysis)"""
+    context.stage(1)
+    return {'report': _geo_entity_integration(context).analyze_articles_comprehensive(days=days)}
+
+
+@job_handler('entity_backfill', stages=["Extraction des entités"])
+def entity_backfill(context: JobContext, limit: Optional[int] = None) -> Dict[str, Any]:
+    """
+    Extraction des entités des articles absents du cache ou périmés
+    (après ingestion, POST /api/entities/batch-analyze en asynchrone)
+    """
+    context.stage(1)
+    stats = _entity_cache(context).backfill(
+        limit=limit,
+        progress_callback=lambda last_id, max_id: context.progress(
+            last_id / max(max_id, 1), f"Articles jusqu'à l'id {last_id}"
+        )
+    )
+    return {'stats': stats}
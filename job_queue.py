@@ -0,0 +1,404 @@
+# Flask/job_queue.py
+"""
+File de tâches longues persistée dans SQLite
+Processus de travail séparés, progression par étape, annulation, déduplication
+"""
+
+import argparse
+import atexit
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import subprocess
+import sys
+import threading
+import time
+import uuid
+from typing import Dict, Any, Callable, List, Optional, Tuple
+
+from .database import DatabaseManager
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_WORKERS = 2
+POLL_INTERVAL = 1.0
+PROGRESS_WRITE_INTERVAL = 0.5
+
+# job_type -> (fonction, noms des étapes)
+_HANDLERS: Dict[str, Tuple[Callable, List[str]]] = {}
+
+# Services coûteux (modèles, analyseurs) construits une fois par processus
+_SERVICES: Dict[str, Any] = {}
+
+
+class JobCancelled(Exception):
+    """Levée dans une tâche dont l'annulation a été demandée"""
+
+
+def job_handler(job_type: str, stages: Optional[List[str]] = None):
+    """
+    Enregistre une fonction de tâche : handler(context, **params) -> dict
+
+    Les étapes déclarées servent au calcul de la progression globale.
+    """
+    def decorator(func: Callable) -> Callable:
+        _HANDLERS[job_type] = (func, list(stages or []))
+        return func
+    return decorator
+
+
+class JobContext:
+    """Contexte passé aux tâches : progression, annulation, services partagés"""
+
+    def __init__(self, queue: 'JobQueue', job_id: str, stages: List[str]):
+        self.queue = queue
+        self.job_id = job_id
+        self.stages = stages
+        self.stage_index = 0
+        self._last_write = 0.0
+
+    @property
+    def db_manager(self) -> DatabaseManager:
+        return self.queue.db_manager
+
+    def service(self, name: str, factory: Callable[[], Any]) -> Any:
+        """Retourne un service du processus, créé au premier appel"""
+        if name not in _SERVICES:
+            _SERVICES[name] = factory()
+        return _SERVICES[name]
+
+    def stage(self, index: int, name: Optional[str] = None):
+        """Entre dans l'étape index (1..n) ; point d'annulation"""
+        self.check_cancelled()
+        self.stage_index = index
+        count = max(len(self.stages), index)
+        if name is None and 0 < index <= len(self.stages):
+            name = self.stages[index - 1]
+        self.queue._update_progress(self.job_id, stage=name, stage_index=index,
+                                    stage_count=count, progress=(index - 1) / count)
+
+    def progress(self, fraction: float, message: Optional[str] = None):
+        """Avancement dans l'étape courante (0-1) ; écritures espacées"""
+        now = time.time()
+        if now - self._last_write < PROGRESS_WRITE_INTERVAL and fraction < 1.0:
+            return
+        self._last_write = now
+        self.check_cancelled()
+        count = max(len(self.stages), self.stage_index, 1)
+        done = max(self.stage_index - 1, 0) + min(max(fraction, 0.0), 1.0)
+        self.queue._update_progress(self.job_id, progress=done / count, message=message)
+
+    def check_cancelled(self):
+        if self.queue._cancel_requested(self.job_id):
+            raise JobCancelled(self.job_id)
+
+
+class JobQueue:
+    """
+    File de tâches persistée dans la table background_jobs.
+
+    Le serveur Flask ne fait qu'insérer les tâches et lire leur état ; elles
+    sont exécutées par des processus de travail (python -m ...job_queue) qui
+    les réservent une à une. Une tâche identique (même type, mêmes
+    paramètres) déjà en attente ou en cours est réutilisée au lieu d'être
+    relancée : un index unique partiel sur dedupe_key le garantit.
+    """
+
+    def __init__(self, db_manager: DatabaseManager, workers: int = DEFAULT_WORKERS):
+        self.db_manager = db_manager
+        self.workers = workers
+        self._processes: List[subprocess.Popen] = []
+        self._lock = threading.Lock()
+        self._init_table()
+
+    def _init_table(self):
+        with self.db_manager.connection() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS background_jobs (
+                    id TEXT PRIMARY KEY,
+                    job_type TEXT NOT NULL,
+                    params TEXT,
+                    dedupe_key TEXT NOT NULL,
+                    status TEXT NOT NULL DEFAULT 'queued',
+                    stage TEXT,
+                    stage_index INTEGER DEFAULT 0,
+                    stage_count INTEGER DEFAULT 0,
+                    progress REAL DEFAULT 0,
+                    message TEXT,
+                    result TEXT,
+                    error TEXT,
+                    cancel_requested INTEGER DEFAULT 0,
+                    worker_pid INTEGER,
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    started_at TIMESTAMP,
+                    finished_at TIMESTAMP,
+                    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                )
+            """)
+            conn.execute("""
+                CREATE UNIQUE INDEX IF NOT EXISTS idx_background_jobs_active
+                ON background_jobs(dedupe_key) WHERE status IN ('queued', 'running')
+            """)
+            conn.execute("""
+                CREATE INDEX IF NOT EXISTS idx_background_jobs_status
+                ON background_jobs(status, created_at)
+            """)
+
+    # ------------------------------------------------------------------
+    # API côté serveur
+    # ------------------------------------------------------------------
+
+    def submit(self, job_type: str, params: Optional[Dict[str, Any]] = None) -> Tuple[Dict[str, Any], bool]:
+        """
+        Ajoute une tâche à la file
+
+        Returns:
+            (tâche, créée) ; créée vaut False si une tâche identique en
+            attente ou en cours a été réutilisée
+        """
+        if job_type not in _HANDLERS:
+            raise ValueError(f"Type de tâche inconnu: {job_type}")
+
+        payload = json.dumps(params or {}, sort_keys=True, ensure_ascii=False, default=str)
+        dedupe_key = hashlib.sha1(f"{job_type}:{payload}".encode('utf-8')).hexdigest()
+        stage_count = len(_HANDLERS[job_type][1])
+
+        for _ in range(3):
+            try:
+                job_id = uuid.uuid4().hex
+                with self.db_manager.connection() as conn:
+                    conn.execute("""
+                        INSERT INTO background_jobs
+                            (id, job_type, params, dedupe_key, stage_count)
+                        VALUES (?, ?, ?, ?, ?)
+                    """, (job_id, job_type, payload, dedupe_key, stage_count))
+                logger.info(f"📥 Tâche {job_type} ajoutée ({job_id})")
+                return self.get(job_id), True
+            except sqlite3.IntegrityError:
+                existing = self.db_manager.execute_query("""
+                    SELECT id FROM background_jobs
+                    WHERE dedupe_key = ? AND status IN ('queued', 'running')
+                """, (dedupe_key,))
+                # Sinon la tâche identique vient de se terminer : nouvel essai
+                if existing:
+                    logger.info(f"♻️ Tâche {job_type} déjà en cours, réutilisée ({existing[0][0]})")
+                    return self.get(existing[0][0]), False
+
+        raise RuntimeError(f"Impossible d'ajouter la tâche {job_type}")
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        rows = self.db_manager.execute_query(
+            "SELECT * FROM background_jobs WHERE id = ?", (job_id,)
+        )
+        return self._row_to_job(rows[0]) if rows else None
+
+    def list_jobs(self, status: Optional[str] = None, limit: int = 50) -> List[Dict[str, Any]]:
+        if status:
+            rows = self.db_manager.execute_query("""
+                SELECT * FROM background_jobs WHERE status = ?
+                ORDER BY created_at DESC, rowid DESC LIMIT ?
+            """, (status, limit))
+        else:
+            rows = self.db_manager.execute_query("""
+                SELECT * FROM background_jobs
+                ORDER BY created_at DESC, rowid DESC LIMIT ?
+            """, (limit,))
+        return [self._row_to_job(row) for row in rows]
+
+    def cancel(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Annule une tâche : immédiatement si elle est en attente, au prochain
+        point d'annulation (changement d'étape, progression) si elle tourne
+        """
+        with self.db_manager.connection() as conn:
+            cursor = conn.execute("""
+                UPDATE background_jobs
+                SET status = 'cancelled', cancel_requested = 1,
+                    finished_at = CURRENT_TIMESTAMP, updated_at = CURRENT_TIMESTAMP
+                WHERE id = ? AND status = 'queued'
+            """, (job_id,))
+            if cursor.rowcount == 0:
+                conn.execute("""
+                    UPDATE background_jobs
+                    SET cancel_requested = 1, updated_at = CURRENT_TIMESTAMP
+                    WHERE id = ? AND status = 'running'
+                """, (job_id,))
+        return self.get(job_id)
+
+    def start(self):
+        """Remet en file les tâches orphelines et lance les processus de travail"""
+        with self._lock:
+            if self._processes or self.workers <= 0:
+                return
+
+            self._requeue_orphans()
+
+            env = dict(os.environ)
+            env['PYTHONPATH'] = os.pathsep.join(p for p in sys.path if p)
+            command = [
+                sys.executable, '-m', f'{__package__}.job_queue',
+                '--db', os.path.abspath(self.db_manager.db_path),
+                '--parent-pid', str(os.getpid())
+            ]
+            for _ in range(self.workers):
+                self._processes.append(subprocess.Popen(command, env=env))
+
+            atexit.register(self.stop)
+            logger.info(f"⚙️ {self.workers} processus de travail démarrés")
+
+    def stop(self):
+        with self._lock:
+            for process in self._processes:
+                if process.poll() is None:
+                    process.terminate()
+            for process in self._processes:
+                try:
+                    process.wait(timeout=5)
+                except subprocess.TimeoutExpired:
+                    process.kill()
+            self._processes = []
+
+    # ------------------------------------------------------------------
+    # Côté processus de travail
+    # ------------------------------------------------------------------
+
+    def run_worker(self, parent_pid: Optional[int] = None, poll_interval: float = POLL_INTERVAL):
+        """Boucle d'un processus de travail : réserve et exécute les tâches"""
+        logger.info(f"⚙️ Processus de travail {os.getpid()} prêt")
+        while parent_pid is None or os.getppid() == parent_pid:
+            job = self._claim_next()
+            if job is None:
+                time.sleep(poll_interval)
+                continue
+            self.run_job(job)
+        logger.info(f"⏹️ Processus de travail {os.getpid()} arrêté (serveur parti)")
+
+    def run_job(self, job: Dict[str, Any]):
+        handler, stages = _HANDLERS.get(job['job_type'], (None, []))
+        if handler is None:
+            self._finish(job['id'], 'failed', error=f"Type de tâche inconnu: {job['job_type']}")
+            return
+
+        context = JobContext(self, job['id'], stages)
+        started = time.time()
+        try:
+            result = handler(context, **(job['params'] or {}))
+            self._finish(job['id'], 'completed', result=result)
+            logger.info(f"✅ Tâche {job['job_type']} terminée en {time.time() - started:.1f}s")
+        except JobCancelled:
+            self._finish(job['id'], 'cancelled')
+            logger.info(f"⏹️ Tâche {job['job_type']} annulée ({job['id']})")
+        except Exception as e:
+            logger.error(f"❌ Tâche {job['job_type']} en échec: {e}", exc_info=True)
+            self._finish(job['id'], 'failed', error=str(e))
+
+    def _claim_next(self) -> Optional[Dict[str, Any]]:
+        """Réserve la plus ancienne tâche en attente (sans course entre processus)"""
+        while True:
+            rows = self.db_manager.execute_query("""
+                SELECT id FROM background_jobs WHERE status = 'queued'
+                ORDER BY created_at, rowid LIMIT 1
+            """)
+            if not rows:
+                return None
+
+            with self.db_manager.connection() as conn:
+                claimed = conn.execute("""
+                    UPDATE background_jobs
+                    SET status = 'running', worker_pid = ?,
+                        started_at = CURRENT_TIMESTAMP, updated_at = CURRENT_TIMESTAMP
+                    WHERE id = ? AND status = 'queued'
+                """, (os.getpid(), rows[0][0])).rowcount
+            if claimed:
+                return self.get(rows[0][0])
+
+    def _requeue_orphans(self):
+        """Tâches 'running' dont le processus n'existe plus (arrêt du serveur)"""
+        rows = self.db_manager.execute_query("""
+            SELECT id, worker_pid, cancel_requested FROM background_jobs WHERE status = 'running'
+        """)
+        for job_id, worker_pid, cancel_requested in rows:
+            if worker_pid and _process_alive(worker_pid):
+                continue
+            if cancel_requested:
+                self._finish(job_id, 'cancelled')
+                continue
+            with self.db_manager.connection() as conn:
+                conn.execute("""
+                    UPDATE background_jobs
+                    SET status = 'queued', worker_pid = NULL, stage = NULL,
+                        stage_index = 0, progress = 0, updated_at = CURRENT_TIMESTAMP
+                    WHERE id = ? AND status = 'running'
+                """, (job_id,))
+            logger.info(f"♻️ Tâche {job_id} interrompue remise en file")
+
+    def _update_progress(self, job_id: str, **fields):
+        assignments = ', '.join(f"{name} = ?" for name in fields)
+        with self.db_manager.connection() as conn:
+            conn.execute(f"""
+                UPDATE background_jobs
+                SET {assignments}, updated_at = CURRENT_TIMESTAMP
+                WHERE id = ?
+            """, (*fields.values(), job_id))
+
+    def _cancel_requested(self, job_id: str) -> bool:
+        rows = self.db_manager.execute_query(
+            "SELECT cancel_requested FROM background_jobs WHERE id = ?", (job_id,)
+        )
+        return bool(rows and rows[0][0])
+
+    def _finish(self, job_id: str, status: str, result: Any = None, error: Optional[str] = None):
+        with self.db_manager.connection() as conn:
+            conn.execute("""
+                UPDATE background_jobs
+                SET status = ?, result = ?, error = ?,
+                    progress = CASE WHEN ? = 'completed' THEN 1.0 ELSE progress END,
+                    finished_at = CURRENT_TIMESTAMP, updated_at = CURRENT_TIMESTAMP
+                WHERE id = ?
+            """, (status, json.dumps(result, ensure_ascii=False, default=str) if result is not None else None,
+                  error, status, job_id))
+
+    @staticmethod
+    def _row_to_job(row) -> Dict[str, Any]:
+        job = dict(row)
+        job['params'] = json.loads(job['params']) if job.get('params') else {}
+        job['result'] = json.loads(job['result']) if job.get('result') else None
+        job['cancel_requested'] = bool(job.get('cancel_requested'))
+        job['progress'] = round((job.get('progress') or 0.0) * 100, 1)
+        job.pop('dedupe_key', None)
+        return job
+
+
+def _process_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def main(argv: Optional[List[str]] = None):
+    """Point d'entrée d'un processus de travail"""
+    parser = argparse.ArgumentParser(description="Processus de travail de la file de tâches")
+    parser.add_argument('--db', required=True, help="Chemin de la base SQLite")
+    parser.add_argument('--parent-pid', type=int, default=None,
+                        help="S'arrêter quand ce processus disparaît")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s [%(process)d] %(levelname)s %(message)s')
+
+    # Enregistre les tâches disponibles
+    from . import job_handlers  # noqa: F401
+
+    JobQueue(DatabaseManager(args.db), workers=0).run_worker(parent_pid=args.parent_pid)
+
+
+if __name__ == '__main__':
+    # Passer par le module importé sous son nom de paquet : c'est son
+    # registre que job_handlers remplit (et non celui de __main__)
+    from .job_queue import main as package_main
+    package_main()
@@ -184,6 +184,7 @@ class FilterManager {
         if (this.currentFilters.dateTo) params.append('date_to', this.currentFilters.dateTo);
         if (this.currentFilters.searchTerm) params.append('search', this.currentFilters.searchTerm);
         params.append('limit', '100');
+        params.append('fields', 'id,title,excerpt,link,pub_date,sentiment,feed_url');
 
         try {
             const data = await ApiClient.get(`/api/articles/filter?${params.toString()}`);
@@ -221,7 +222,7 @@ class FilterManager {
                         ${this.formatDate(article.pub_date)}
                     </span>
                 </div>
-                <p class="text-gray-600 text-sm mb-3">${this.truncate(article.content, 150)}</p>
+                <p class="text-gray-600 text-sm mb-3">${article.snippet || this.truncate(article.excerpt, 150)}</p>
                 <div class="flex justify-between items-center">
                     <div class="flex space-x-2">
                         <span class="text-xs px-2 py-1 rounded-full ${this.getSentimentBadge(article.sentiment)}">
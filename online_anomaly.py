@@ -0,0 +1,577 @@
+# Flask/online_anomaly.py
+"""
+Détection d'anomalies en ligne sur les volumes d'articles par thème et par flux
+Statistiques glissantes (Welford, EWMA, saisonnalité jour de semaine) mises à
+jour à l'ingestion et persistées en base : elles survivent aux redémarrages
+"""
+
+import json
+import logging
+import math
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from .database import DatabaseManager, to_epoch
+
+logger = logging.getLogger(__name__)
+
+# Granularités suivies : durée d'un bucket en secondes
+GRANULARITIES = {'hour': 3600, 'day': 86400}
+
+# Saisonnalité hebdomadaire : créneaux jour de semaine (× heure pour 'hour')
+SEASON_LENGTH = {'hour': 7 * 24, 'day': 7}
+
+# 1970-01-01 était un jeudi : décalage pour que le créneau 0 soit lundi
+_EPOCH_WEEKDAY = 3
+
+# Retard toléré avant de clore un bucket (publication / relève des flux)
+ALLOWED_LATENESS = 3 * 3600
+
+EWMA_ALPHA = 0.1
+
+# Buckets clos nécessaires avant de calculer un z-score (global / par créneau)
+MIN_HISTORY = 3
+MIN_SEASONAL_HISTORY = 3
+
+# Un bucket au-dessus de ce z-score est enregistré comme pic
+Z_THRESHOLD = 2.0
+
+
+def _peak_z(count: int, expected: float, std: float) -> float:
+    """
+    z-score retenu pour la détection des pics : écart-type plancher de
+    Poisson (sqrt de l'attendu, au moins 1 article). Sur une série creuse
+    (buckets horaires surtout), l'écart-type observé est minuscule et un
+    article isolé dépasserait sinon Z_THRESHOLD
+    """
+    return (count - expected) / max(std, math.sqrt(max(expected, 1.0)))
+
+# Même seuil que les agrégats du tableau de bord
+THEME_CONFIDENCE_THRESHOLD = 0.3
+
+OBSERVE_CHUNK_SIZE = 500
+
+# Au-delà, la décroissance de l'EWMA sur des buckets vides est négligeable
+_MAX_EWMA_DECAY_STEPS = 200
+
+
+def _z_score(value: float, n: int, mean: float, m2: float, min_history: int) -> Optional[float]:
+    """z-score de `value` par rapport à un accumulateur de Welford (None si indéfini)"""
+    if n < min_history:
+        return None
+    std = math.sqrt(m2 / n)
+    if std < 1e-9:
+        return None
+    return (value - mean) / std
+
+
+def _welford_merge(n: int, mean: float, m2: float, count: int, value: float) -> Tuple[int, float, float]:
+    """Ajoute `count` observations identiques (formule de Chan)"""
+    total = n + count
+    delta = value - mean
+    mean += delta * count / total
+    m2 += delta * delta * n * count / total
+    return total, mean, m2
+
+
+class _SeriesState:
+    """État d'une série (type, clé, granularité) et de ses créneaux saisonniers"""
+
+    def __init__(self, kind: str, key: str, granularity: str, row=None):
+        self.kind = kind
+        self.key = key
+        self.granularity = granularity
+        self.step = GRANULARITIES[granularity]
+        self.season_length = SEASON_LENGTH[granularity]
+        self.season_offset = _EPOCH_WEEKDAY * (86400 // self.step)
+
+        self.last_closed: Optional[int] = None
+        self.pending: Dict[int, int] = {}
+        self.n, self.mean, self.m2 = 0, 0.0, 0.0
+        self.ewma: Optional[float] = None
+        self.ewm_var = 0.0
+        self.last_count: Optional[int] = None
+        self.last_z: Optional[float] = None
+        self.last_seasonal_z: Optional[float] = None
+        self.last_ewma_z: Optional[float] = None
+        self.late_articles = 0
+        if row is not None:
+            self.last_closed = row['last_closed']
+            self.pending = {int(b): c for b, c in json.loads(row['pending'] or '{}').items()}
+            self.n, self.mean, self.m2 = row['n'], row['mean'], row['m2']
+            self.ewma, self.ewm_var = row['ewma'], row['ewm_var']
+            self.last_count = row['last_count']
+            self.last_z = row['last_z']
+            self.last_seasonal_z = row['last_seasonal_z']
+            self.last_ewma_z = row['last_ewma_z']
+            self.late_articles = row['late_articles']
+
+        # créneau -> [n, mean, m2], chargés à la demande
+        self.seasonal: Dict[int, List[float]] = {}
+        self.dirty_slots = set()
+        self.peaks: List[Tuple] = []
+
+    def slot(self, bucket: int) -> int:
+        return (bucket + self.season_offset) % self.season_length
+
+    def add(self, bucket: int, count: int):
+        """Compte `count` articles dans `bucket` (en retard si déjà clos)"""
+        if self.last_closed is not None and bucket <= self.last_closed:
+            self.late_articles += count
+        else:
+            self.pending[bucket] = self.pending.get(bucket, 0) + count
+
+    def advance(self, upto: int):
+        """Clôt tous les buckets jusqu'à `upto` inclus, vides compris"""
+        if self.last_closed is not None:
+            start = self.last_closed + 1
+        elif self.pending:
+            start = min(self.pending)
+        else:
+            return
+        for bucket in sorted(b for b in self.pending if b <= upto):
+            if bucket > start:
+                self._close_empty(start, bucket - start)
+            self._close(bucket, self.pending.pop(bucket))
+            start = bucket + 1
+        if upto >= start:
+            self._close_empty(start, upto - start + 1)
+
+    def _close(self, bucket: int, count: int):
+        slot = self.slot(bucket)
+        season = self.seasonal.setdefault(slot, [0, 0.0, 0.0])
+
+        z = _z_score(count, self.n, self.mean, self.m2, MIN_HISTORY)
+        seasonal_z = _z_score(count, season[0], season[1], season[2], MIN_SEASONAL_HISTORY)
+        ewma_z = None
+        if self.ewma is not None and self.n >= MIN_HISTORY and self.ewm_var > 1e-18:
+            ewma_z = (count - self.ewma) / math.sqrt(self.ewm_var)
+
+        # La référence saisonnière prime dès qu'elle a assez d'historique
+        expected = None
+        if seasonal_z is not None:
+            expected, std = season[1], math.sqrt(season[2] / season[0])
+        elif z is not None:
+            expected, std = self.mean, math.sqrt(self.m2 / self.n)
+        if expected is not None and _peak_z(count, expected, std) > Z_THRESHOLD:
+            self.peaks.append((self.kind, self.key, self.granularity, bucket * self.step,
+                               count, expected, z, seasonal_z, ewma_z))
+
+        self.n, self.mean, self.m2 = _welford_merge(self.n, self.mean, self.m2, 1, count)
+        season[0], season[1], season[2] = _welford_merge(season[0], season[1], season[2], 1, count)
+        self.dirty_slots.add(slot)
+        self._ewma_update(count)
+
+        self.last_closed = bucket
+        self.last_count = count
+        self.last_z, self.last_seasonal_z, self.last_ewma_z = z, seasonal_z, ewma_z
+
+    def _close_empty(self, start: int, count: int):
+        """Clôt `count` buckets vides consécutifs (fusion en bloc, puis le dernier)"""
+        batch = count - 1
+        if batch > 0:
+            self.n, self.mean, self.m2 = _welford_merge(self.n, self.mean, self.m2, batch, 0)
+            first_slot = self.slot(start)
+            full, rest = divmod(batch, self.season_length)
+            for i in range(min(batch, self.season_length)):
+                zeros = full + (1 if i < rest else 0)
+                slot = (first_slot + i) % self.season_length
+                season = self.seasonal.setdefault(slot, [0, 0.0, 0.0])
+                season[0], season[1], season[2] = _welford_merge(season[0], season[1], season[2], zeros, 0)
+                self.dirty_slots.add(slot)
+            for _ in range(min(batch, _MAX_EWMA_DECAY_STEPS)):
+                self._ewma_update(0)
+        self._close(start + batch, 0)
+
+    def _ewma_update(self, value: float):
+        if self.ewma is None:
+            self.ewma, self.ewm_var = float(value), 0.0
+            return
+        diff = value - self.ewma
+        increment = EWMA_ALPHA * diff
+        self.ewma += increment
+        self.ewm_var = (1 - EWMA_ALPHA) * (self.ewm_var + diff * increment)
+
+    def state_row(self) -> Tuple:
+        return (self.kind, self.key, self.granularity, self.last_closed,
+                json.dumps(self.pending), self.n, self.mean, self.m2, self.ewma, self.ewm_var,
+                self.last_count, self.last_z, self.last_seasonal_z, self.last_ewma_z,
+                self.late_articles)
+
+    def seasonal_rows(self) -> List[Tuple]:
+        return [(self.kind, self.key, self.granularity, slot, *self.seasonal[slot])
+                for slot in sorted(self.dirty_slots)]
+
+
+class OnlineAnomalyDetector:
+    """
+    Volumes par thème et par flux, à l'heure et au jour
+
+    Chaque série garde un accumulateur de Welford (moyenne/variance sur tout
+    l'historique), une EWMA (niveau récent) et un accumulateur par créneau
+    de la semaine (lundi, mardi... ou lundi 9h...). Un bucket est clos une
+    fois son heure/jour écoulé plus ALLOWED_LATENESS ; son z-score est alors
+    calculé avant mise à jour des statistiques et, s'il dépasse Z_THRESHOLD
+    (écart-type borné par un plancher de Poisson, voir _peak_z), le pic est
+    enregistré dans anomaly_peaks. Le rapport ne lit plus que ces
+    tables, dont la taille dépend du nombre de séries et non d'articles.
+    """
+
+    def __init__(self, db_manager: DatabaseManager):
+        self.db_manager = db_manager
+        self._init_tables()
+
+    def _init_tables(self):
+        with self.db_manager.connection() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            created = conn.execute("""
+                SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'anomaly_series_state'
+            """).fetchone() is None
+
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS anomaly_series_state (
+                    series_kind TEXT NOT NULL,
+                    series_key TEXT NOT NULL,
+                    granularity TEXT NOT NULL,
+                    last_closed INTEGER,
+                    pending TEXT NOT NULL DEFAULT '{}',
+                    n INTEGER NOT NULL DEFAULT 0,
+                    mean REAL NOT NULL DEFAULT 0,
+                    m2 REAL NOT NULL DEFAULT 0,
+                    ewma REAL,
+                    ewm_var REAL NOT NULL DEFAULT 0,
+                    last_count INTEGER,
+                    last_z REAL,
+                    last_seasonal_z REAL,
+                    last_ewma_z REAL,
+                    late_articles INTEGER NOT NULL DEFAULT 0,
+                    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    PRIMARY KEY (series_kind, series_key, granularity)
+                )
+            """)
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS anomaly_seasonal_state (
+                    series_kind TEXT NOT NULL,
+                    series_key TEXT NOT NULL,
+                    granularity TEXT NOT NULL,
+                    slot INTEGER NOT NULL,
+                    n INTEGER NOT NULL DEFAULT 0,
+                    mean REAL NOT NULL DEFAULT 0,
+                    m2 REAL NOT NULL DEFAULT 0,
+                    PRIMARY KEY (series_kind, series_key, granularity, slot)
+                )
+            """)
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS anomaly_peaks (
+                    series_kind TEXT NOT NULL,
+                    series_key TEXT NOT NULL,
+                    granularity TEXT NOT NULL,
+                    bucket_start INTEGER NOT NULL,
+                    article_count INTEGER NOT NULL,
+                    expected REAL,
+                    z_score REAL,
+                    seasonal_z_score REAL,
+                    ewma_z_score REAL,
+                    detected_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    PRIMARY KEY (series_kind, series_key, granularity, bucket_start)
+                )
+            """)
+            conn.execute("""
+                CREATE INDEX IF NOT EXISTS idx_anomaly_peaks_kind_bucket
+                ON anomaly_peaks(series_kind, granularity, bucket_start)
+            """)
+
+            if created:
+                logger.info("📈 Tables de statistiques en ligne créées, rejeu de l'historique...")
+                self._rebuild(conn)
+
+    # ------------------------------------------------------------------
+    # Mise à jour
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _now_ts() -> int:
+        return to_epoch(datetime.now())
+
+    @staticmethod
+    def _closable_bucket(granularity: str, now_ts: int) -> int:
+        """Dernier bucket qu'on peut clore à `now_ts`"""
+        step = GRANULARITIES[granularity]
+        return (now_ts - ALLOWED_LATENESS) // step - 1
+
+    def observe_articles(self, article_ids: List[int]):
+        """
+        Intègre des articles fraîchement ingérés (après l'analyse thématique)
+
+        Lit pub_ts, flux et thèmes qualifiés en base, compte par bucket puis
+        met à jour les séries concernées et clôt les buckets écoulés de
+        toutes les séries, en une transaction.
+        """
+        if not article_ids:
+            return
+        try:
+            now_ts = self._now_ts()
+            counts: Dict[Tuple[str, str, str, int], int] = {}
+            with self.db_manager.connection() as conn:
+                conn.execute("BEGIN IMMEDIATE")
+                for kind, key, pub_ts in self._article_events(conn, article_ids):
+                    pub_ts = min(pub_ts, now_ts)
+                    for granularity, step in GRANULARITIES.items():
+                        bucket_key = (kind, key, granularity, pub_ts // step)
+                        counts[bucket_key] = counts.get(bucket_key, 0) + 1
+
+                series = {(kind, key) for kind, key, _, _ in counts}
+                states = self._load_states(conn, series)
+                for (kind, key, granularity, bucket), count in sorted(counts.items()):
+                    state = states.get((kind, key, granularity))
+                    if state is None:
+                        state = states[(kind, key, granularity)] = _SeriesState(kind, key, granularity)
+                    state.add(bucket, count)
+
+                self._advance(conn, now_ts, states)
+        except Exception as e:
+            logger.error(f"Erreur mise à jour statistiques d'anomalies: {e}")
+
+    def advance(self):
+        """Clôt les buckets écoulés de toutes les séries (avant lecture du rapport)"""
+        try:
+            with self.db_manager.connection() as conn:
+                conn.execute("BEGIN IMMEDIATE")
+                self._advance(conn, self._now_ts(), {})
+        except Exception as e:
+            logger.error(f"Erreur clôture des buckets d'anomalies: {e}")
+
+    @staticmethod
+    def _article_events(conn, article_ids: List[int]) -> Iterable[Tuple[str, str, int]]:
+        """(type de série, clé, pub_ts) : une entrée par flux et par thème qualifié"""
+        for i in range(0, len(article_ids), OBSERVE_CHUNK_SIZE):
+            chunk = article_ids[i:i + OBSERVE_CHUNK_SIZE]
+            placeholders = ','.join('?' * len(chunk))
+            pub_ts = {}
+            for row in conn.execute(f"""
+                SELECT id, COALESCE(feed_url, ''), pub_ts FROM articles
+                WHERE id IN ({placeholders}) AND pub_ts >= 0
+            """, chunk):
+                pub_ts[row[0]] = row[2]
+                yield 'feed', row[1], row[2]
+            for row in conn.execute(f"""
+                SELECT DISTINCT article_id, theme_id FROM theme_analyses
+                WHERE article_id IN ({placeholders})
+                  AND theme_id IS NOT NULL AND confidence >= {THEME_CONFIDENCE_THRESHOLD}
+            """, chunk):
+                if row[0] in pub_ts:
+                    yield 'theme', row[1], pub_ts[row[0]]
+
+    def _load_states(self, conn, series: Iterable[Tuple[str, str]]) -> Dict[Tuple[str, str, str], _SeriesState]:
+        states = {}
+        for kind, key in series:
+            for row in conn.execute("""
+                SELECT * FROM anomaly_series_state WHERE series_kind = ? AND series_key = ?
+            """, (kind, key)):
+                states[(kind, key, row['granularity'])] = _SeriesState(kind, key, row['granularity'], row)
+        return states
+
+    def _advance(self, conn, now_ts: int, states: Dict[Tuple[str, str, str], _SeriesState]):
+        """Clôt les buckets écoulés (séries chargées + séries en retard en base) et persiste"""
+        for granularity in GRANULARITIES:
+            upto = self._closable_bucket(granularity, now_ts)
+            for row in conn.execute("""
+                SELECT * FROM anomaly_series_state
+                WHERE granularity = ? AND (last_closed < ? OR (last_closed IS NULL AND pending != '{}'))
+            """, (granularity, upto)):
+                key = (row['series_kind'], row['series_key'], granularity)
+                if key not in states:
+                    states[key] = _SeriesState(*key, row)
+
+        for state in states.values():
+            upto = self._closable_bucket(state.granularity, now_ts)
+            if state.last_closed is None or state.last_closed < upto:
+                self._load_seasonal(conn, state)
+                state.advance(upto)
+        self._save(conn, states.values())
+
+    @staticmethod
+    def _load_seasonal(conn, state: _SeriesState):
+        for row in conn.execute("""
+            SELECT slot, n, mean, m2 FROM anomaly_seasonal_state
+            WHERE series_kind = ? AND series_key = ? AND granularity = ?
+        """, (state.kind, state.key, state.granularity)):
+            state.seasonal.setdefault(row[0], [row[1], row[2], row[3]])
+
+    @staticmethod
+    def _save(conn, states: Iterable[_SeriesState]):
+        states = list(states)
+        conn.executemany("""
+            INSERT OR REPLACE INTO anomaly_series_state
+                (series_kind, series_key, granularity, last_closed, pending, n, mean, m2,
+                 ewma, ewm_var, last_count, last_z, last_seasonal_z, last_ewma_z,
+                 late_articles, updated_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
+        """, [state.state_row() for state in states])
+        conn.executemany("""
+            INSERT OR REPLACE INTO anomaly_seasonal_state
+                (series_kind, series_key, granularity, slot, n, mean, m2)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+        """, [row for state in states for row in state.seasonal_rows()])
+        conn.executemany("""
+            INSERT OR REPLACE INTO anomaly_peaks
+                (series_kind, series_key, granularity, bucket_start, article_count,
+                 expected, z_score, seasonal_z_score, ewma_z_score)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """, [peak for state in states for peak in state.peaks])
+        for state in states:
+            state.dirty_slots.clear()
+            state.peaks.clear()
+
+    def rebuild(self, kind: Optional[str] = None, keys: Optional[List[str]] = None) -> Dict[str, int]:
+        """
+        Recalcule les séries en rejouant l'historique des articles
+
+        Args:
+            kind: 'feed' ou 'theme' pour ne reconstruire qu'un type de série
+            keys: clés des séries à reconstruire (avec kind), par ex. un thème
+                  dont les analyses viennent d'être recalculées
+        """
+        if kind is not None and kind not in ('feed', 'theme'):
+            raise ValueError(f"Type de série inconnu: {kind}")
+        if keys is not None and kind is None:
+            raise ValueError("keys nécessite kind")
+        with self.db_manager.connection() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            counts = self._rebuild(conn, kind, keys)
+        scope = kind or 'toutes'
+        logger.info(f"✅ Statistiques d'anomalies reconstruites ({scope}) : {counts['series']} séries, "
+                    f"{counts['peaks']} pics")
+        return counts
+
+    def _rebuild(self, conn, kind: Optional[str] = None, keys: Optional[List[str]] = None) -> Dict[str, int]:
+        scope, scope_params = "", []
+        if kind is not None:
+            scope, scope_params = " WHERE series_kind = ?", [kind]
+            if keys is not None:
+                scope += " AND series_key IN (SELECT value FROM json_each(?))"
+                scope_params.append(json.dumps(list(keys)))
+        for table in ('anomaly_series_state', 'anomaly_seasonal_state', 'anomaly_peaks'):
+            conn.execute(f"DELETE FROM {table}{scope}", scope_params)
+
+        key_filter = {'feed': "", 'theme': ""}
+        key_params = []
+        if keys is not None:
+            key_filter = {
+                'feed': "AND COALESCE(feed_url, '') IN (SELECT value FROM json_each(?))",
+                'theme': "AND ta.theme_id IN (SELECT value FROM json_each(?))",
+            }
+            key_params = [json.dumps(list(keys))]
+
+        now_ts = self._now_ts()
+        series = 0
+        for granularity, step in GRANULARITIES.items():
+            upto = self._closable_bucket(granularity, now_ts)
+            sources = {
+                'feed': f"""
+                    SELECT COALESCE(feed_url, ''), MIN(pub_ts, ?) / {step} AS bucket, COUNT(*)
+                    FROM articles
+                    WHERE pub_ts >= 0 {key_filter['feed']}
+                    GROUP BY 1, 2 ORDER BY 1, 2
+                """,
+                'theme': f"""
+                    SELECT ta.theme_id, MIN(a.pub_ts, ?) / {step} AS bucket, COUNT(DISTINCT a.id)
+                    FROM theme_analyses ta
+                    JOIN articles a ON a.id = ta.article_id
+                    WHERE a.pub_ts >= 0 AND ta.theme_id IS NOT NULL
+                      AND ta.confidence >= {THEME_CONFIDENCE_THRESHOLD} {key_filter['theme']}
+                    GROUP BY 1, 2 ORDER BY 1, 2
+                """,
+            }
+            for series_kind, sql in sources.items():
+                if kind is not None and series_kind != kind:
+                    continue
+                state = None
+                for key, bucket, count in conn.execute(sql, [now_ts] + key_params).fetchall():
+                    if state is None or state.key != key:
+                        if state is not None:
+                            state.advance(upto)
+                            self._save(conn, [state])
+                            series += 1
+                        state = _SeriesState(series_kind, key, granularity)
+                    # Buckets lus dans l'ordre : clore au fur et à mesure
+                    state.advance(min(bucket - 1, upto))
+                    state.add(bucket, count)
+                if state is not None:
+                    state.advance(upto)
+                    self._save(conn, [state])
+                    series += 1
+
+        return {
+            'series': series,
+            'peaks': conn.execute("SELECT COUNT(*) FROM anomaly_peaks").fetchone()[0]
+        }
+
+    # ------------------------------------------------------------------
+    # Lecture
+    # ------------------------------------------------------------------
+
+    def series_states(self, kind: str, granularity: str = 'day') -> Dict[str, Dict[str, Any]]:
+        """Statistiques courantes de toutes les séries d'un type, en une requête"""
+        step = GRANULARITIES[granularity]
+        rows = self.db_manager.execute_query("""
+            SELECT series_key, n, mean, m2, ewma, ewm_var, last_closed, last_count,
+                   last_z, last_seasonal_z, last_ewma_z, late_articles
+            FROM anomaly_series_state
+            WHERE series_kind = ? AND granularity = ?
+        """, (kind, granularity))
+        states = {}
+        for row in rows:
+            states[row['series_key']] = {
+                'buckets': row['n'],
+                'mean': row['mean'],
+                'std': math.sqrt(row['m2'] / row['n']) if row['n'] else 0.0,
+                'ewma': row['ewma'],
+                'last_bucket': _bucket_label(row['last_closed'] * step, granularity)
+                               if row['last_closed'] is not None else None,
+                'last_count': row['last_count'],
+                'z_score': row['last_z'],
+                'seasonal_z_score': row['last_seasonal_z'],
+                'ewma_z_score': row['last_ewma_z'],
+                'late_articles': row['late_articles'],
+            }
+        return states
+
+    def peaks(self, kind: str, since: datetime, granularity: Optional[str] = None) -> Dict[str, List[Dict[str, Any]]]:
+        """Pics enregistrés depuis `since`, par clé de série"""
+        conditions = ["series_kind = ?", "bucket_start >= ?"]
+        params: List[Any] = [kind, to_epoch(since)]
+        if granularity:
+            conditions.insert(1, "granularity = ?")
+            params.insert(1, granularity)
+        else:
+            conditions.insert(1, f"granularity IN ({','.join('?' * len(GRANULARITIES))})")
+            params[1:1] = list(GRANULARITIES)
+        rows = self.db_manager.execute_query(f"""
+            SELECT series_key, granularity, bucket_start, article_count, expected,
+                   z_score, seasonal_z_score, ewma_z_score
+            FROM anomaly_peaks
+            WHERE {' AND '.join(conditions)}
+            ORDER BY bucket_start
+        """, tuple(params))
+        peaks: Dict[str, List[Dict[str, Any]]] = {}
+        for row in rows:
+            expected = row['expected'] or 0.0
+            peaks.setdefault(row['series_key'], []).append({
+                'granularity': row['granularity'],
+                'date': _bucket_label(row['bucket_start'], row['granularity']),
+                'count': row['article_count'],
+                'expected': expected,
+                'z_score': row['seasonal_z_score'] if row['seasonal_z_score'] is not None else row['z_score'],
+                'global_z_score': row['z_score'],
+                'seasonal_z_score': row['seasonal_z_score'],
+                'ewma_z_score': row['ewma_z_score'],
+                'increase_factor': row['article_count'] / max(1.0, expected),
+            })
+        return peaks
+
+
+def _bucket_label(bucket_start: int, granularity: str) -> str:
+    """Date (jour) ou date et heure du bucket, dans l'heure murale de pub_ts"""
+    moment = datetime(1970, 1, 1) + timedelta(seconds=bucket_start)
+    return moment.strftime('%Y-%m-%d' if granularity == 'day' else '%Y-%m-%d %H:00')
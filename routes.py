@@ -1,18 +1,25 @@
 # Flask/routes.py - VERSION COMPLÈTEMENT CORRIGÉE
 
-from flask import Flask, render_template, request, jsonify, send_file, Response
+from flask import Flask, render_template, request, jsonify, send_file, Response, stream_with_context
 from datetime import datetime, timedelta
 import json
 import logging
-import csv
-from io import StringIO, BytesIO
+from io import BytesIO
 from xhtml2pdf import pisa
 import tempfile
 import sqlite3
 import os
-from .database import DatabaseManager
+import threading
+from .database import DatabaseManager, day_range, to_epoch
 from .theme_manager import ThemeManager
 from .theme_analyzer import ThemeAnalyzer
+from .theme_reanalysis import get_reanalysis_job
+from .job_queue import JobQueue
+from .stats_rollup import StatsRollup
+from .article_search import ArticleSearchIndex, highlight_snippet
+from .article_listing import parse_fields, select_columns, cursor_condition, build_page
+from .article_export import ArticleExporter, export_filename, export_mimetype
+from . import job_handlers  # noqa: F401 - enregistre les types de tâches
 from .rss_manager import RSSManager
 from .llama_client import LlamaClient
 
@@ -52,6 +59,50 @@ def register_routes(app: Flask, db_manager: DatabaseManager, theme_manager: Them
         )
     
     logger.info("✅ Analyseur batch initialisé avec succès")
+
+    # Ré-analyse thématique en tâche de fond (reprise automatique après arrêt)
+    reanalysis_job = get_reanalysis_job(db_manager)
+    try:
+        reanalysis_job.resume_if_interrupted()
+    except Exception as e:
+        logger.warning(f"⚠️ Reprise de la ré-analyse impossible: {e}")
+
+    # File de tâches longues (processus de travail séparés)
+    job_queue = app.config.get('JOB_QUEUE')
+    if job_queue is None:
+        job_queue = JobQueue(db_manager)
+        app.config['JOB_QUEUE'] = job_queue
+        try:
+            job_queue.start()
+        except Exception as e:
+            logger.warning(f"⚠️ Processus de travail non démarrés: {e}")
+
+    # Agrégats journaliers du tableau de bord (maintenus par triggers)
+    stats_rollup = StatsRollup(db_manager)
+
+    # Index plein texte des articles (créé par la migration 04_create_articles_fts)
+    search_index = ArticleSearchIndex(db_manager)
+    article_exporter = ArticleExporter(db_manager)
+
+    def submit_job(job_type, params):
+        """Ajoute une tâche (ou réutilise l'identique en cours) : réponse 202"""
+        job, created = job_queue.submit(job_type, params)
+        return jsonify({
+            'success': True,
+            'message': 'Tâche lancée en arrière-plan' if created else 'Tâche identique déjà en cours',
+            'reused': not created,
+            'job': job,
+            'status_url': f"/api/jobs/{job['id']}"
+        }), 202
+
+    def rescore_theme_async(theme_id):
+        """Recalcul incrémental d'un seul thème, hors du thread de la requête"""
+        def run():
+            try:
+                theme_analyzer.rescore_theme(theme_id)
+            except Exception as e:
+                logger.error(f"Erreur recalcul thème {theme_id}: {e}")
+        threading.Thread(target=run, name=f'rescore-{theme_id}', daemon=True).start()
     
     # ===== ROUTES PRINCIPALES =====
     @app.route('/')
@@ -97,6 +148,8 @@ def register_routes(app: Flask, db_manager: DatabaseManager, theme_manager: Them
             success = theme_manager.create_theme(theme_id, name, keywords, color, description)
 
             if success:
+                theme_analyzer.clear_cache()
+                rescore_theme_async(theme_id)
                 return jsonify({'message': 'Thème créé avec succès'})
             else:
                 return jsonify({'error': 'Erreur création thème'}), 500
@@ -120,6 +173,7 @@ def register_routes(app: Flask, db_manager: DatabaseManager, theme_manager: Them
 
             if success:
                 theme_analyzer.clear_cache()
+                rescore_theme_async(theme_id)
                 return jsonify({'message': 'Thème mis à jour avec succès'})
             else:
                 return jsonify({'error': 'Thème non trouvé'}), 404
@@ -146,63 +200,65 @@ def register_routes(app: Flask, db_manager: DatabaseManager, theme_manager: Them
     # ===== API ROUTES - ARTICLES =====
     @app.route('/api/articles')
     def get_articles():
-        """Récupère les articles avec filtres"""
+        """
+        Récupère les articles avec filtres
+
+        Pagination par curseur : passer le `next_cursor` de la réponse
+        précédente dans `cursor=`. `fields=` restreint les champs renvoyés ;
+        `content` est l'extrait précalculé (200 caractères).
+        """
         try:
             theme = request.args.get('theme')
             sentiment = request.args.get('sentiment')
             limit = int(request.args.get('limit', 50))
             offset = int(request.args.get('offset', 0))
+            cursor_token = request.args.get('cursor')
 
-            conn = db_manager.get_connection()
-            cursor = conn.cursor()
-
-            query = """
-                SELECT a.id, a.title, a.content, a.link, a.pub_date, 
-                       a.sentiment_type, a.sentiment_score, a.feed_url,
-                       a.detailed_sentiment, a.roberta_score
-                FROM articles a
-            """
-            params = []
+            try:
+                fields = parse_fields(request.args.get('fields'))
+                columns, names = select_columns(fields, content_as_excerpt=True)
+                conditions, params = [], []
+                if cursor_token:
+                    condition, cursor_params = cursor_condition(cursor_token)
+                    conditions.append(condition)
+                    params.extend(cursor_params)
+            except ValueError as e:
+                return jsonify({'error': str(e)}), 400
 
             if theme:
-                query += """
-                    JOIN theme_analyses ta ON a.id = ta.article_id
-                    JOIN themes t ON ta.theme_id = t.id
-                    WHERE t.id = ? AND ta.confidence >= 0.3
-                """
+                conditions.append("""a.id IN (
+                    SELECT ta.article_id FROM theme_analyses ta
+                    WHERE ta.theme_id = ? AND ta.confidence >= 0.3
+                )""")
                 params.append(theme)
-            else:
-                query += " WHERE 1=1"
 
             if sentiment and sentiment != 'all':
                 if sentiment in ['positive', 'negative', 'neutral_positive', 'neutral_negative']:
-                    query += " AND a.detailed_sentiment = ?"
+                    conditions.append("a.detailed_sentiment = ?")
                 else:
-                    query += " AND a.sentiment_type = ?"
+                    conditions.append("a.sentiment_type = ?")
                 params.append(sentiment)
 
-            query += " ORDER BY a.pub_date DESC LIMIT ? OFFSET ?"
-            params.extend([limit, offset])
+            query = f"SELECT {columns} FROM articles a"
+            if conditions:
+                query += " WHERE " + " AND ".join(conditions)
 
-            cursor.execute(query, params)
-            articles = []
+            # Une ligne de plus que demandé : indique s'il reste une page
+            query += " ORDER BY a.pub_date DESC, a.id DESC LIMIT ?"
+            params.append(limit + 1)
+            if offset and not cursor_token:
+                # Compatibilité : préférer cursor=, dont le coût ne croît pas avec la page
+                query += " OFFSET ?"
+                params.append(offset)
 
-            for row in cursor.fetchall():
-                articles.append({
-                    'id': row[0],
-                    'title': row[1],
-                    'content': row[2][:200] + '...' if row[2] and len(row[2]) > 200 else row[2],
-                    'link': row[3],
-                    'pub_date': row[4],
-                    'sentiment': row[5],
-                    'sentiment_score': row[6],
-                    'feed_url': row[7],
-                    'detailed_sentiment': row[8],
-                    'roberta_score': row[9]
-                })
+            rows = db_manager.execute_query(query, tuple(params))
+            articles, next_cursor = build_page(rows, names, fields, limit)
 
-            conn.close()
-            return jsonify({'articles': articles})
+            return jsonify({
+                'articles': articles,
+                'next_cursor': next_cursor,
+                'has_more': next_cursor is not None
+            })
 
         except Exception as e:
             logger.error(f"Erreur récupération articles: {e}")
@@ -213,32 +269,17 @@ def register_routes(app: Flask, db_manager: DatabaseManager, theme_manager: Them
     def get_stats():
         """Récupère les statistiques avec les 4 catégories de sentiment"""
         try:
-            conn = db_manager.get_connection()
-            cursor = conn.cursor()
+            # 1. Compter les articles par catégorie détaillée (agrégats journaliers)
+            counts = stats_rollup.sentiment_counts()
+            legacy_neutral = counts.get('legacy_neutral', 0)
 
-            # 1. Compter les articles par catégorie détaillée
-            cursor.execute("""
-                SELECT 
-                    COUNT(CASE WHEN detailed_sentiment = 'positive' THEN 1 END) as positive,
-                    COUNT(CASE WHEN detailed_sentiment = 'neutral_positive' THEN 1 END) as neutral_positive, 
-                    COUNT(CASE WHEN detailed_sentiment = 'neutral_negative' THEN 1 END) as neutral_negative,
-                    COUNT(CASE WHEN detailed_sentiment = 'negative' THEN 1 END) as negative,
-                    COUNT(CASE WHEN detailed_sentiment IS NULL AND sentiment_type = 'positive' THEN 1 END) as legacy_positive,
-                    COUNT(CASE WHEN detailed_sentiment IS NULL AND sentiment_type = 'negative' THEN 1 END) as legacy_negative,
-                    COUNT(CASE WHEN detailed_sentiment IS NULL AND sentiment_type = 'neutral' THEN 1 END) as legacy_neutral,
-                    COUNT(*) as total
-                FROM articles
-            """)
-            
-            row = cursor.fetchone()
-            
             # 2. Combiner données RoBERTa (nouvelles) et données legacy (anciennes)
-            positive_count = (row[0] or 0) + (row[4] or 0)
-            neutral_positive_count = (row[1] or 0) + (row[6] or 0) // 2
-            neutral_negative_count = (row[2] or 0) + (row[6] or 0) - ((row[6] or 0) // 2)
-            negative_count = (row[3] or 0) + (row[5] or 0)
-            
-            total_articles = row[7] or 0
+            positive_count = counts.get('positive', 0) + counts.get('legacy_positive', 0)
+            neutral_positive_count = counts.get('neutral_positive', 0) + legacy_neutral // 2
+            neutral_negative_count = counts.get('neutral_negative', 0) + legacy_neutral - legacy_neutral // 2
+            negative_count = counts.get('negative', 0) + counts.get('legacy_negative', 0)
+
+            total_articles = counts['total']
             
             # 3. Distribution des sentiments (4 catégories)
             sentiment_distribution = {
@@ -253,50 +294,27 @@ def register_routes(app: Flask, db_manager: DatabaseManager, theme_manager: Them
             }
             
             # 4. Statistiques RoBERTa vs Traditional
-            cursor.execute("""
-                SELECT 
-                    COUNT(CASE WHEN analysis_model = 'roberta' THEN 1 END) as roberta_articles,
-                    COUNT(CASE WHEN analysis_model = 'traditional' THEN 1 END) as traditional_articles,
-                    COUNT(CASE WHEN analysis_model IS NULL THEN 1 END) as no_model_articles,
-                    AVG(CASE WHEN roberta_score IS NOT NULL THEN roberta_score END) as avg_roberta_score
-                FROM articles
-            """)
-            
-            model_stats_row = cursor.fetchone()
-            
+            model_usage = stats_rollup.model_usage()
+            avg_roberta_score = model_usage['avg_roberta_score']
+
             # 5. Stats des thèmes
-            cursor.execute("""
-                SELECT 
-                    t.id, 
-                    t.name, 
-                    t.color,
-                    COUNT(DISTINCT ta.article_id) as article_count
-                FROM themes t
-                LEFT JOIN theme_analyses ta ON t.id = ta.theme_id AND ta.confidence >= 0.3
-                GROUP BY t.id, t.name, t.color
-                ORDER BY article_count DESC
-            """)
-            
             theme_stats = {}
-            for theme_row in cursor.fetchall():
-                theme_id, name, color, count = theme_row
-                theme_stats[theme_id] = {
-                    'name': name,
-                    'color': color,
-                    'article_count': count
+            for theme in stats_rollup.theme_counts():
+                theme_stats[theme['id']] = {
+                    'name': theme['name'],
+                    'color': theme['color'],
+                    'article_count': theme['article_count']
                 }
-            
-            conn.close()
 
             return jsonify({
                 'success': True,
                 'total_articles': total_articles,
                 'sentiment_distribution': sentiment_distribution,
                 'model_usage': {
-                    'roberta': model_stats_row[0] if model_stats_row and model_stats_row[0] is not None else 0,
-                    'traditional': model_stats_row[1] if model_stats_row and model_stats_row[1] is not None else 0,
-                    'legacy': model_stats_row[2] if model_stats_row and model_stats_row[2] is not None else 0,
-                    'avg_roberta_score': round(model_stats_row[3], 4) if model_stats_row and model_stats_row[3] is not None else 0
+                    'roberta': model_usage.get('roberta', 0),
+                    'traditional': model_usage.get('traditional', 0),
+                    'legacy': model_usage.get('', 0),
+                    'avg_roberta_score': round(avg_roberta_score, 4) if avg_roberta_score is not None else 0
                 },
                 'theme_stats': theme_stats,
                 'categories_explanation': {
@@ -330,49 +348,24 @@ def register_routes(app: Flask, db_manager: DatabaseManager, theme_manager: Them
     def get_timeline_stats():
         """Récupère les données d'évolution temporelle - NOUVELLE ROUTE"""
         try:
-            conn = db_manager.get_connection()
-            cursor = conn.cursor()
-
-            # Récupérer les données des 30 derniers jours
-            cursor.execute("""
-                SELECT 
-                    DATE(pub_date) as date,
-                    COUNT(CASE WHEN detailed_sentiment = 'positive' THEN 1 END) as positive,
-                    COUNT(CASE WHEN detailed_sentiment = 'negative' THEN 1 END) as negative,
-                    COUNT(CASE WHEN detailed_sentiment = 'neutral_positive' THEN 1 END) as neutral_positive,
-                    COUNT(CASE WHEN detailed_sentiment = 'neutral_negative' THEN 1 END) as neutral_negative,
-                    COUNT(CASE WHEN detailed_sentiment IS NULL AND sentiment_type = 'positive' THEN 1 END) as legacy_positive,
-                    COUNT(CASE WHEN detailed_sentiment IS NULL AND sentiment_type = 'negative' THEN 1 END) as legacy_negative,
-                    COUNT(CASE WHEN detailed_sentiment IS NULL AND sentiment_type = 'neutral' THEN 1 END) as legacy_neutral,
-                    COUNT(*) as total
-                FROM articles 
-                WHERE pub_date >= DATE('now', '-30 days')
-                GROUP BY DATE(pub_date)
-                ORDER BY date ASC
-                LIMIT 30
-            """)
-            
+            # Récupérer les données des 30 derniers jours (agrégats journaliers)
             timeline_data = []
-            for row in cursor.fetchall():
-                date, positive, negative, neutral_positive, neutral_negative, legacy_positive, legacy_negative, legacy_neutral, total = row
-                
+            for day in stats_rollup.timeline(days=30):
                 # Combiner données RoBERTa et legacy
-                combined_positive = (positive or 0) + (legacy_positive or 0)
-                combined_negative = (negative or 0) + (legacy_negative or 0)
-                combined_neutral = (neutral_positive or 0) + (neutral_negative or 0) + (legacy_neutral or 0)
+                combined_positive = day['positive'] + day['legacy_positive']
+                combined_negative = day['negative'] + day['legacy_negative']
+                combined_neutral = day['neutral_positive'] + day['neutral_negative'] + day['legacy_neutral']
                 
                 timeline_data.append({
-                    'date': date,
+                    'date': day['day'],
                     'positive': combined_positive,
                     'negative': combined_negative,
                     'neutral': combined_neutral,
-                    'neutral_positive': neutral_positive or 0,
-                    'neutral_negative': neutral_negative or 0,
-                    'total': total or 0
+                    'neutral_positive': day['neutral_positive'],
+                    'neutral_negative': day['neutral_negative'],
+                    'total': day['total']
                 })
             
-            conn.close()
-            
             # Si pas de données, créer des données factices pour le graphique
             if not timeline_data:
                 logger.info("Aucune donnée timeline, génération de données factices")
@@ -404,6 +397,29 @@ def register_routes(app: Flask, db_manager: DatabaseManager, theme_manager: Them
                 'timeline': []
             }), 500
 
+    @app.route('/api/stats/rebuild', methods=['POST'])
+    def rebuild_stats():
+        """Recalcule entièrement les agrégats journaliers des statistiques"""
+        try:
+            counts = stats_rollup.rebuild()
+            return jsonify({'success': True, 'rows': counts})
+        except Exception as e:
+            logger.error(f"Erreur reconstruction agrégats: {e}")
+            return jsonify({'success': False, 'error': str(e)}), 500
+
+    @app.route('/api/anomalies/rebuild', methods=['POST'])
+    def rebuild_anomaly_series():
+        """Recalcule les séries de détection d'anomalies (toutes, ou un type / des clés)"""
+        try:
+            data = request.get_json(silent=True) or {}
+            counts = rss_manager.online_anomalies.rebuild(data.get('kind'), data.get('keys'))
+            return jsonify({'success': True, 'rows': counts})
+        except ValueError as e:
+            return jsonify({'success': False, 'error': str(e)}), 400
+        except Exception as e:
+            logger.error(f"Erreur reconstruction séries d'anomalies: {e}")
+            return jsonify({'success': False, 'error': str(e)}), 500
+
     # ===== API ROUTES - RSS =====
     @app.route('/api/update-feeds', methods=['POST'])
     def update_feeds():
@@ -417,6 +433,10 @@ def register_routes(app: Flask, db_manager: DatabaseManager, theme_manager: Them
 
             results = rss_manager.update_feeds(feed_urls)
 
+            # Entités des nouveaux articles extraites une fois, hors requête
+            if results.get('new_articles') and app.config.get('ENTITY_EXTRACTOR') is not None:
+                job_queue.submit('entity_backfill', {})
+
             return jsonify({
                 'message': 'Mise à jour terminée',
                 'results': results
@@ -485,7 +505,12 @@ def register_routes(app: Flask, db_manager: DatabaseManager, theme_manager: Them
 
     @app.route('/api/articles/filter')
     def filter_articles():
-        """Filtre les articles selon plusieurs critères"""
+        """
+        Filtre les articles selon plusieurs critères
+
+        `fields=` restreint les champs renvoyés ; hors recherche plein texte
+        (triée par pertinence), `cursor=` pagine sur (pub_date, id).
+        """
         try:
             theme = request.args.get('theme')
             sentiment = request.args.get('sentiment')
@@ -494,26 +519,39 @@ def register_routes(app: Flask, db_manager: DatabaseManager, theme_manager: Them
             date_to = request.args.get('date_to')
             search = request.args.get('search', '')
             limit = int(request.args.get('limit', 100))
+            cursor_token = request.args.get('cursor')
 
-            conn = db_manager.get_connection()
-            cursor = conn.cursor()
-
-            query = """
-                SELECT DISTINCT a.id, a.title, a.content, a.link, a.pub_date, 
-                       a.sentiment_type, a.sentiment_score, a.feed_url,
-                       a.detailed_sentiment, a.roberta_score
-                FROM articles a
-            """
+            # Recherche plein texte : classement bm25 et extrait surligné
+            fts = search_index.search_clause(search) if search else None
 
             joins = []
             conditions = []
             params = []
 
+            try:
+                fields = parse_fields(request.args.get('fields'))
+                columns, names = select_columns(fields)
+                if cursor_token and not fts:
+                    condition, cursor_params = cursor_condition(cursor_token)
+                    conditions.append(condition)
+                    params.extend(cursor_params)
+            except ValueError as e:
+                return jsonify({'error': str(e)}), 400
+
+            if fts:
+                columns += ', ' + fts['columns']
+                names += ['snippet', 'rank']
+                joins.append(fts['join'])
+                conditions.insert(0, fts['condition'])
+                params.insert(0, fts['param'])
+
+            query = f"SELECT {columns} FROM articles a "
+
             if theme and theme != 'all':
-                joins.append("""
-                    LEFT JOIN theme_analyses ta ON a.id = ta.article_id
-                """)
-                conditions.append("ta.theme_id = ? AND ta.confidence >= 0.3")
+                conditions.append("""a.id IN (
+                    SELECT ta.article_id FROM theme_analyses ta
+                    WHERE ta.theme_id = ? AND ta.confidence >= 0.3
+                )""")
                 params.append(theme)
 
             if sentiment and sentiment != 'all':
@@ -527,15 +565,14 @@ def register_routes(app: Flask, db_manager: DatabaseManager, theme_manager: Them
                 conditions.append("a.feed_url = ?")
                 params.append(source)
 
-            if date_from:
-                conditions.append("DATE(a.pub_date) >= ?")
-                params.append(date_from)
-
-            if date_to:
-                conditions.append("DATE(a.pub_date) <= ?")
-                params.append(date_to)
+            try:
+                for condition, value in day_range(date_from, date_to):
+                    conditions.append(condition)
+                    params.append(value)
+            except ValueError:
+                return jsonify({'error': 'Date invalide (format attendu: AAAA-MM-JJ)'}), 400
 
-            if search:
+            if search and not fts:
                 conditions.append("(a.title LIKE ? OR a.content LIKE ?)")
                 search_pattern = f"%{search}%"
                 params.extend([search_pattern, search_pattern])
@@ -545,28 +582,31 @@ def register_routes(app: Flask, db_manager: DatabaseManager, theme_manager: Them
             if conditions:
                 query += " WHERE " + " AND ".join(conditions)
 
-            query += " ORDER BY a.pub_date DESC LIMIT ?"
-            params.append(limit)
-
-            cursor.execute(query, params)
-
-            articles = []
-            for row in cursor.fetchall():
-                articles.append({
-                    'id': row[0],
-                    'title': row[1],
-                    'content': row[2],
-                    'link': row[3],
-                    'pub_date': row[4],
-                    'sentiment': row[5],
-                    'sentiment_score': row[6],
-                    'feed_url': row[7],
-                    'detailed_sentiment': row[8],
-                    'roberta_score': row[9]
-                })
+            if fts:
+                query += f" ORDER BY {fts['order']}, a.pub_date DESC, a.id DESC LIMIT ?"
+            else:
+                query += " ORDER BY a.pub_date DESC, a.id DESC LIMIT ?"
+            params.append(limit + 1)
+
+            rows = db_manager.execute_query(query, tuple(params))
+
+            if fts:
+                articles = []
+                for row in rows[:limit]:
+                    values = dict(zip(names, row))
+                    article = {field: values[field] for field in fields}
+                    article['snippet'] = highlight_snippet(values['snippet'])
+                    article['rank'] = values['rank']
+                    articles.append(article)
+                next_cursor = None
+            else:
+                articles, next_cursor = build_page(rows, names, fields, limit)
 
-            conn.close()
-            return jsonify({'articles': articles})
+            return jsonify({
+                'articles': articles,
+                'next_cursor': next_cursor,
+                'has_more': next_cursor is not None or (fts is not None and len(rows) > limit)
+            })
 
         except Exception as e:
             logger.error(f"Erreur filtrage articles: {e}")
@@ -574,7 +614,12 @@ def register_routes(app: Flask, db_manager: DatabaseManager, theme_manager: Them
 
     @app.route('/api/articles/export')
     def export_articles():
-        """Exporte les articles filtrés en CSV"""
+        """
+        Exporte les articles filtrés, sans limite, en flux
+
+        format=csv|ndjson|parquet|arrow (csv par défaut), gzip=true pour
+        compresser. Inclut les scores de thème et le nombre de corroborations.
+        """
         try:
             theme = request.args.get('theme')
             sentiment = request.args.get('sentiment')
@@ -582,24 +627,17 @@ def register_routes(app: Flask, db_manager: DatabaseManager, theme_manager: Them
             date_from = request.args.get('date_from')
             date_to = request.args.get('date_to')
             search = request.args.get('search', '')
+            fmt = request.args.get('format', 'csv').lower()
+            compress = request.args.get('gzip', 'false').lower() in ('1', 'true', 'yes')
 
-            conn = db_manager.get_connection()
-            cursor = conn.cursor()
-
-            query = """
-                SELECT DISTINCT a.id, a.title, a.content, a.link, a.pub_date, 
-                       a.sentiment_type, a.sentiment_score, a.feed_url,
-                       a.detailed_sentiment, a.roberta_score
-                FROM articles a
-            """
-
-            joins = []
             conditions = []
             params = []
 
             if theme and theme != 'all':
-                joins.append("LEFT JOIN theme_analyses ta ON a.id = ta.article_id")
-                conditions.append("ta.theme_id = ? AND ta.confidence >= 0.3")
+                conditions.append("""a.id IN (
+                    SELECT ta.article_id FROM theme_analyses ta
+                    WHERE ta.theme_id = ? AND ta.confidence >= 0.3
+                )""")
                 params.append(theme)
 
             if sentiment and sentiment != 'all':
@@ -613,44 +651,32 @@ def register_routes(app: Flask, db_manager: DatabaseManager, theme_manager: Them
                 conditions.append("a.feed_url = ?")
                 params.append(source)
 
-            if date_from:
-                conditions.append("DATE(a.pub_date) >= ?")
-                params.append(date_from)
-
-            if date_to:
-                conditions.append("DATE(a.pub_date) <= ?")
-                params.append(date_to)
-
-            if search:
+            try:
+                for condition, value in day_range(date_from, date_to):
+                    conditions.append(condition)
+                    params.append(value)
+            except ValueError:
+                return jsonify({'error': 'Date invalide (format attendu: AAAA-MM-JJ)'}), 400
+
+            fts_condition = search_index.filter_condition(search) if search else None
+            if fts_condition:
+                conditions.append(fts_condition[0])
+                params.append(fts_condition[1])
+            elif search:
                 conditions.append("(a.title LIKE ? OR a.content LIKE ?)")
                 search_pattern = f"%{search}%"
                 params.extend([search_pattern, search_pattern])
 
-            query += " ".join(joins)
-
-            if conditions:
-                query += " WHERE " + " AND ".join(conditions)
-
-            query += " ORDER BY a.pub_date DESC LIMIT 1000"
-
-            cursor.execute(query, params)
-
-            output = StringIO()
-            writer = csv.writer(output)
-
-            writer.writerow(['ID', 'Titre', 'Contenu', 'Lien', 'Date', 'Sentiment', 'Score', 'Source', 'Sentiment Détaillé', 'Score RoBERTa'])
-
-            for row in cursor.fetchall():
-                writer.writerow(row)
-
-            conn.close()
+            try:
+                chunks = article_exporter.stream(fmt, " AND ".join(conditions), params, compress)
+            except ValueError as e:
+                return jsonify({'error': str(e)}), 400
 
-            output.seek(0)
             return Response(
-                output.getvalue(),
-                mimetype='text/csv',
+                stream_with_context(chunks),
+                mimetype=export_mimetype(fmt, compress),
                 headers={
-                    'Content-Disposition': 'attachment; filename=articles_export.csv'
+                    'Content-Disposition': f'attachment; filename={export_filename(fmt, compress)}'
                 }
             )
 
@@ -859,12 +885,9 @@ def register_routes(app: Flask, db_manager: DatabaseManager, theme_manager: Them
             """
             params = []
             
-            if start_date:
-                query += " AND DATE(pub_date) >= ?"
-                params.append(start_date)
-            if end_date:
-                query += " AND DATE(pub_date) <= ?"
-                params.append(end_date)
+            for condition, value in day_range(start_date, end_date, column='pub_ts'):
+                query += f" AND {condition}"
+                params.append(value)
             if themes:
                 placeholders = ','.join('?' * len(themes))
                 query += f" AND id IN (SELECT DISTINCT article_id FROM theme_analyses WHERE theme_id IN ({placeholders}) AND confidence >= 0.3)"
@@ -1115,6 +1138,8 @@ def register_routes(app: Flask, db_manager: DatabaseManager, theme_manager: Them
             result = advanced_theme_manager.create_advanced_theme(data)
 
             if result['success']:
+                theme_analyzer.clear_cache()
+                rescore_theme_async(result['theme_id'])
                 return jsonify(result), 200
             else:
                 return jsonify(result), 400
@@ -1244,47 +1269,90 @@ def register_routes(app: Flask, db_manager: DatabaseManager, theme_manager: Them
 
     @app.route('/api/reanalyze-articles', methods=['POST'])
     def reanalyze_articles():
-        """Ré-analyse tous les articles avec les thèmes actuels"""
+        """Lance la ré-analyse de tous les articles en tâche de fond"""
         try:
+            data = request.get_json(silent=True) or {}
             logger.info("🔄 Démarrage de la ré-analyse des articles...")
-            theme_analyzer.reanalyze_all_articles()
+            theme_analyzer.clear_cache()
+            status = reanalysis_job.start(restart=bool(data.get('restart', False)))
 
-            conn = db_manager.get_connection()
-            cursor = conn.cursor()
+            return jsonify({
+                'success': True,
+                'message': 'Ré-analyse lancée en arrière-plan',
+                'status_url': '/api/reanalyze-articles/status',
+                'job': status
+            }), 202
 
-            cursor.execute("SELECT COUNT(*) FROM articles")
-            total_articles = cursor.fetchone()[0]
+        except Exception as e:
+            logger.error(f"Erreur ré-analyse: {e}")
+            return jsonify({
+                'success': False,
+                'error': str(e)
+            }), 500
 
-            cursor.execute("""
-                SELECT COUNT(DISTINCT article_id) 
-                FROM theme_analyses 
-                WHERE confidence >= 0.2
-            """)
-            analyzed_articles = cursor.fetchone()[0]
+    @app.route('/api/reanalyze-articles/cancel', methods=['POST'])
+    def cancel_reanalyze_articles():
+        """Interrompt la ré-analyse (reprise possible depuis le point de contrôle)"""
+        try:
+            return jsonify({'success': True, 'job': reanalysis_job.cancel()})
+        except Exception as e:
+            logger.error(f"Erreur annulation ré-analyse: {e}")
+            return jsonify({
+                'success': False,
+                'error': str(e)
+            }), 500
 
-            cursor.execute("""
-                SELECT theme_id, COUNT(DISTINCT article_id) as count
-                FROM theme_analyses
-                WHERE confidence >= 0.2
-                GROUP BY theme_id
-            """)
+    @app.route('/api/themes/<theme_id>/rescore', methods=['POST'])
+    def rescore_theme(theme_id):
+        """Recalcule uniquement les scores d'un thème (mode incrémental)"""
+        try:
+            stats = theme_analyzer.rescore_theme(theme_id)
+            return jsonify({'success': True, 'results': stats})
+        except Exception as e:
+            logger.error(f"Erreur recalcul thème {theme_id}: {e}")
+            return jsonify({
+                'success': False,
+                'error': str(e)
+            }), 500
 
-            theme_counts = {row[0]: row[1] for row in cursor.fetchall()}
-            conn.close()
+    @app.route('/api/reanalyze-articles/status', methods=['GET'])
+    def reanalyze_articles_status():
+        """Progression de la ré-analyse (et résultats une fois terminée)"""
+        try:
+            status = reanalysis_job.get_status()
+            response = {'success': True, 'job': status}
+
+            if status['status'] == 'completed':
+                conn = db_manager.get_connection()
+                cursor = conn.cursor()
+
+                cursor.execute("""
+                    SELECT theme_id, COUNT(DISTINCT article_id) as count
+                    FROM theme_analyses
+                    WHERE confidence >= 0.2
+                    GROUP BY theme_id
+                """)
+                theme_counts = {row[0]: row[1] for row in cursor.fetchall()}
 
-            return jsonify({
-                'success': True,
-                'message': 'Ré-analyse terminée avec succès',
-                'results': {
-                    'total_articles': total_articles,
+                cursor.execute("""
+                    SELECT COUNT(DISTINCT article_id)
+                    FROM theme_analyses
+                    WHERE confidence >= 0.2
+                """)
+                analyzed_articles = cursor.fetchone()[0]
+                conn.close()
+
+                response['results'] = {
+                    'total_articles': status['total'],
                     'analyzed_articles': analyzed_articles,
                     'themes_detected': len(theme_counts),
                     'theme_distribution': theme_counts
                 }
-            })
+
+            return jsonify(response)
 
         except Exception as e:
-            logger.error(f"Erreur ré-analyse: {e}")
+            logger.error(f"Erreur statut ré-analyse: {e}")
             return jsonify({
                 'success': False,
                 'error': str(e)
@@ -1295,31 +1363,20 @@ def register_routes(app: Flask, db_manager: DatabaseManager, theme_manager: Them
     @app.route('/api/batch/analyze-coherent', methods=['POST'])
     def batch_analyze_coherent():
         """
-        Analyse batch avec garantie de cohérence
+        Lance l'analyse batch avec garantie de cohérence en tâche de fond
         POST /api/batch/analyze-coherent
         Body: {
             "days": 7,  # optionnel, défaut 7
             "force_reanalysis": false  # optionnel
         }
+        Suivi : GET /api/jobs/<job_id> (5 étapes)
         """
         try:
             data = request.get_json() or {}
             days = data.get('days', 7)
-            force_reanalysis = data.get('force_reanalysis', False)
-            
-            logger.info(f"🚀 Démarrage analyse batch cohérente ({days} jours)")
-            
-            # Lancer l'analyse
-            results = batch_analyzer.analyze_recent_articles(
-                db_manager,
-                days=days
-            )
             
-            return jsonify({
-                'success': True,
-                'results': results,
-                'message': f'Analyse terminée : {results.get("analyzed", 0)} articles traités'
-            })
+            logger.info(f"🚀 Demande d'analyse batch cohérente ({days} jours)")
+            return submit_job('batch_analyze_coherent', {'days': days})
             
         except Exception as e:
             logger.error(f"Erreur analyse batch: {e}", exc_info=True)
@@ -1586,70 +1643,19 @@ def register_routes(app: Flask, db_manager: DatabaseManager, theme_manager: Them
     @app.route('/api/corroboration/batch-process', methods=['POST'])
     def batch_process_corroboration():
         """
-        Traite la corroboration par lots
+        Lance la corroboration par lots en tâche de fond
         POST /api/corroboration/batch-process
         Body: {
             "days": 7  # optionnel
         }
+        Suivi : GET /api/jobs/<job_id>
         """
         try:
             data = request.get_json() or {}
             days = data.get('days', 7)
             
-            logger.info(f"🔍 Démarrage traitement corroboration ({days} jours)")
-            
-            # Récupérer les articles récents
-            conn = db_manager.get_connection()
-            cursor = conn.cursor()
-            
-            cursor.execute("""
-                SELECT id, title, content, pub_date, feed_url, 
-                       sentiment_type, sentiment_score, detailed_sentiment
-                FROM articles
-                WHERE pub_date >= datetime('now', '-' || ? || ' days')
-                ORDER BY pub_date DESC
-            """, (days,))
-            
-            articles = []
-            for row in cursor.fetchall():
-                articles.append({
-                    'id': row[0],
-                    'title': row[1],
-                    'content': row[2],
-                    'pub_date': row[3],
-                    'feed_url': row[4],
-                    'sentiment_type': row[5],
-                    'sentiment_score': row[6],
-                    'detailed_sentiment': row[7]
-                })
-            
-            conn.close()
-            
-            if not articles:
-                return jsonify({
-                    'success': True,
-                    'stats': {
-                        'processed': 0,
-                        'corroborations_found': 0,
-                        'errors': 0
-                    },
-                    'message': 'Aucun article à traiter'
-                })
-            
-            # Traitement batch
-            stats = corroboration_engine.batch_process_articles(
-                articles,
-                articles,  # Utiliser la même liste comme pool de candidats
-                db_manager
-            )
-            
-            logger.info(f"✅ Corroboration terminée : {stats['processed']} articles, "
-                       f"{stats['corroborations_found']} corroborations trouvées")
-            
-            return jsonify({
-                'success': True,
-                'stats': stats
-            })
+            logger.info(f"🔍 Demande de traitement corroboration ({days} jours)")
+            return submit_job('corroboration_batch_process', {'days': days})
             
         except Exception as e:
             logger.error(f"Erreur batch corroboration: {e}", exc_info=True)
@@ -1721,69 +1727,19 @@ def register_routes(app: Flask, db_manager: DatabaseManager, theme_manager: Them
     @app.route('/api/bayesian/batch-analyze', methods=['POST'])
     def batch_analyze_bayesian():
         """
-        Analyse bayésienne par lots
+        Lance l'analyse bayésienne par lots en tâche de fond
         POST /api/bayesian/batch-analyze
         Body: {
             "days": 7  # optionnel
         }
+        Suivi : GET /api/jobs/<job_id>
         """
         try:
             data = request.get_json() or {}
             days = data.get('days', 7)
             
-            logger.info(f"🧮 Démarrage analyse bayésienne ({days} jours)")
-            
-            # Récupérer les articles récents
-            conn = db_manager.get_connection()
-            cursor = conn.cursor()
-            
-            cursor.execute("""
-                SELECT id, title, content, pub_date, sentiment_type, 
-                       sentiment_score, detailed_sentiment, roberta_score
-                FROM articles
-                WHERE pub_date >= datetime('now', '-' || ? || ' days')
-                ORDER BY pub_date DESC
-            """, (days,))
-            
-            articles = []
-            for row in cursor.fetchall():
-                articles.append({
-                    'id': row[0],
-                    'title': row[1],
-                    'content': row[2],
-                    'pub_date': row[3],
-                    'sentiment_type': row[4],
-                    'sentiment_score': row[5],
-                    'detailed_sentiment': row[6],
-                    'roberta_score': row[7]
-                })
-            
-            conn.close()
-            
-            if not articles:
-                return jsonify({
-                    'success': True,
-                    'results': {
-                        'analyzed': 0,
-                        'updated': 0,
-                        'errors': []
-                    },
-                    'message': 'Aucun article à analyser'
-                })
-            
-            # Traitement bayésien
-            results = bayesian_analyzer.batch_analyze_articles(
-                articles,
-                db_manager
-            )
-            
-            logger.info(f"✅ Analyse bayésienne terminée : {results['analyzed']} articles, "
-                       f"{results['updated']} mis à jour")
-            
-            return jsonify({
-                'success': True,
-                'results': results
-            })
+            logger.info(f"🧮 Demande d'analyse bayésienne ({days} jours)")
+            return submit_job('bayesian_batch_analyze', {'days': days})
             
         except Exception as e:
             logger.error(f"Erreur batch bayésien: {e}", exc_info=True)
@@ -1792,6 +1748,35 @@ def register_routes(app: Flask, db_manager: DatabaseManager, theme_manager: Them
                 'error': str(e)
             }), 500
 
+    # ===== API ROUTES - TÂCHES DE FOND =====
+
+    @app.route('/api/jobs', methods=['GET'])
+    def list_jobs():
+        """Tâches récentes (filtre optionnel ?status=queued|running|completed|failed|cancelled)"""
+        try:
+            status = request.args.get('status')
+            limit = request.args.get('limit', 50, type=int)
+            return jsonify({'success': True, 'jobs': job_queue.list_jobs(status, limit)})
+        except Exception as e:
+            logger.error(f"Erreur liste des tâches: {e}")
+            return jsonify({'success': False, 'error': str(e)}), 500
+
+    @app.route('/api/jobs/<job_id>', methods=['GET'])
+    def get_job(job_id):
+        """État, étape, progression et résultat d'une tâche"""
+        job = job_queue.get(job_id)
+        if job is None:
+            return jsonify({'success': False, 'error': 'Tâche introuvable'}), 404
+        return jsonify({'success': True, 'job': job})
+
+    @app.route('/api/jobs/<job_id>/cancel', methods=['POST'])
+    def cancel_job(job_id):
+        """Annule une tâche en attente ou en cours"""
+        job = job_queue.cancel(job_id)
+        if job is None:
+            return jsonify({'success': False, 'error': 'Tâche introuvable'}), 404
+        return jsonify({'success': True, 'job': job})
+
     @app.route('/api/advanced/full-analysis/<int:article_id>', methods=['POST'])
     def full_analysis_single_article(article_id):
         """
@@ -1836,11 +1821,11 @@ def register_routes(app: Flask, db_manager: DatabaseManager, theme_manager: Them
                 SELECT id, title, content, pub_date, feed_url,
                        sentiment_type, sentiment_score
                 FROM articles
-                WHERE pub_date >= datetime('now', '-7 days')
+                WHERE pub_ts >= ?
                 AND id != ?
-                ORDER BY pub_date DESC
+                ORDER BY pub_ts DESC
                 LIMIT 200
-            """, (article_id,))
+            """, (to_epoch(datetime.now() - timedelta(days=7)), article_id))
             
             candidates = []
             for row in cursor.fetchall():
@@ -1,9 +1,11 @@
 # Flask/routes_geo_entity_integrated.py - Routes API pour l'intégration complète
 
-from flask import Blueprint, jsonify, request, Response
+from flask import Blueprint, current_app, jsonify, request, Response
 import logging
 from typing import Optional
 
+from .entity_cooccurrence import RANKINGS
+
 logger = logging.getLogger(__name__)
 
 def create_integrated_blueprint(
@@ -76,6 +78,8 @@ def create_integrated_blueprint(
         
         Query params:
             - days: Nombre de jours (défaut: 7)
+            - async: true pour lancer l'analyse en tâche de fond (réponse 202,
+              suivi via /api/jobs/<job_id>)
         
         Returns:
             JSON avec rapport complet
@@ -83,6 +87,16 @@ def create_integrated_blueprint(
         try:
             days = request.args.get('days', 7, type=int)
             
+            job_queue = current_app.config.get('JOB_QUEUE')
+            if job_queue is not None and request.args.get('async', 'false').lower() in ('1', 'true', 'yes'):
+                job, created = job_queue.submit('geo_comprehensive_analysis', {'days': days})
+                return jsonify({
+                    'success': True,
+                    'reused': not created,
+                    'job': job,
+                    'status_url': f"/api/jobs/{job['id']}"
+                }), 202
+            
             logger.info(f"🔎 Analyse complète sur {days} jours")
             
             report = geo_entity_integration.analyze_articles_comprehensive(days=days)
@@ -202,16 +216,23 @@ def create_integrated_blueprint(
         
         Query params:
             - days: Nombre de jours (défaut: 7)
+            - rank: Classement des relations : count (défaut), pmi ou lift
         
         Returns:
             JSON avec graphe de relations (format D3.js/vis.js)
         """
         try:
             days = request.args.get('days', 7, type=int)
+            rank = request.args.get('rank', 'count')
+            if rank not in RANKINGS:
+                return jsonify({
+                    'success': False,
+                    'error': f"Classement inconnu: {rank} (disponibles: {', '.join(RANKINGS)})"
+                }), 400
             
-            logger.info(f"🕸️ Extraction relations sur {days} jours")
+            logger.info(f"🕸️ Extraction relations sur {days} jours (classement: {rank})")
             
-            graph = geo_entity_integration.get_entity_relations(days=days)
+            graph = geo_entity_integration.get_entity_relations(days=days, rank=rank)
             
             return jsonify({
                 'success': True,
@@ -6,7 +6,7 @@ Routes API pour l'agrégation et la comparaison des réseaux sociaux
 from flask import request, jsonify, render_template  
 import logging
 from datetime import datetime, timedelta
-from .database import DatabaseManager
+from .database import DatabaseManager, to_epoch
 from .social_aggregator import get_social_aggregator
 from .social_comparator import get_social_comparator
 
@@ -246,10 +246,10 @@ def register_social_routes(app, db_manager: DatabaseManager):
                 SELECT a.id, a.title, a.content, a.sentiment_score, a.sentiment_type
                 FROM articles a
                 JOIN theme_analyses ta ON a.id = ta.article_id
-                WHERE ta.theme_id = ? AND ta.confidence >= 0.3 AND a.pub_date >= ?
-                ORDER BY a.pub_date DESC
+                WHERE ta.theme_id = ? AND ta.confidence >= 0.3 AND a.pub_ts >= ?
+                ORDER BY a.pub_ts DESC
                 LIMIT 100
-            """, (theme, cutoff_date))
+            """, (theme, to_epoch(cutoff_date)))
             
             rss_articles = []
             for row in cursor.fetchall():
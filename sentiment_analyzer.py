@@ -203,6 +203,156 @@ class SentimentAnalyzer:
         
         return key_sentences
     
+    def _parse_roberta_output(self, result) -> Tuple[float, float]:
+        """
+        Convertit une sortie du pipeline RoBERTa en (score brut, confiance)
+        """
+        if isinstance(result, list):
+            # Modèle retournant multiple scores
+            scores_dict = {item['label']: item['score'] for item in result}
+            positive_score = scores_dict.get('positive', scores_dict.get('POS', 0))
+            negative_score = scores_dict.get('negative', scores_dict.get('NEG', 0))
+            neutral_score = scores_dict.get('neutral', scores_dict.get('NEU', 0))
+            
+            # Calcul du score brut normalisé
+            raw_score = positive_score - negative_score
+            raw_confidence = max(positive_score, negative_score, neutral_score)
+            
+        else:
+            # Modèle simple
+            label = result['label'].lower()
+            raw_confidence = result['score']
+            
+            if 'positive' in label:
+                raw_score = raw_confidence
+            elif 'negative' in label:
+                raw_score = -raw_confidence
+            else:
+                raw_score = 0.0
+        
+        return raw_score, raw_confidence
+    
+    def _get_geo_pattern(self):
+        """Regex unique couvrant tout le lexique géopolitique (compilée une fois)"""
+        if getattr(self, '_geo_pattern', None) is None:
+            terms = sorted(self.geopolitical_modifiers, key=len, reverse=True)
+            self._geo_pattern = re.compile(
+                r'\b(?:' + '|'.join(re.escape(t) for t in terms) + r')\b'
+            )
+        return self._geo_pattern
+    
+    def _apply_geopolitical_context_batch(self, texts: List[str], base_scores: np.ndarray) -> np.ndarray:
+        """
+        Version vectorisée de _apply_geopolitical_context sur un lot de textes
+        """
+        pattern = self._get_geo_pattern()
+        adjustments = np.zeros(len(texts))
+        matches = np.zeros(len(texts))
+        
+        for i, text in enumerate(texts):
+            found = set(pattern.findall(text.lower()))
+            if found:
+                adjustments[i] = sum(self.geopolitical_modifiers[t] for t in found)
+                matches[i] = len(found)
+        
+        safe_matches = np.where(matches > 0, matches, 1)
+        adjusted = np.clip(base_scores * 0.8 + (adjustments / safe_matches) * 0.2, -1.0, 1.0)
+        return np.where(matches > 0, adjusted, base_scores)
+    
+    def _categorize_sentiment_batch(self, scores: np.ndarray, confidences: np.ndarray) -> List[str]:
+        """
+        Version vectorisée de _categorize_sentiment
+        """
+        categories = np.select(
+            [
+                (confidences < 0.4) & (scores >= -0.1),
+                confidences < 0.4,
+                (scores > 0) & (scores >= self.thresholds['positive']),
+                scores > 0,
+                scores <= self.thresholds['negative'],
+            ],
+            ['neutral_positive', 'neutral_negative', 'positive', 'neutral_positive', 'negative'],
+            default='neutral_negative'
+        )
+        return categories.tolist()
+    
+    def analyze_batch(self, texts: List[str], batch_size: int = 16) -> List[Dict[str, Any]]:
+        """
+        ⚡ Analyse un lot de textes en une seule passe RoBERTa.
+        
+        Les textes sont triés par longueur pour limiter le padding, passés au
+        pipeline par lots, puis post-traités (contexte géopolitique, lissage,
+        catégorisation) de façon vectorisée. Résultats identiques à
+        analyze_sentiment_with_score, dans l'ordre des textes fournis.
+        """
+        results: List[Dict[str, Any]] = [None] * len(texts)
+        
+        # Textes trop courts : même résultat que l'analyse unitaire
+        pending = []
+        for i, text in enumerate(texts):
+            if not text or len(text.strip()) < 10:
+                results[i] = {
+                    'score': 0.05,
+                    'type': 'neutral_positive',
+                    'confidence': 0.0,
+                    'model': 'none'
+                }
+            else:
+                pending.append(i)
+        
+        if pending and self.roberta_pipeline:
+            try:
+                key_phrases = {i: self._extract_key_phrases(texts[i]) for i in pending}
+                analysis_texts = {
+                    i: ' '.join(key_phrases[i]) if key_phrases[i] else texts[i][:800]
+                    for i in pending
+                }
+                
+                # Regroupement par longueur pour minimiser le padding
+                order = sorted(pending, key=lambda i: len(analysis_texts[i]))
+                outputs = self.roberta_pipeline(
+                    [analysis_texts[i] for i in order],
+                    batch_size=batch_size,
+                    truncation=True
+                )
+                
+                parsed = [self._parse_roberta_output(output) for output in outputs]
+                raw_scores = np.array([p[0] for p in parsed], dtype=float)
+                raw_confidences = np.array([p[1] for p in parsed], dtype=float)
+                
+                geo_adjusted = self._apply_geopolitical_context_batch(
+                    [texts[i] for i in order], raw_scores
+                )
+                smoothed = np.tanh(geo_adjusted * 1.2)
+                categories = self._categorize_sentiment_batch(smoothed, raw_confidences)
+                
+                for pos, i in enumerate(order):
+                    sentiment_type = categories[pos]
+                    if sentiment_type == 'neutral_negative' and smoothed[pos] > -0.01:
+                        sentiment_type = 'neutral_positive'
+                    
+                    results[i] = {
+                        'score': float(smoothed[pos]),
+                        'type': sentiment_type,
+                        'confidence': float(raw_confidences[pos]),
+                        'model': 'roberta_enhanced',
+                        'raw_score': float(raw_scores[pos]),
+                        'geo_adjusted': float(geo_adjusted[pos]),
+                        'key_phrases_used': len(key_phrases[i]) > 0
+                    }
+                
+                logger.debug(f"📊 Analyse RoBERTa par lot: {len(order)} textes")
+                pending = []
+                
+            except Exception as e:
+                logger.error(f"Erreur RoBERTa (lot): {e}")
+        
+        # FALLBACK : analyse unitaire traditionnelle
+        for i in pending:
+            results[i] = self._analyze_traditional_enhanced(texts[i])
+        
+        return results
+    
     def analyze_sentiment_with_score(self, text: str) -> Dict[str, Any]:
         """
         ⭐ Analyse principale avec améliorations significatives
@@ -225,28 +375,7 @@ class SentimentAnalyzer:
                 result = self.roberta_pipeline(analysis_text)[0]
                 
                 # Traitement amélioré des résultats RoBERTa
-                if isinstance(result, list):
-                    # Modèle retournant multiple scores
-                    scores_dict = {item['label']: item['score'] for item in result}
-                    positive_score = scores_dict.get('positive', scores_dict.get('POS', 0))
-                    negative_score = scores_dict.get('negative', scores_dict.get('NEG', 0))
-                    neutral_score = scores_dict.get('neutral', scores_dict.get('NEU', 0))
-                    
-                    # Calcul du score brut normalisé
-                    raw_score = positive_score - negative_score
-                    raw_confidence = max(positive_score, negative_score, neutral_score)
-                    
-                else:
-                    # Modèle simple
-                    label = result['label'].lower()
-                    raw_confidence = result['score']
-                    
-                    if 'positive' in label:
-                        raw_score = raw_confidence
-                    elif 'negative' in label:
-                        raw_score = -raw_confidence
-                    else:
-                        raw_score = 0.0
+                raw_score, raw_confidence = self._parse_roberta_output(result)
                 
                 # 🎯 APPLICATION DU CONTEXTE GÉOPOLITIQUE AMÉLIORÉ
                 geo_adjusted_score = self._apply_geopolitical_context(text, raw_score)
@@ -358,6 +487,26 @@ class SentimentAnalyzer:
         title_analysis = self.analyze_sentiment_with_score(title)
         content_analysis = self.analyze_sentiment_with_score(content[:1500])  # Contenu limité
         
+        return self._combine_title_content(title_analysis, content_analysis)
+    
+    def analyze_articles_batch(self, articles: List[Dict[str, Any]], batch_size: int = 16) -> List[Dict[str, Any]]:
+        """
+        📰 Équivalent d'analyze_article sur un lot d'articles (titres et contenus
+        passent ensemble dans analyze_batch)
+        """
+        titles = [a.get('title', '') or '' for a in articles]
+        contents = [(a.get('content', '') or '')[:1500] for a in articles]
+        analyses = self.analyze_batch(titles + contents, batch_size=batch_size)
+        
+        n = len(articles)
+        return [
+            self._combine_title_content(analyses[i], analyses[n + i])
+            for i in range(n)
+        ]
+    
+    def _combine_title_content(self, title_analysis: Dict[str, Any],
+                               content_analysis: Dict[str, Any]) -> Dict[str, Any]:
+        """Combine les analyses titre / contenu (pondération 70/30)"""
         # Score combiné avec pondération titre renforcée
         combined_score = (title_analysis['score'] * 0.7) + (content_analysis['score'] * 0.3)
         combined_confidence = (title_analysis['confidence'] * 0.7) + (content_analysis['confidence'] * 0.3)
@@ -6,7 +6,7 @@ Module de comparaison des sentiments RSS vs Réseaux Sociaux
 import logging
 from datetime import datetime, timedelta
 from typing import List, Dict, Any, Optional
-from Flask.database import DatabaseManager
+from Flask.database import DatabaseManager, to_epoch
 
 logger = logging.getLogger(__name__)
 
@@ -96,10 +96,10 @@ class SocialComparator:
         cursor.execute("""
             SELECT id, title, content, sentiment_score, sentiment_type
             FROM articles
-            WHERE pub_date >= ?
-            ORDER BY pub_date DESC
+            WHERE pub_ts >= ?
+            ORDER BY pub_ts DESC
             LIMIT 500
-        """, (cutoff_date,))
+        """, (to_epoch(cutoff_date),))
         
         articles = []
         for row in cursor.fetchall():
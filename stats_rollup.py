@@ -0,0 +1,305 @@
+# Flask/stats_rollup.py
+"""
+Agrégats journaliers des statistiques du tableau de bord
+Tenus à jour par des triggers SQLite à chaque écriture, reconstructibles à la demande
+"""
+
+import logging
+from typing import Dict, Any, List
+
+from .database import DatabaseManager
+
+logger = logging.getLogger(__name__)
+
+# Seuil de confiance à partir duquel un article compte pour un thème
+THEME_CONFIDENCE_THRESHOLD = 0.3
+
+# Catégorie de sentiment : catégorie détaillée, sinon type legacy préfixé
+_CATEGORY = "COALESCE({row}.detailed_sentiment, 'legacy_' || COALESCE({row}.sentiment_type, 'unknown'))"
+
+
+def _article_delta(row: str, sign: int) -> str:
+    """Upsert ajoutant (sign=1) ou retirant (sign=-1) un article de son agrégat"""
+    return f"""
+        INSERT INTO stats_daily_articles
+            (day, sentiment_category, analysis_model, feed_url,
+             article_count, roberta_count, roberta_sum)
+        VALUES (
+            COALESCE(DATE({row}.pub_date), ''),
+            {_CATEGORY.format(row=row)},
+            COALESCE({row}.analysis_model, ''),
+            COALESCE({row}.feed_url, ''),
+            {sign},
+            {sign} * ({row}.roberta_score IS NOT NULL),
+            {sign} * COALESCE({row}.roberta_score, 0)
+        )
+        ON CONFLICT(day, sentiment_category, analysis_model, feed_url) DO UPDATE SET
+            article_count = article_count + excluded.article_count,
+            roberta_count = roberta_count + excluded.roberta_count,
+            roberta_sum = roberta_sum + excluded.roberta_sum;
+    """
+
+
+def _theme_delta(day: str, article_id: str, sign: int) -> str:
+    """Upsert ajoutant/retirant un article des thèmes qualifiés (SELECT) d'un jour"""
+    # "WHERE true" : lève l'ambiguïté de syntaxe entre SELECT et ON CONFLICT
+    return f"""
+        INSERT INTO stats_daily_themes (day, theme_id, article_count)
+        SELECT {day}, theme_id, {sign}
+        FROM (
+            SELECT DISTINCT theme_id FROM theme_analyses
+            WHERE article_id = {article_id}
+              AND theme_id IS NOT NULL
+              AND confidence >= {THEME_CONFIDENCE_THRESHOLD}
+        )
+        WHERE true
+        ON CONFLICT(day, theme_id) DO UPDATE SET
+            article_count = article_count + excluded.article_count;
+    """
+
+
+def _theme_row_delta(row: str, sign: int) -> str:
+    """
+    Ajoute/retire l'article de la ligne theme_analyses `row` pour son thème,
+    si aucune autre analyse qualifiée ne le compte déjà (COUNT DISTINCT)
+    """
+    return f"""
+        INSERT INTO stats_daily_themes (day, theme_id, article_count)
+        SELECT COALESCE(DATE(a.pub_date), ''), {row}.theme_id, {sign}
+        FROM articles a
+        WHERE a.id = {row}.article_id
+          AND {row}.theme_id IS NOT NULL
+          AND {row}.confidence >= {THEME_CONFIDENCE_THRESHOLD}
+          AND NOT EXISTS (
+              SELECT 1 FROM theme_analyses other
+              WHERE other.article_id = {row}.article_id
+                AND other.theme_id = {row}.theme_id
+                AND other.confidence >= {THEME_CONFIDENCE_THRESHOLD}
+                AND other.id != {row}.id
+          )
+        ON CONFLICT(day, theme_id) DO UPDATE SET
+            article_count = article_count + excluded.article_count;
+    """
+
+
+_TRIGGERS = {
+    'trg_stats_articles_insert': f"""
+        CREATE TRIGGER IF NOT EXISTS trg_stats_articles_insert
+        AFTER INSERT ON articles
+        BEGIN
+            {_article_delta('NEW', 1)}
+        END
+    """,
+    'trg_stats_articles_delete': f"""
+        CREATE TRIGGER IF NOT EXISTS trg_stats_articles_delete
+        AFTER DELETE ON articles
+        BEGIN
+            {_article_delta('OLD', -1)}
+            {_theme_delta("COALESCE(DATE(OLD.pub_date), '')", 'OLD.id', -1)}
+        END
+    """,
+    # Ré-analyse de sentiment, changement de modèle ou de date
+    'trg_stats_articles_update': f"""
+        CREATE TRIGGER IF NOT EXISTS trg_stats_articles_update
+        AFTER UPDATE OF pub_date, detailed_sentiment, sentiment_type,
+                        analysis_model, feed_url, roberta_score ON articles
+        WHEN OLD.pub_date IS NOT NEW.pub_date
+          OR OLD.detailed_sentiment IS NOT NEW.detailed_sentiment
+          OR OLD.sentiment_type IS NOT NEW.sentiment_type
+          OR OLD.analysis_model IS NOT NEW.analysis_model
+          OR OLD.feed_url IS NOT NEW.feed_url
+          OR OLD.roberta_score IS NOT NEW.roberta_score
+        BEGIN
+            {_article_delta('OLD', -1)}
+            {_article_delta('NEW', 1)}
+        END
+    """,
+    'trg_stats_articles_redate': f"""
+        CREATE TRIGGER IF NOT EXISTS trg_stats_articles_redate
+        AFTER UPDATE OF pub_date ON articles
+        WHEN COALESCE(DATE(OLD.pub_date), '') != COALESCE(DATE(NEW.pub_date), '')
+        BEGIN
+            {_theme_delta("COALESCE(DATE(OLD.pub_date), '')", 'NEW.id', -1)}
+            {_theme_delta("COALESCE(DATE(NEW.pub_date), '')", 'NEW.id', 1)}
+        END
+    """,
+    'trg_stats_themes_insert': f"""
+        CREATE TRIGGER IF NOT EXISTS trg_stats_themes_insert
+        AFTER INSERT ON theme_analyses
+        BEGIN
+            {_theme_row_delta('NEW', 1)}
+        END
+    """,
+    'trg_stats_themes_delete': f"""
+        CREATE TRIGGER IF NOT EXISTS trg_stats_themes_delete
+        AFTER DELETE ON theme_analyses
+        BEGIN
+            {_theme_row_delta('OLD', -1)}
+        END
+    """,
+    'trg_stats_themes_update': f"""
+        CREATE TRIGGER IF NOT EXISTS trg_stats_themes_update
+        AFTER UPDATE OF article_id, theme_id, confidence ON theme_analyses
+        BEGIN
+            {_theme_row_delta('OLD', -1)}
+            {_theme_row_delta('NEW', 1)}
+        END
+    """,
+}
+
+
+class StatsRollup:
+    """
+    Agrégats jour × catégorie de sentiment × modèle × flux, et jour × thème
+
+    Les triggers maintiennent les compteurs quel que soit le chemin
+    d'écriture (ingestion RSS, ré-analyse, analyses bayésienne ou batch) ;
+    /api/stats et /api/stats/timeline ne lisent plus que ces tables, dont
+    la taille dépend du nombre de jours et non du nombre d'articles.
+    """
+
+    def __init__(self, db_manager: DatabaseManager):
+        self.db_manager = db_manager
+        self._init_tables()
+
+    def _init_tables(self):
+        with self.db_manager.connection() as conn:
+            # Création et remplissage initial atomiques : aucune écriture perdue
+            conn.execute("BEGIN IMMEDIATE")
+            created = conn.execute("""
+                SELECT COUNT(*) FROM sqlite_master
+                WHERE type = 'table' AND name IN ('stats_daily_articles', 'stats_daily_themes')
+            """).fetchone()[0] < 2
+
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS stats_daily_articles (
+                    day TEXT NOT NULL,
+                    sentiment_category TEXT NOT NULL,
+                    analysis_model TEXT NOT NULL,
+                    feed_url TEXT NOT NULL,
+                    article_count INTEGER NOT NULL DEFAULT 0,
+                    roberta_count INTEGER NOT NULL DEFAULT 0,
+                    roberta_sum REAL NOT NULL DEFAULT 0,
+                    PRIMARY KEY (day, sentiment_category, analysis_model, feed_url)
+                )
+            """)
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS stats_daily_themes (
+                    day TEXT NOT NULL,
+                    theme_id TEXT NOT NULL,
+                    article_count INTEGER NOT NULL DEFAULT 0,
+                    PRIMARY KEY (day, theme_id)
+                )
+            """)
+            conn.execute("""
+                CREATE INDEX IF NOT EXISTS idx_stats_daily_themes_theme
+                ON stats_daily_themes(theme_id)
+            """)
+            for sql in _TRIGGERS.values():
+                conn.execute(sql)
+
+            if created:
+                logger.info("📊 Tables d'agrégats créées, calcul initial...")
+                self._rebuild(conn)
+
+    def rebuild(self) -> Dict[str, int]:
+        """Recalcule entièrement les agrégats depuis articles et theme_analyses"""
+        with self.db_manager.connection() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            counts = self._rebuild(conn)
+        logger.info(f"✅ Agrégats reconstruits : {counts['article_rows']} lignes articles, "
+                    f"{counts['theme_rows']} lignes thèmes")
+        return counts
+
+    @staticmethod
+    def _rebuild(conn) -> Dict[str, int]:
+        conn.execute("DELETE FROM stats_daily_articles")
+        conn.execute("DELETE FROM stats_daily_themes")
+        conn.execute(f"""
+            INSERT INTO stats_daily_articles
+                (day, sentiment_category, analysis_model, feed_url,
+                 article_count, roberta_count, roberta_sum)
+            SELECT
+                COALESCE(DATE(a.pub_date), ''),
+                {_CATEGORY.format(row='a')},
+                COALESCE(a.analysis_model, ''),
+                COALESCE(a.feed_url, ''),
+                COUNT(*),
+                COUNT(a.roberta_score),
+                COALESCE(SUM(a.roberta_score), 0)
+            FROM articles a
+            GROUP BY 1, 2, 3, 4
+        """)
+        conn.execute(f"""
+            INSERT INTO stats_daily_themes (day, theme_id, article_count)
+            SELECT COALESCE(DATE(a.pub_date), ''), ta.theme_id, COUNT(DISTINCT ta.article_id)
+            FROM theme_analyses ta
+            JOIN articles a ON a.id = ta.article_id
+            WHERE ta.theme_id IS NOT NULL AND ta.confidence >= {THEME_CONFIDENCE_THRESHOLD}
+            GROUP BY 1, 2
+        """)
+        return {
+            'article_rows': conn.execute("SELECT COUNT(*) FROM stats_daily_articles").fetchone()[0],
+            'theme_rows': conn.execute("SELECT COUNT(*) FROM stats_daily_themes").fetchone()[0]
+        }
+
+    # ------------------------------------------------------------------
+    # Lecture
+    # ------------------------------------------------------------------
+
+    def sentiment_counts(self) -> Dict[str, int]:
+        """Nombre d'articles par catégorie de sentiment (detailed + legacy_*), et total"""
+        rows = self.db_manager.execute_query("""
+            SELECT sentiment_category, SUM(article_count)
+            FROM stats_daily_articles
+            GROUP BY sentiment_category
+        """)
+        counts = {category: total or 0 for category, total in rows}
+        counts['total'] = sum(counts.values())
+        return counts
+
+    def model_usage(self) -> Dict[str, Any]:
+        """Articles par modèle d'analyse ('' = aucun) et score RoBERTa moyen"""
+        rows = self.db_manager.execute_query("""
+            SELECT analysis_model, SUM(article_count), SUM(roberta_count), SUM(roberta_sum)
+            FROM stats_daily_articles
+            GROUP BY analysis_model
+        """)
+        usage = {model: count or 0 for model, count, _, _ in rows}
+        roberta_count = sum(row[2] or 0 for row in rows)
+        roberta_sum = sum(row[3] or 0 for row in rows)
+        usage['avg_roberta_score'] = roberta_sum / roberta_count if roberta_count > 0 else None
+        return usage
+
+    def theme_counts(self) -> List[Dict[str, Any]]:
+        """Nombre d'articles par thème (tous les thèmes, même vides), décroissant"""
+        rows = self.db_manager.execute_query("""
+            SELECT t.id, t.name, t.color, COALESCE(SUM(s.article_count), 0) AS article_count
+            FROM themes t
+            LEFT JOIN stats_daily_themes s ON s.theme_id = t.id
+            GROUP BY t.id, t.name, t.color
+            ORDER BY article_count DESC
+        """)
+        return [dict(row) for row in rows]
+
+    def timeline(self, days: int = 30) -> List[Dict[str, Any]]:
+        """Compteurs par jour et par catégorie sur les `days` derniers jours"""
+        rows = self.db_manager.execute_query("""
+            SELECT
+                day,
+                SUM(CASE WHEN sentiment_category = 'positive' THEN article_count ELSE 0 END) AS positive,
+                SUM(CASE WHEN sentiment_category = 'negative' THEN article_count ELSE 0 END) AS negative,
+                SUM(CASE WHEN sentiment_category = 'neutral_positive' THEN article_count ELSE 0 END) AS neutral_positive,
+                SUM(CASE WHEN sentiment_category = 'neutral_negative' THEN article_count ELSE 0 END) AS neutral_negative,
+                SUM(CASE WHEN sentiment_category = 'legacy_positive' THEN article_count ELSE 0 END) AS legacy_positive,
+                SUM(CASE WHEN sentiment_category = 'legacy_negative' THEN article_count ELSE 0 END) AS legacy_negative,
+                SUM(CASE WHEN sentiment_category = 'legacy_neutral' THEN article_count ELSE 0 END) AS legacy_neutral,
+                SUM(article_count) AS total
+            FROM stats_daily_articles
+            WHERE day >= DATE('now', '-' || ? || ' days')
+            GROUP BY day
+            HAVING SUM(article_count) > 0
+            ORDER BY day ASC
+            LIMIT ?
+        """, (days, days))
+        return [dict(row) for row in rows]
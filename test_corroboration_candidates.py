@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+"""
+Test de rappel de la génération de candidats du moteur de corroboration :
+l'index inversé doit retrouver toutes les paires que la comparaison
+exhaustive (O(N²)) juge corroborantes.
+"""
+
+import sys
+import random
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, '.')
+
+COMMON_WORDS = (
+    "gouvernement ministre sommet accord sanctions russie ukraine otan chine "
+    "élection parlement réforme crise énergie gaz pétrole inflation banque "
+    "frontière armée négociation diplomatie traité conflit réfugiés aide "
+    "commerce tarifs exportations climat conférence sécurité alliance vote "
+    "président opposition manifestation tribunal enquête attentat cessez-le-feu"
+).split()
+
+# Noms propres synthétiques : ce sont eux qui distinguent les histoires
+SYLLABLES = ['ka', 'lo', 'mi', 'ra', 'tu', 'ven', 'dor', 'sel', 'ba', 'zik']
+PROPER_NOUNS = [a + b + c for a in SYLLABLES for b in SYLLABLES for c in SYLLABLES]
+
+SOURCES = ['https://lemonde.fr/rss', 'https://france24.com/rss', 'https://rfi.fr/rss',
+           'https://bbc.com/rss', 'https://reuters.com/rss']
+
+
+def _make_corpus(n_stories: int = 20, variants: int = 3, noise: int = 40, seed: int = 42):
+    """Histoires reprises par plusieurs sources (avec variations) + articles isolés"""
+    rng = random.Random(seed)
+    base_date = datetime(2024, 3, 1)
+    articles = []
+
+    def words(n):
+        return [rng.choice(COMMON_WORDS) if rng.random() < 0.85 else rng.choice(PROPER_NOUNS)
+                for _ in range(n)]
+
+    def variant(words, rate):
+        words = [w for w in words if rng.random() > rate]
+        for _ in range(int(len(words) * rate)):
+            words.insert(rng.randrange(len(words) + 1), rng.choice(COMMON_WORDS))
+        return words
+
+    for story in range(n_stories):
+        title = words(8)
+        content = words(40)
+        day = base_date + timedelta(days=rng.randrange(5))
+        themes = rng.sample(['geopolitique', 'economie', 'defense', 'energie'], 2)
+        for _ in range(variants):
+            articles.append({
+                'title': ' '.join(variant(title, 0.05)),
+                'content': ' '.join(variant(content, 0.1)),
+                'pub_date': (day + timedelta(hours=rng.randrange(48))).isoformat(),
+                'feed_url': rng.choice(SOURCES),
+                'themes': themes
+            })
+
+    for _ in range(noise):
+        articles.append({
+            'title': ' '.join(words(8)),
+            'content': ' '.join(words(40)),
+            'pub_date': (base_date + timedelta(hours=rng.randrange(6 * 24))).isoformat(),
+            'feed_url': rng.choice(SOURCES),
+            'themes': []
+        })
+
+    rng.shuffle(articles)
+    for i, article in enumerate(articles, start=1):
+        article['id'] = i
+    return articles
+
+
+def _pairs(engine, articles, candidate_index=None):
+    pairs = set()
+    for article in articles:
+        for corr in engine.find_corroborations(article, articles, threshold=0.65,
+                                               top_n=len(articles),
+                                               candidate_index=candidate_index):
+            pairs.add((article['id'], corr['id']))
+    return pairs
+
+
+def test_candidate_index_recall():
+    """L'index ne doit perdre aucune paire trouvée par la recherche exhaustive"""
+    import logging
+    logging.getLogger('Flask.corroboration_engine').setLevel(logging.WARNING)
+    from Flask.corroboration_engine import CorroborationEngine
+
+    engine = CorroborationEngine()
+    articles = _make_corpus()
+
+    start = time.perf_counter()
+    brute_force = _pairs(engine, articles)
+    brute_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    index = engine.build_candidate_index(articles)
+    blocked = _pairs(engine, articles, candidate_index=index)
+    blocked_time = time.perf_counter() - start
+
+    compared = sum(len(index.query(engine, a)) for a in articles)
+    recall = len(blocked & brute_force) / len(brute_force) if brute_force else 1.0
+
+    print(f"✅ {len(brute_force)} paires exhaustives, {len(blocked)} via l'index")
+    print(f"   Rappel: {recall:.3f}")
+    print(f"   Comparaisons: {compared} au lieu de {len(articles) ** 2}")
+    print(f"   Temps: {brute_time:.2f}s → {blocked_time:.2f}s")
+
+    assert brute_force, "Le corpus de test doit contenir des paires corroborantes"
+    assert recall == 1.0
+    assert blocked <= brute_force
+    return True
+
+
+def test_candidate_index_time_window():
+    """Les articles hors de la fenêtre temporelle ne sont pas candidats"""
+    from Flask.corroboration_engine import CorroborationEngine
+
+    engine = CorroborationEngine()
+    text = "sommet otan accord sanctions russie ukraine"
+    articles = [
+        {'id': 1, 'title': text, 'content': text, 'pub_date': '2024-03-01T10:00:00'},
+        {'id': 2, 'title': text, 'content': text, 'pub_date': '2024-03-03T10:00:00'},
+        {'id': 3, 'title': text, 'content': text, 'pub_date': '2024-04-20T10:00:00'},
+        {'id': 4, 'title': text, 'content': text, 'pub_date': None},
+    ]
+    index = engine.build_candidate_index(articles)
+    candidate_ids = {a['id'] for a in index.query(engine, articles[0])}
+
+    print(f"✅ Candidats pour l'article 1: {sorted(candidate_ids)}")
+    assert candidate_ids == {1, 2, 4}
+    return True
+
+
+def test_batch_matches_pairwise():
+    """La matrice batch et compute_similarity donnent les mêmes scores et les mêmes paires"""
+    import logging
+    logging.getLogger('Flask.corroboration_engine').setLevel(logging.WARNING)
+    from Flask.corroboration_engine import CorroborationEngine
+
+    engine = CorroborationEngine()
+    articles = _make_corpus()
+
+    batch = engine.find_corroborations_batch(articles, articles, threshold=0.0,
+                                             top_n=len(articles))
+    max_gap = 0.0
+    for article, corroborations in zip(articles, batch):
+        for corr in corroborations:
+            candidate = next(a for a in articles if a['id'] == corr['id'])
+            max_gap = max(max_gap, abs(corr['similarity']
+                                       - engine.compute_similarity(article, candidate)))
+
+    batch_pairs = {
+        (article['id'], corr['id'])
+        for article, corroborations in zip(articles, batch)
+        for corr in corroborations if corr['similarity'] >= 0.65
+    }
+    brute_force = _pairs(engine, articles)
+
+    print(f"✅ Écart maximal batch / par paires: {max_gap:.5f}")
+    print(f"   {len(batch_pairs)} paires batch, {len(brute_force)} paires exhaustives")
+
+    assert max_gap <= 1e-3
+    assert batch_pairs == brute_force
+    return True
+
+
+if __name__ == "__main__":
+    print("=" * 60)
+    print("🔍 TEST DE LA GÉNÉRATION DE CANDIDATS (CORROBORATION)")
+    print("=" * 60)
+    results = [test_candidate_index_recall(), test_candidate_index_time_window(),
+               test_batch_matches_pairwise()]
+    print("\n🎉 Tous les tests sont passés" if all(results) else "\n❌ Échec")
@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark de l'harmonisation des clusters (BatchSentimentAnalyzer) :
+version vectorisée NumPy contre parcours itératif, sur 50 000 articles.
+Les deux versions doivent produire exactement les mêmes résultats.
+"""
+
+import sys
+import copy
+import random
+import time
+
+sys.path.insert(0, '.')
+
+TYPES = ['positive', 'neutral_positive', 'neutral_negative', 'negative']
+
+
+def _make_clustered_articles(n_articles: int = 50000, seed: int = 7):
+    """Articles répartis en clusters de 2 à 8 articles, scores volontairement dispersés"""
+    rng = random.Random(seed)
+    articles, clusters = [], []
+    article_id = 1
+
+    while article_id <= n_articles:
+        size = min(rng.randint(2, 8), n_articles - article_id + 1)
+        center = rng.uniform(-0.8, 0.8)
+        spread = rng.choice([0.05, 0.2, 0.5])
+        cluster = []
+        for _ in range(size):
+            articles.append({
+                'id': article_id,
+                'sentiment_analysis': {
+                    'score': max(-1.0, min(1.0, rng.gauss(center, spread))),
+                    'type': rng.choice(TYPES),
+                    'confidence': rng.uniform(0.1, 0.99),
+                    'model': 'benchmark',
+                }
+            })
+            cluster.append(article_id)
+            article_id += 1
+        clusters.append(cluster)
+
+    return articles, clusters
+
+
+def test_harmonization_equivalence_and_speed():
+    """Résultats identiques et accélération sur 50k articles"""
+    from Flask.batch_sentiment_analyzer import BatchSentimentAnalyzer
+
+    analyzer = BatchSentimentAnalyzer(None, None, None)
+    articles, clusters = _make_clustered_articles()
+    iterative_articles = copy.deepcopy(articles)
+    vectorized_articles = copy.deepcopy(articles)
+
+    start = time.perf_counter()
+    iterative_stats = analyzer._harmonize_clusters_iterative(clusters, iterative_articles)
+    iterative_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    vectorized_stats = analyzer._harmonize_clusters(clusters, vectorized_articles)
+    vectorized_time = time.perf_counter() - start
+
+    print(f"✅ {len(articles)} articles, {len(clusters)} clusters, "
+          f"{vectorized_stats['harmonized']} harmonisés, {vectorized_stats['changes']} changements")
+    print(f"   Itératif:   {iterative_time * 1000:.0f} ms")
+    print(f"   Vectorisé:  {vectorized_time * 1000:.0f} ms")
+    print(f"   Accélération: x{iterative_time / vectorized_time:.1f}")
+
+    assert vectorized_stats == iterative_stats
+    for expected, actual in zip(iterative_articles, vectorized_articles):
+        expected, actual = expected['sentiment_analysis'], actual['sentiment_analysis']
+        assert actual['score'] == expected['score']
+        assert actual['type'] == expected['type']
+        assert actual.get('harmonized') == expected.get('harmonized')
+        assert actual.get('cluster_size') == expected.get('cluster_size')
+        assert actual.get('original_score') == expected.get('original_score')
+        if 'deviation_reduced' in expected:
+            assert abs(actual['deviation_reduced'] - expected['deviation_reduced']) < 1e-12
+
+    return True
+
+
+if __name__ == "__main__":
+    print("=" * 60)
+    print("⚖️  BENCHMARK DE L'HARMONISATION DES CLUSTERS")
+    print("=" * 60)
+    result = test_harmonization_equivalence_and_speed()
+    print("\n🎉 Test passé" if result else "\n❌ Échec")
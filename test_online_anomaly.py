@@ -0,0 +1,251 @@
+#!/usr/bin/env python3
+"""
+Test des statistiques en ligne de détection d'anomalies : volumes connus,
+z-scores et pics comparés à un calcul direct, créneaux saisonniers,
+persistance entre deux instances, reconstruction d'un seul thème et absence
+de faux pics sur une série creuse.
+"""
+
+import math
+import os
+import sys
+import tempfile
+from datetime import datetime, timedelta
+
+sys.path.insert(0, '.')
+
+FEED = 'https://exemple.org/rss'
+START = datetime(2024, 1, 1, 12)  # un lundi
+
+# Quatre semaines : jours ouvrés chargés, week-end calme, un pic le jeudi 25
+WEEKS = [
+    [4 + w % 2, 5 + w % 2, 6 + w % 2, 5 + w % 2, 4 + w % 2, 1, 2]
+    for w in range(4)
+]
+WEEKS[3][3] = 20
+COUNTS = [count for week in WEEKS for count in week]
+
+
+def _detector_class(now):
+    from Flask.online_anomaly import OnlineAnomalyDetector
+
+    class FixedClockDetector(OnlineAnomalyDetector):
+        def _now_ts(self):
+            return now[0]
+
+    return FixedClockDetector
+
+
+def _make_db():
+    from Flask.database import DatabaseManager
+    from Flask.database_migrations import run_migrations
+
+    path = os.path.join(tempfile.mkdtemp(), 'anomalies.db')
+    db = DatabaseManager(path)
+    run_migrations(db)
+    with db.connection() as conn:
+        conn.execute("INSERT OR IGNORE INTO themes (id, name) VALUES ('geo', 'Géopolitique')")
+    return db
+
+
+def _insert_day(db, day: int, count: int, with_theme: bool = True):
+    pub_date = (START + timedelta(days=day)).strftime('%Y-%m-%d %H:%M:%S')
+    ids = []
+    with db.connection() as conn:
+        for i in range(count):
+            cursor = conn.execute(
+                "INSERT INTO articles (title, link, pub_date, feed_url) VALUES (?, ?, ?, ?)",
+                (f"article {day}-{i}", f"https://exemple.org/{day}/{i}", pub_date, FEED)
+            )
+            ids.append(cursor.lastrowid)
+            if with_theme and (START + timedelta(days=day)).weekday() < 5:
+                conn.execute(
+                    "INSERT INTO theme_analyses (article_id, theme_id, confidence) VALUES (?, 'geo', 0.5)",
+                    (cursor.lastrowid,)
+                )
+    return ids
+
+
+def _reference(counts):
+    """z-scores globaux et saisonniers, pics, calculés directement sur l'historique"""
+    def z(value, history, min_history=3, poisson_floor=False):
+        if len(history) < min_history:
+            return None
+        mean = sum(history) / len(history)
+        std = math.sqrt(sum((h - mean) ** 2 for h in history) / len(history))
+        if std <= 1e-9:
+            return None
+        return (value - mean) / (max(std, math.sqrt(max(mean, 1.0))) if poisson_floor else std)
+
+    results = []
+    for day, count in enumerate(counts):
+        global_z = z(count, counts[:day])
+        seasonal_z = z(count, counts[day % 7:day:7])
+        if seasonal_z is not None:
+            peak_z = z(count, counts[day % 7:day:7], poisson_floor=True)
+        else:
+            peak_z = z(count, counts[:day], poisson_floor=True)
+        results.append((global_z, seasonal_z, peak_z is not None and peak_z > 2.0))
+    return results
+
+
+def _state(db, kind, key, granularity='day'):
+    rows = db.execute_query("""
+        SELECT n, mean, m2, last_closed, last_count, last_z, last_seasonal_z
+        FROM anomaly_series_state WHERE series_kind = ? AND series_key = ? AND granularity = ?
+    """, (kind, key, granularity))
+    return tuple(rows[0]) if rows else None
+
+
+def _close(a, b):
+    if a is None or b is None:
+        return a is b
+    return math.isclose(a, b, rel_tol=1e-9, abs_tol=1e-9)
+
+
+def test_known_counts():
+    """z-scores, pic détecté et créneau saisonnier sur des volumes connus"""
+    from Flask.database import to_epoch
+
+    db = _make_db()
+    for day, count in enumerate(COUNTS):
+        _insert_day(db, day, count)
+
+    # Le 28 est le dernier jour clos (retard toléré de 3 h)
+    now = [to_epoch(datetime(2024, 1, 29, 4))]
+    detector = _detector_class(now)(db)
+    detector.rebuild()
+
+    expected = _reference(COUNTS)
+    peaks = detector.peaks('feed', START - timedelta(days=1), 'day').get(FEED, [])
+    peak_days = [p['date'] for p in peaks]
+    expected_days = [(START + timedelta(days=d)).strftime('%Y-%m-%d')
+                     for d, (_, _, is_peak) in enumerate(expected) if is_peak]
+    print(f"✅ Pics détectés: {peak_days}")
+    assert peak_days == expected_days
+    assert '2024-01-25' in peak_days
+
+    spike = next(p for p in peaks if p['date'] == '2024-01-25')
+    global_z, seasonal_z, _ = expected[24]
+    assert spike['count'] == 20
+    assert _close(spike['global_z_score'], global_z)
+    assert _close(spike['seasonal_z_score'], seasonal_z)
+
+    n, mean, m2, _, last_count, last_z, last_seasonal_z = _state(db, 'feed', FEED)
+    history = COUNTS[:-1]
+    assert n == len(COUNTS) and last_count == COUNTS[-1]
+    assert _close(mean, sum(COUNTS) / len(COUNTS))
+    assert _close(last_z, expected[-1][0]) and _close(last_seasonal_z, expected[-1][1])
+    assert _close(m2 / n, sum((c - mean) ** 2 for c in COUNTS) / n)
+    print(f"✅ z-score du dernier jour: {last_z:.3f} (historique de {len(history)} jours)")
+
+    # Créneau 0 = lundi : les quatre lundis, et eux seuls
+    mondays = COUNTS[0::7]
+    row = db.execute_query("""
+        SELECT n, mean FROM anomaly_seasonal_state
+        WHERE series_kind = 'feed' AND series_key = ? AND granularity = 'day' AND slot = 0
+    """, (FEED,))[0]
+    assert row['n'] == len(mondays) and _close(row['mean'], sum(mondays) / len(mondays))
+    print(f"✅ Créneau du lundi: n={row['n']}, moyenne={row['mean']:.2f}")
+    return True
+
+
+def test_state_survives_restart():
+    """Une nouvelle instance reprend l'état persisté ; l'incrémental égale la reconstruction"""
+    from Flask.database import DatabaseManager, to_epoch
+
+    db = _make_db()
+    for day, count in enumerate(COUNTS):
+        _insert_day(db, day, count)
+    now = [to_epoch(datetime(2024, 1, 29, 4))]
+    detector_class = _detector_class(now)
+    detector_class(db).rebuild()
+    before = detector_class(db).series_states('feed', 'day')
+
+    # « Redémarrage » : nouveau gestionnaire et nouvelle instance sur le même fichier
+    restarted_db = DatabaseManager(db.db_path)
+    restarted = detector_class(restarted_db)
+    assert restarted.series_states('feed', 'day') == before
+
+    # Jour suivant ingéré en ligne par l'instance redémarrée
+    ids = _insert_day(restarted_db, len(COUNTS), 7)
+    now[0] = to_epoch(datetime(2024, 1, 30, 4))
+    restarted.observe_articles(ids)
+    online = {kind: _state(restarted_db, kind, key) for kind, key in (('feed', FEED), ('theme', 'geo'))}
+
+    restarted.rebuild()
+    for kind, key in (('feed', FEED), ('theme', 'geo')):
+        replayed = _state(restarted_db, kind, key)
+        assert all(_close(a, b) for a, b in zip(online[kind], replayed)), (kind, online[kind], replayed)
+    print(f"✅ État repris après redémarrage ({len(before)} série), incrémental = reconstruction")
+    return True
+
+
+def test_theme_rebuild_only_touches_theme():
+    """rebuild('theme', [id]) suit les analyses modifiées sans toucher aux flux"""
+    from Flask.database import to_epoch
+
+    db = _make_db()
+    for day, count in enumerate(COUNTS):
+        _insert_day(db, day, count)
+    now = [to_epoch(datetime(2024, 1, 29, 4))]
+    detector = _detector_class(now)(db)
+    detector.rebuild()
+    assert detector.peaks('theme', START, 'day').get('geo')
+    feed_before = _state(db, 'feed', FEED)
+
+    # Recalcul du thème : le jour du pic n'en fait plus partie
+    spike_day = (START + timedelta(days=24)).strftime('%Y-%m-%d')
+    db.execute_update("""
+        DELETE FROM theme_analyses WHERE theme_id = 'geo'
+          AND article_id IN (SELECT id FROM articles WHERE date(pub_date) = ?)
+    """, (spike_day,))
+    counts = detector.rebuild('theme', ['geo'])
+
+    assert counts['series'] == 2  # jour et heure
+    assert _state(db, 'feed', FEED) == feed_before
+    theme_peaks = [p['date'] for p in detector.peaks('theme', START, 'day').get('geo', [])]
+    assert spike_day not in theme_peaks
+    print(f"✅ Série du thème reconstruite seule (pics: {theme_peaks or 'aucun'})")
+    return True
+
+
+def test_sparse_series_has_no_peaks():
+    """Une série régulière et creuse (3 articles/jour) ne produit aucun pic, ni horaire ni journalier"""
+    from Flask.anomaly_detector import AnomalyDetector
+
+    db = _make_db()
+    today = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+    with db.connection() as conn:
+        for day in range(40, 0, -1):
+            for hour in (8, 13, 18):
+                pub_date = (today - timedelta(days=day, hours=-hour)).strftime('%Y-%m-%d %H:%M:%S')
+                cursor = conn.execute(
+                    "INSERT INTO articles (title, link, pub_date, feed_url) VALUES (?, ?, ?, ?)",
+                    ('article', f"https://exemple.org/{day}/{hour}", pub_date, FEED)
+                )
+                conn.execute(
+                    "INSERT INTO theme_analyses (article_id, theme_id, confidence) VALUES (?, 'geo', 0.5)",
+                    (cursor.lastrowid,)
+                )
+
+    detector = AnomalyDetector(db)
+    detector.online.rebuild()
+    report = detector.get_comprehensive_anomaly_report(7)
+    stored = db.execute_query("SELECT granularity, COUNT(*) FROM anomaly_peaks GROUP BY 1")
+
+    print(f"✅ Anomalies: {len(report['theme_anomalies'])} thème(s), {len(report['feed_anomalies'])} flux, "
+          f"pics enregistrés: {[tuple(row) for row in stored] or 'aucun'}")
+    assert report['theme_anomalies'] == {}
+    assert report['feed_anomalies'] == {}
+    assert not stored
+    return True
+
+
+if __name__ == "__main__":
+    print("=" * 60)
+    print("📈 TEST DES STATISTIQUES D'ANOMALIES EN LIGNE")
+    print("=" * 60)
+    results = [test_known_counts(), test_state_survives_restart(),
+               test_theme_rebuild_only_touches_theme(), test_sparse_series_has_no_peaks()]
+    print("\n🎉 Tous les tests sont passés" if all(results) else "\n❌ Échec")
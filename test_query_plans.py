@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+"""
+Test de non-régression des plans de requête : les requêtes « chaudes »
+(filtres par période, thème, source) ne doivent parcourir intégralement
+ni articles ni theme_analyses (EXPLAIN QUERY PLAN sans « SCAN »).
+
+Les requêtes sont capturées telles qu'exécutées par le code applicatif
+(trace SQLite), puis expliquées sur la base migrée.
+"""
+
+import os
+import re
+import sys
+import tempfile
+from datetime import datetime, timedelta
+
+sys.path.insert(0, '.')
+
+# Tables qui ne doivent jamais être parcourues en entier (alias compris)
+LARGE_TABLES = {'articles', 'a', 'theme_analyses', 'ta'}
+
+_SCAN_RE = re.compile(r'^SCAN (\w+)')
+
+
+def _make_db():
+    from Flask.database import DatabaseManager
+    from Flask.database_migrations import run_migrations
+
+    path = os.path.join(tempfile.mkdtemp(), 'plans.db')
+    db = DatabaseManager(path)
+    run_migrations(db)
+
+    now = datetime.now()
+    with db.connection() as conn:
+        conn.execute("INSERT OR IGNORE INTO themes (id, name) VALUES ('geo', 'Géopolitique')")
+        for i in range(200):
+            cursor = conn.execute("""
+                INSERT INTO articles (title, content, link, pub_date, feed_url, sentiment_score, sentiment_type)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+            """, (f"Article {i}", "contenu", f"https://example.org/{i}",
+                  (now - timedelta(hours=i)).strftime('%Y-%m-%d %H:%M:%S'),
+                  f"https://feed{i % 3}.example.org/rss", (i % 7) / 7 - 0.5, 'neutral'))
+            conn.execute("INSERT INTO theme_analyses (article_id, theme_id, confidence) VALUES (?, 'geo', 0.6)",
+                         (cursor.lastrowid,))
+    return db
+
+
+def _capture(db, action):
+    """Exécute `action` et retourne les SELECT envoyés à SQLite"""
+    statements = []
+    acquire = db.pool.acquire
+
+    def traced_acquire():
+        conn = acquire()
+        conn.set_trace_callback(statements.append)
+        return conn
+
+    db.pool.acquire = traced_acquire
+    try:
+        action()
+    finally:
+        db.pool.acquire = acquire
+    return [sql for sql in statements if sql.lstrip().upper().startswith('SELECT')]
+
+
+def _full_scans(db, sql):
+    conn = db.get_connection()
+    try:
+        plan = conn.execute(f"EXPLAIN QUERY PLAN {sql}").fetchall()
+    finally:
+        conn.close()
+    details = [row[3] for row in plan]
+    scans = [d for d in details if (m := _SCAN_RE.match(d)) and m.group(1) in LARGE_TABLES]
+    return scans, details
+
+
+def _hot_queries(db):
+    from Flask.anomaly_detector import AnomalyDetector
+    from Flask.social_comparator import SocialComparator
+    from Flask.database import day_range
+    from Flask import job_handlers
+
+    detector = AnomalyDetector(db)
+    comparator = SocialComparator(db)
+
+    class Context:
+        db_manager = db
+
+    def filter_by_period():
+        # Forme de /api/articles/filter et /api/articles/export
+        conditions = ["""a.id IN (
+            SELECT ta.article_id FROM theme_analyses ta
+            WHERE ta.theme_id = ? AND ta.confidence >= 0.3
+        )"""]
+        params = ['geo']
+        for condition, value in day_range(datetime.now().strftime('%Y-%m-%d'), None):
+            conditions.append(condition)
+            params.append(value)
+        db.execute_query(f"SELECT a.id FROM articles a WHERE {' AND '.join(conditions)}", tuple(params))
+
+    def feed_period():
+        db.execute_query("SELECT COUNT(*) FROM articles a WHERE a.feed_url = ? AND a.pub_ts >= ?",
+                         ("https://feed1.example.org/rss", 0))
+
+    return {
+        'anomalies sentiment': lambda: detector.detect_sentiment_anomalies(days=7),
+        'anomalies thème': lambda: detector.detect_theme_anomalies('geo', days=7),
+        'corrélations thème/sentiment': lambda: detector.detect_correlation_anomalies(days=7),
+        'rapport d\'anomalies': lambda: detector.get_comprehensive_anomaly_report(days=7),
+        'articles RSS récents (social)': lambda: comparator._get_rss_articles(datetime.now() - timedelta(days=1)),
+        'articles récents (tâches)': lambda: job_handlers._recent_articles(Context, 7, ['id', 'title']),
+        'filtre période + thème': filter_by_period,
+        'source + période': feed_period,
+    }
+
+
+def test_hot_queries_use_indexes():
+    """Aucune requête chaude ne parcourt articles ou theme_analyses en entier"""
+    db = _make_db()
+    failures = []
+    checked = 0
+
+    for name, action in _hot_queries(db).items():
+        statements = _capture(db, action)
+        assert statements, f"Aucune requête capturée pour: {name}"
+        for sql in statements:
+            scans, details = _full_scans(db, sql)
+            checked += 1
+            print(f"{'❌' if scans else '✅'} {name}: {' | '.join(details)}")
+            if scans:
+                failures.append((name, scans))
+
+    print(f"\n{checked} requêtes vérifiées")
+    assert not failures, f"Parcours complets: {failures}"
+    return True
+
+
+def test_pub_ts_maintained():
+    """pub_ts suit pub_date à l'insertion et à la mise à jour"""
+    from Flask.database import to_epoch
+
+    db = _make_db()
+    with db.connection() as conn:
+        cursor = conn.execute("INSERT INTO articles (title, link, pub_date) VALUES ('x', 'https://x', '2024-03-01 10:00:00')")
+        article_id = cursor.lastrowid
+    assert db.execute_query("SELECT pub_ts FROM articles WHERE id = ?", (article_id,))[0][0] == \
+        to_epoch(datetime(2024, 3, 1, 10))
+
+    db.execute_update("UPDATE articles SET pub_date = '2024-03-02 00:00:00' WHERE id = ?", (article_id,))
+    assert db.execute_query("SELECT pub_ts FROM articles WHERE id = ?", (article_id,))[0][0] == \
+        to_epoch('2024-03-02')
+    print("✅ pub_ts synchronisé avec pub_date")
+    return True
+
+
+if __name__ == "__main__":
+    print("=" * 60)
+    print("🔍 TEST DES PLANS DE REQUÊTE (EXPLAIN QUERY PLAN)")
+    print("=" * 60)
+    results = [test_hot_queries_use_indexes(), test_pub_ts_maintained()]
+    print("\n🎉 Tous les tests sont passés" if all(results) else "\n❌ Échec")
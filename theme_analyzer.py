@@ -1,20 +1,217 @@
 # Flask/theme_analyzer.py - VERSION AMÉLIORÉE
 
 import re
+import json
 import logging
-from typing import List, Dict, Any
+import threading
+from typing import List, Dict, Any, Iterable, Set, Tuple
 from .database import DatabaseManager
+from .online_anomaly import OnlineAnomalyDetector
 
 logger = logging.getLogger(__name__)
 
+
+class KeywordMatcher:
+    """
+    Compte les occurrences de tous les mots-clés en un seul parcours du texte.
+
+    Équivalent à len(re.findall(r'\b' + re.escape(kw) + r'\b', text)) pour
+    chaque mot-clé, mais avec une seule regex compilée : à chaque position,
+    la lookahead trouve le plus long mot-clé qui y commence, et les mots-clés
+    plus courts qui en sont des préfixes (suivis d'une frontière de mot) sont
+    crédités au même endroit.
+    """
+
+    def __init__(self, keywords):
+        unique = sorted({kw for kw in keywords if kw}, key=len, reverse=True)
+        self.keywords = unique
+        self.pattern = None
+        if unique:
+            self.pattern = re.compile(
+                r'(?=\b(' + '|'.join(re.escape(kw) for kw in unique) + r')\b)'
+            )
+        
+        # Mots-clés qui correspondent aussi quand un mot-clé plus long est trouvé
+        self.prefixes = {
+            kw: [kw] + [short for short in unique
+                        if len(short) < len(kw) and re.match(re.escape(short) + r'\b', kw)]
+            for kw in unique
+        }
+        
+        # Cas dégénéré (mot-clé vide) : conserve la sémantique de re.findall
+        self.fallback = {kw: re.compile(r'\b' + re.escape(kw) + r'\b')
+                         for kw in set(keywords) if not kw}
+
+    def count(self, text: str) -> Dict[str, int]:
+        """Retourne {mot-clé: nombre d'occurrences non chevauchantes}"""
+        counts: Dict[str, int] = {}
+        if self.pattern is not None:
+            next_allowed: Dict[str, int] = {}
+            for match in self.pattern.finditer(text):
+                start = match.start()
+                for kw in self.prefixes[match.group(1)]:
+                    # re.findall ne compte pas les occurrences qui se chevauchent
+                    if start >= next_allowed.get(kw, 0):
+                        counts[kw] = counts.get(kw, 0) + 1
+                        next_allowed[kw] = start + max(len(kw), 1)
+        
+        for kw, pattern in self.fallback.items():
+            counts[kw] = len(pattern.findall(text))
+        
+        return counts
+
+
+class KeywordIndex:
+    """
+    Index persistant mot-clé -> articles (table theme_keyword_postings).
+
+    Alimenté à l'ingestion et lors des ré-analyses complètes ; un mot-clé
+    n'est considéré comme complet qu'une fois présent dans
+    theme_keyword_index_state (après un passage sur tout le corpus).
+    Un mot-clé retiré de tous les thèmes n'est plus indexé à l'ingestion :
+    son état est effacé (forget_unused) pour qu'il soit recomplété s'il revient.
+    """
+
+    CHUNK_SIZE = 1000
+
+    def __init__(self, db_manager: DatabaseManager):
+        self.db_manager = db_manager
+        self._init_tables()
+
+    def _init_tables(self):
+        with self.db_manager.connection() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS theme_keyword_postings (
+                    keyword TEXT NOT NULL,
+                    article_id INTEGER NOT NULL,
+                    PRIMARY KEY (keyword, article_id)
+                ) WITHOUT ROWID
+            """)
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS theme_keyword_index_state (
+                    keyword TEXT PRIMARY KEY,
+                    indexed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                )
+            """)
+
+    @staticmethod
+    def add_postings(conn, postings: Iterable[Tuple[str, int]]):
+        """Ajoute des couples (mot-clé, article) dans la transaction fournie"""
+        conn.executemany(
+            "INSERT OR IGNORE INTO theme_keyword_postings (keyword, article_id) VALUES (?, ?)",
+            postings
+        )
+
+    @staticmethod
+    def mark_indexed(conn, keywords: Iterable[str]):
+        conn.executemany(
+            "INSERT OR REPLACE INTO theme_keyword_index_state (keyword) VALUES (?)",
+            [(kw,) for kw in keywords]
+        )
+
+    def forget_unused(self, keywords_in_use: Iterable[str]) -> int:
+        """Efface l'état et les entrées des mots-clés qui ne sont plus dans aucun thème"""
+        with self.db_manager.connection() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            unused = [(row[0],) for row in conn.execute("""
+                SELECT keyword FROM theme_keyword_index_state
+                WHERE keyword NOT IN (SELECT value FROM json_each(?))
+            """, (json.dumps(sorted(set(keywords_in_use))),))]
+            if unused:
+                conn.executemany("DELETE FROM theme_keyword_index_state WHERE keyword = ?", unused)
+                conn.executemany("DELETE FROM theme_keyword_postings WHERE keyword = ?", unused)
+        if unused:
+            logger.info(f"🗂️ Index mots-clés : {len(unused)} mot(s) retiré(s) des thèmes oublié(s)")
+        return len(unused)
+
+    def missing(self, keywords: List[str]) -> List[str]:
+        """Mots-clés pour lesquels l'index n'est pas encore complet"""
+        keywords = sorted(set(keywords))
+        if not keywords:
+            return []
+        placeholders = ','.join('?' * len(keywords))
+        rows = self.db_manager.execute_query(
+            f"SELECT keyword FROM theme_keyword_index_state WHERE keyword IN ({placeholders})",
+            tuple(keywords)
+        )
+        indexed = {row[0] for row in rows}
+        return [kw for kw in keywords if kw not in indexed]
+
+    def backfill(self, keywords: List[str]) -> int:
+        """Indexe des mots-clés sur tout le corpus (un seul parcours)"""
+        if not keywords:
+            return 0
+        matcher = KeywordMatcher(keywords)
+        last_id, scanned = 0, 0
+        
+        while True:
+            rows = self.db_manager.execute_query("""
+                SELECT id, title, content FROM articles
+                WHERE id > ? ORDER BY id LIMIT ?
+            """, (last_id, self.CHUNK_SIZE))
+            if not rows:
+                break
+            
+            postings = []
+            for article_id, title, content in rows:
+                if not content:
+                    continue
+                for kw in matcher.count(f"{title} {content}".lower()):
+                    postings.append((kw, article_id))
+            
+            with self.db_manager.connection() as conn:
+                self.add_postings(conn, postings)
+            last_id = rows[-1][0]
+            scanned += len(rows)
+        
+        with self.db_manager.connection() as conn:
+            self.mark_indexed(conn, keywords)
+        logger.info(f"🗂️ Index mots-clés complété pour {len(keywords)} mot(s) ({scanned} articles parcourus)")
+        return scanned
+
+    def candidates(self, keywords: List[str]) -> Set[int]:
+        """Articles contenant au moins un des mots-clés"""
+        keywords = sorted(set(keywords))
+        result: Set[int] = set()
+        for i in range(0, len(keywords), 500):
+            chunk = keywords[i:i + 500]
+            placeholders = ','.join('?' * len(chunk))
+            rows = self.db_manager.execute_query(
+                f"SELECT DISTINCT article_id FROM theme_keyword_postings WHERE keyword IN ({placeholders})",
+                tuple(chunk)
+            )
+            result.update(row[0] for row in rows)
+        return result
+
+
 class ThemeAnalyzer:
+    # Incrémenté à chaque clear_cache : invalide le cache de toutes les instances
+    _themes_version = 0
+    
     def __init__(self, db_manager: DatabaseManager):
         self.db_manager = db_manager
         self.themes_cache = None
+        self.keyword_matcher = None
+        self._cache_version = ThemeAnalyzer._themes_version
+        self._rescore_lock = threading.Lock()
+        self.keyword_index = KeywordIndex(db_manager) if db_manager is not None else None
+    
+    @classmethod
+    def from_themes(cls, themes_cache: Dict[str, Dict[str, Any]]) -> 'ThemeAnalyzer':
+        """Analyseur sans base de données, à partir d'un cache de thèmes déjà chargé"""
+        analyzer = cls(None)
+        analyzer.themes_cache = themes_cache
+        analyzer.keyword_matcher = KeywordMatcher(
+            kw for theme in themes_cache.values() for kw in theme['keywords']
+        )
+        return analyzer
     
     def _get_themes_with_keywords(self) -> Dict[str, Dict[str, Any]]:
         """Récupère les thèmes avec leurs mots-clés (avec cache)"""
+        if self.db_manager is not None and self._cache_version != ThemeAnalyzer._themes_version:
+            self.themes_cache = None
         if self.themes_cache is None:
+            self._cache_version = ThemeAnalyzer._themes_version
             themes_data = self.db_manager.get_themes()
             self.themes_cache = {
                 theme['id']: {
@@ -24,61 +221,92 @@ class ThemeAnalyzer:
                 }
                 for theme in themes_data
             }
+            self.keyword_matcher = KeywordMatcher(
+                kw for theme in self.themes_cache.values() for kw in theme['keywords']
+            )
             logger.info(f"📚 {len(self.themes_cache)} thèmes chargés en cache")
+            
+            # Les mots-clés retirés ne sont plus indexés à l'ingestion
+            try:
+                self.keyword_index.forget_unused(
+                    kw for theme in self.themes_cache.values() for kw in theme['keywords'] if kw
+                )
+            except Exception as e:
+                logger.warning(f"Nettoyage de l'index mots-clés impossible: {e}")
         return self.themes_cache
     
     def clear_cache(self):
         """Vide le cache des thèmes (utile après modification)"""
         self.themes_cache = None
+        self.keyword_matcher = None
+        ThemeAnalyzer._themes_version += 1
         logger.info("🔄 Cache des thèmes vidé")
     
     def analyze_article(self, article_text: str, article_title: str = "") -> Dict[str, float]:
         """
         Analyse un article et retourne les thèmes détectés avec leur score de confiance
         """
+        return self.analyze_article_with_keywords(article_text, article_title)[0]
+    
+    def analyze_article_with_keywords(self, article_text: str,
+                                      article_title: str = "") -> Tuple[Dict[str, float], List[str]]:
+        """
+        Comme analyze_article, mais retourne aussi les mots-clés trouvés
+        (pour alimenter l'index mot-clé -> articles)
+        """
         if not article_text:
-            return {}
+            return {}, []
         
         # Combine titre et contenu pour l'analyse
         full_text = f"{article_title} {article_text}".lower()
         themes_data = self._get_themes_with_keywords()
         results = {}
         
+        # Un seul parcours du texte pour tous les mots-clés de tous les thèmes
+        keyword_counts = self.keyword_matcher.count(full_text)
+        
         for theme_id, theme_info in themes_data.items():
-            score = 0
-            matches_found = 0
-            total_keywords = len(theme_info['keywords'])
-            
-            if total_keywords == 0:
-                continue
-            
-            for keyword in theme_info['keywords']:
-                # Recherche de mots entiers avec regex
-                pattern = r'\b' + re.escape(keyword.lower()) + r'\b'
-                matches = len(re.findall(pattern, full_text))
-                
-                if matches > 0:
-                    matches_found += 1
-                    # Score avec pondération selon le nombre d'occurrences
-                    score += min(matches * 0.3, 1.0)
-            
-            # Calcul du score normalisé
-            if score > 0:
-                # Moyenne entre le score d'occurrences et le ratio de mots-clés trouvés
-                keyword_ratio = matches_found / total_keywords
-                normalized_score = (score + keyword_ratio) / 2
-                
-                # Limiter à 1.0 maximum
-                results[theme_id] = min(normalized_score, 1.0)
-                
-                logger.debug(f"Thème '{theme_id}': {matches_found}/{total_keywords} mots-clés, score={normalized_score:.2f}")
+            normalized_score = self._score_theme(theme_info['keywords'], keyword_counts)
+            if normalized_score > 0:
+                results[theme_id] = normalized_score
+                logger.debug(f"Thème '{theme_id}': score={normalized_score:.2f}")
         
         if results:
             logger.info(f"✅ {len(results)} thème(s) détecté(s) dans l'article")
         else:
             logger.debug("⚠️ Aucun thème détecté dans l'article")
         
-        return results
+        return results, [kw for kw, count in keyword_counts.items() if count > 0]
+    
+    @staticmethod
+    def _score_theme(keywords: List[str], keyword_counts: Dict[str, int]) -> float:
+        """Score d'un thème à partir du nombre d'occurrences de chaque mot-clé"""
+        score = 0
+        matches_found = 0
+        total_keywords = len(keywords)
+        
+        if total_keywords == 0:
+            return 0.0
+        
+        for keyword in keywords:
+            # Occurrences de mots entiers
+            matches = keyword_counts.get(keyword, 0)
+            
+            if matches > 0:
+                matches_found += 1
+                # Score avec pondération selon le nombre d'occurrences
+                score += min(matches * 0.3, 1.0)
+        
+        # Calcul du score normalisé
+        if score > 0:
+            # Moyenne entre le score d'occurrences et le ratio de mots-clés trouvés
+            keyword_ratio = matches_found / total_keywords
+            normalized_score = (score + keyword_ratio) / 2
+            
+            # Limiter à 1.0 maximum
+            return min(normalized_score, 1.0)
+        
+        return 0.0
     
     def save_theme_analysis(self, article_id: int, theme_scores: Dict[str, float]):
         """Sauvegarde l'analyse des thèmes pour un article"""
@@ -108,32 +336,115 @@ class ThemeAnalyzer:
         finally:
             conn.close()
     
-    def reanalyze_all_articles(self):
-        """Ré-analyse tous les articles existants avec les thèmes actuels"""
-        conn = self.db_manager.get_connection()
-        cursor = conn.cursor()
+    def save_theme_analyses(self, results: Dict[int, Dict[str, float]],
+                            postings: List[Tuple[str, int]] = None):
+        """
+        Sauvegarde les analyses de thèmes de plusieurs articles en une transaction
+        (et les couples mot-clé/article correspondants pour l'index)
+        """
+        if not results and not postings:
+            return
+        
+        rows = [
+            (article_id, theme_id, confidence)
+            for article_id, theme_scores in results.items()
+            for theme_id, confidence in theme_scores.items()
+            if confidence >= 0.1
+        ]
         
         try:
-            # Vider le cache pour avoir les thèmes à jour
+            with self.db_manager.connection() as conn:
+                conn.executemany("DELETE FROM theme_analyses WHERE article_id = ?",
+                                 [(article_id,) for article_id in results])
+                conn.executemany("""
+                    INSERT INTO theme_analyses (article_id, theme_id, confidence)
+                    VALUES (?, ?, ?)
+                """, rows)
+                if postings:
+                    KeywordIndex.add_postings(conn, postings)
+            logger.info(f"💾 {len(rows)} analyse(s) de thème sauvegardée(s) pour {len(results)} article(s)")
+        except Exception as e:
+            logger.error(f"Erreur sauvegarde groupée analyses thèmes: {e}")
+    
+    def reanalyze_all_articles(self):
+        """Ré-analyse tous les articles existants avec les thèmes actuels (bloquant)"""
+        from .theme_reanalysis import get_reanalysis_job
+        
+        # Vider le cache pour avoir les thèmes à jour
+        self.clear_cache()
+        
+        # Tâche partagée avec les routes : pas de seconde ré-analyse en parallèle
+        job = get_reanalysis_job(self.db_manager)
+        job.start(restart=True)
+        job.wait()
+        return job.get_status()
+    
+    def rescore_theme(self, theme_id: str) -> Dict[str, Any]:
+        """
+        Recalcule uniquement le thème modifié sur le corpus.
+        
+        Seuls les articles qui contiennent un de ses mots-clés (index
+        mot-clé -> articles) ou qui lui sont déjà rattachés sont relus ; seules
+        les lignes de ce thème dans theme_analyses sont réécrites.
+        """
+        with self._rescore_lock:
             self.clear_cache()
+            themes_data = self._get_themes_with_keywords()
+            theme_info = themes_data.get(theme_id)
+            keywords = theme_info['keywords'] if theme_info else []
             
-            # Récupérer tous les articles
-            cursor.execute("SELECT id, title, content FROM articles")
-            articles = cursor.fetchall()
+            # Compléter l'index pour les nouveaux mots-clés (un parcours, ces mots seuls)
+            missing = self.keyword_index.missing([kw for kw in keywords if kw])
+            if missing:
+                self.keyword_index.backfill(missing)
             
-            logger.info(f"🔄 Ré-analyse de {len(articles)} articles...")
+            candidates = self.keyword_index.candidates(keywords)
+            current = {row[0] for row in self.db_manager.execute_query(
+                "SELECT DISTINCT article_id FROM theme_analyses WHERE theme_id = ?", (theme_id,)
+            )}
+            article_ids = sorted(candidates | current)
             
-            for article_id, title, content in articles:
-                theme_scores = self.analyze_article(content, title)
-                if theme_scores:
-                    self.save_theme_analysis(article_id, theme_scores)
+            matcher = KeywordMatcher(keywords)
+            stats = {'theme_id': theme_id, 'candidates': len(article_ids),
+                     'backfilled_keywords': len(missing), 'matched': 0}
             
-            conn.close()
-            logger.info(f"✅ Ré-analyse terminée pour {len(articles)} articles")
+            for i in range(0, len(article_ids), KeywordIndex.CHUNK_SIZE):
+                chunk = article_ids[i:i + KeywordIndex.CHUNK_SIZE]
+                placeholders = ','.join('?' * len(chunk))
+                rows = self.db_manager.execute_query(
+                    f"SELECT id, title, content FROM articles WHERE id IN ({placeholders})",
+                    tuple(chunk)
+                )
+                
+                inserts = []
+                for article_id, title, content in rows:
+                    if not content:
+                        continue
+                    counts = matcher.count(f"{title} {content}".lower())
+                    confidence = self._score_theme(keywords, counts)
+                    if confidence >= 0.1:
+                        inserts.append((article_id, theme_id, confidence))
+                
+                with self.db_manager.connection() as conn:
+                    conn.execute(
+                        f"DELETE FROM theme_analyses WHERE theme_id = ? AND article_id IN ({placeholders})",
+                        (theme_id, *chunk)
+                    )
+                    conn.executemany("""
+                        INSERT INTO theme_analyses (article_id, theme_id, confidence)
+                        VALUES (?, ?, ?)
+                    """, inserts)
+                stats['matched'] += len(inserts)
             
-        except Exception as e:
-            logger.error(f"Erreur ré-analyse articles: {e}")
-            conn.close()
+            logger.info(f"🎯 Thème '{theme_id}' recalculé: {stats['matched']} article(s) "
+                        f"sur {stats['candidates']} candidat(s)")
+            
+            # Série d'anomalies du thème rejouée sur ses nouvelles analyses
+            try:
+                OnlineAnomalyDetector(self.db_manager).rebuild('theme', [theme_id])
+            except Exception as e:
+                logger.error(f"Erreur reconstruction série d'anomalies du thème {theme_id}: {e}")
+            return stats
     
     def get_articles_by_theme(self, theme_id: str, limit: int = 50) -> List[Dict[str, Any]]:
         """Récupère les articles pour un thème donné"""
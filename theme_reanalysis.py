@@ -0,0 +1,383 @@
+# Flask/theme_reanalysis.py
+"""
+Ré-analyse thématique de tout le corpus en tâche de fond
+Parcours par blocs d'id, calcul parallèle, reprise sur point de contrôle
+"""
+
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Any, List, Optional, Tuple
+
+from .database import DatabaseManager
+from .online_anomaly import OnlineAnomalyDetector
+from .theme_analyzer import ThemeAnalyzer, KeywordIndex
+
+logger = logging.getLogger(__name__)
+
+JOB_NAME = 'theme_reanalysis'
+CHUNK_SIZE = 1000
+MAX_WORKERS = max(1, (os.cpu_count() or 2) - 1)
+
+
+# ----------------------------------------------------------------------
+# Côté processus de calcul
+# ----------------------------------------------------------------------
+
+_worker_analyzer: Optional[ThemeAnalyzer] = None
+
+
+def _init_worker(themes_cache: Dict[str, Dict[str, Any]]):
+    """Initialise l'analyseur (et son matcher compilé) une fois par processus"""
+    global _worker_analyzer
+    logging.getLogger(ThemeAnalyzer.__module__).setLevel(logging.WARNING)
+    _worker_analyzer = ThemeAnalyzer.from_themes(themes_cache)
+
+
+def _score_chunk(rows: List[Tuple[int, str, str]]) -> List[Tuple[int, Dict[str, float], List[str]]]:
+    """Calcule les scores thématiques (et mots-clés trouvés) d'un bloc d'articles"""
+    return [(article_id, *_worker_analyzer.analyze_article_with_keywords(content, title))
+            for article_id, title, content in rows]
+
+
+# ----------------------------------------------------------------------
+# Coordinateur
+# ----------------------------------------------------------------------
+
+_jobs: Dict[str, 'ThemeReanalysisJob'] = {}
+_jobs_lock = threading.Lock()
+
+
+def get_reanalysis_job(db_manager: DatabaseManager) -> 'ThemeReanalysisJob':
+    """
+    Retourne la tâche partagée par tous les appelants d'une même base :
+    routes et ThemeAnalyzer voient le même thread (is_running, cancel)
+    """
+    key = os.path.abspath(db_manager.db_path) if db_manager.db_path != ':memory:' else db_manager.db_path
+    with _jobs_lock:
+        job = _jobs.get(key)
+        if job is None:
+            job = ThemeReanalysisJob(db_manager)
+            _jobs[key] = job
+        return job
+
+
+class ThemeReanalysisJob:
+    """
+    Tâche de ré-analyse thématique exécutée dans un thread dédié.
+
+    Les articles sont lus par blocs ordonnés par id, répartis sur un pool
+    de processus, puis écrits bloc par bloc (executemany) dans l'ordre des
+    id. Le point de contrôle est mis à jour dans la même transaction que
+    chaque bloc, ce qui permet de reprendre après un arrêt brutal.
+    """
+
+    def __init__(self, db_manager: DatabaseManager, chunk_size: int = CHUNK_SIZE,
+                 max_workers: int = MAX_WORKERS):
+        self.db_manager = db_manager
+        self.chunk_size = chunk_size
+        self.max_workers = max_workers
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self._cancel = threading.Event()
+        self._run_started: Optional[float] = None
+        self._run_start_processed = 0
+        self._init_checkpoint_table()
+
+    def _init_checkpoint_table(self):
+        with self.db_manager.connection() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS reanalysis_checkpoints (
+                    job_name TEXT PRIMARY KEY,
+                    status TEXT,
+                    last_article_id INTEGER DEFAULT 0,
+                    processed INTEGER DEFAULT 0,
+                    total INTEGER DEFAULT 0,
+                    themes_signature TEXT,
+                    started_at TIMESTAMP,
+                    updated_at TIMESTAMP,
+                    error TEXT
+                )
+            """)
+
+    # ------------------------------------------------------------------
+    # API publique
+    # ------------------------------------------------------------------
+
+    def is_running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self, restart: bool = False) -> Dict[str, Any]:
+        """
+        Démarre la ré-analyse (ou la reprend depuis le dernier point de
+        contrôle si les thèmes n'ont pas changé). Sans effet si elle tourne déjà.
+        """
+        with self._lock:
+            if self.is_running():
+                return self.get_status()
+
+            themes_cache = self._load_themes()
+            signature = self._themes_signature(themes_cache)
+            checkpoint = self._get_checkpoint()
+
+            resume = (
+                not restart
+                and checkpoint is not None
+                and checkpoint['status'] in ('running', 'interrupted', 'cancelled')
+                and checkpoint['themes_signature'] == signature
+            )
+
+            if resume:
+                last_id = checkpoint['last_article_id']
+                processed = checkpoint['processed']
+                logger.info(f"♻️ Reprise de la ré-analyse après l'article {last_id}")
+            else:
+                last_id, processed = 0, 0
+
+            remaining = self.db_manager.execute_query(
+                "SELECT COUNT(*) FROM articles WHERE id > ?", (last_id,)
+            )[0][0]
+            self._save_checkpoint('running', last_id, processed, processed + remaining,
+                                  signature, reset_start=not resume)
+
+            self._cancel.clear()
+            self._run_started = time.time()
+            self._run_start_processed = processed
+            self._thread = threading.Thread(
+                target=self._run, args=(themes_cache, last_id, processed),
+                name='theme-reanalysis', daemon=True
+            )
+            self._thread.start()
+
+        return self.get_status()
+
+    def cancel(self) -> Dict[str, Any]:
+        """
+        Arrête la ré-analyse après le bloc en cours ; le point de contrôle est
+        conservé et un prochain start() reprend là où elle s'est arrêtée
+        """
+        if self.is_running():
+            self._cancel.set()
+            self.wait()
+        return self.get_status()
+
+    def wait(self, timeout: Optional[float] = None):
+        """Attend la fin de la ré-analyse en cours"""
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def resume_if_interrupted(self) -> bool:
+        """Relance une ré-analyse interrompue par un arrêt du serveur"""
+        checkpoint = self._get_checkpoint()
+        if checkpoint and checkpoint['status'] in ('running', 'interrupted') and not self.is_running():
+            self.start()
+            return True
+        return False
+
+    def get_status(self) -> Dict[str, Any]:
+        """Progression, débit et temps restant estimé"""
+        checkpoint = self._get_checkpoint()
+        if checkpoint is None:
+            return {'status': 'idle', 'processed': 0, 'total': 0, 'progress': 0.0}
+
+        status = checkpoint['status']
+        if status == 'running' and not self.is_running():
+            status = 'interrupted'
+
+        processed = checkpoint['processed'] or 0
+        total = checkpoint['total'] or 0
+        result = {
+            'status': status,
+            'processed': processed,
+            'total': total,
+            'progress': round(processed / total * 100, 1) if total else 100.0,
+            'last_article_id': checkpoint['last_article_id'],
+            'started_at': checkpoint['started_at'],
+            'updated_at': checkpoint['updated_at'],
+            'error': checkpoint['error'],
+            'rate_per_sec': None,
+            'eta_seconds': None
+        }
+
+        if status == 'running' and self._run_started:
+            elapsed = time.time() - self._run_started
+            done = processed - self._run_start_processed
+            if elapsed > 0 and done > 0:
+                rate = done / elapsed
+                result['rate_per_sec'] = round(rate, 1)
+                result['eta_seconds'] = round(max(total - processed, 0) / rate, 1)
+
+        return result
+
+    # ------------------------------------------------------------------
+    # Exécution
+    # ------------------------------------------------------------------
+
+    def _run(self, themes_cache: Dict[str, Dict[str, Any]], last_id: int, processed: int):
+        signature = self._themes_signature(themes_cache)
+        total = self._get_checkpoint()['total']
+        try:
+            executor = None
+            try:
+                executor = ProcessPoolExecutor(
+                    max_workers=self.max_workers,
+                    initializer=_init_worker,
+                    initargs=(themes_cache,)
+                )
+            except Exception as e:
+                logger.warning(f"⚠️ Pool de processus indisponible, calcul local: {e}")
+
+            if executor is None:
+                _init_worker(themes_cache)
+
+            in_flight: deque = deque()
+            chunks = self._iter_chunks(last_id)
+            exhausted = False
+
+            # Pool arrêté sur tous les chemins (annulation, pool cassé, erreur d'écriture)
+            try:
+                while not exhausted or in_flight:
+                    if self._cancel.is_set():
+                        break
+
+                    # Garder quelques blocs d'avance par processus
+                    while not exhausted and len(in_flight) < self.max_workers * 2:
+                        rows = next(chunks, None)
+                        if rows is None:
+                            exhausted = True
+                            break
+                        if executor is not None:
+                            in_flight.append((rows, executor.submit(_score_chunk, rows)))
+                        else:
+                            in_flight.append((rows, None))
+
+                    if not in_flight:
+                        break
+
+                    # Écriture dans l'ordre des id pour un point de contrôle exact
+                    rows, future = in_flight.popleft()
+                    scored = future.result() if future is not None else _score_chunk(rows)
+                    processed += len(rows)
+                    last_id = rows[-1][0]
+                    self._write_chunk(scored, last_id, processed, max(total, processed), signature)
+            finally:
+                if executor is not None:
+                    executor.shutdown(cancel_futures=True)
+
+            if self._cancel.is_set():
+                self._save_checkpoint('cancelled', last_id, processed, total, signature)
+                logger.info(f"⏹️ Ré-analyse annulée après {processed} articles")
+                self._rebuild_theme_series()
+                return
+
+            # Chaque article a été indexé pour tous les mots-clés actuels
+            with self.db_manager.connection() as conn:
+                KeywordIndex.mark_indexed(conn, {
+                    kw for theme in themes_cache.values() for kw in theme['keywords'] if kw
+                })
+                self._update_checkpoint(conn, 'completed', last_id, processed, processed, signature)
+            logger.info(f"✅ Ré-analyse terminée pour {processed} articles")
+            self._rebuild_theme_series()
+
+        except Exception as e:
+            logger.error(f"Erreur ré-analyse articles: {e}")
+            self._save_checkpoint('failed', last_id, processed, total, signature, error=str(e))
+
+    def _rebuild_theme_series(self):
+        """Séries d'anomalies par thème recalculées sur les nouvelles analyses"""
+        try:
+            OnlineAnomalyDetector(self.db_manager).rebuild('theme')
+        except Exception as e:
+            logger.error(f"Erreur reconstruction des séries d'anomalies par thème: {e}")
+
+    def _iter_chunks(self, last_id: int):
+        """Lit les articles par blocs d'id croissants (pagination par clé)"""
+        while True:
+            conn = self.db_manager.get_connection()
+            try:
+                rows = conn.execute("""
+                    SELECT id, title, content FROM articles
+                    WHERE id > ? ORDER BY id LIMIT ?
+                """, (last_id, self.chunk_size)).fetchall()
+            finally:
+                conn.close()
+
+            if not rows:
+                return
+            rows = [(row[0], row[1], row[2]) for row in rows]
+            last_id = rows[-1][0]
+            yield rows
+
+    def _write_chunk(self, scored: List[Tuple[int, Dict[str, float], List[str]]], last_id: int,
+                     processed: int, total: int, signature: str):
+        """Remplace les analyses d'un bloc et avance le point de contrôle, atomiquement"""
+        article_ids = [(article_id,) for article_id, _, _ in scored]
+        inserts = [
+            (article_id, theme_id, confidence)
+            for article_id, theme_scores, _ in scored
+            for theme_id, confidence in theme_scores.items()
+            if confidence >= 0.1
+        ]
+        postings = [
+            (kw, article_id)
+            for article_id, _, keywords in scored
+            for kw in keywords
+        ]
+        with self.db_manager.connection() as conn:
+            conn.executemany("DELETE FROM theme_analyses WHERE article_id = ?", article_ids)
+            conn.executemany("""
+                INSERT INTO theme_analyses (article_id, theme_id, confidence)
+                VALUES (?, ?, ?)
+            """, inserts)
+            KeywordIndex.add_postings(conn, postings)
+            self._update_checkpoint(conn, 'running', last_id, processed, total, signature)
+
+    # ------------------------------------------------------------------
+    # Thèmes et point de contrôle
+    # ------------------------------------------------------------------
+
+    def _load_themes(self) -> Dict[str, Dict[str, Any]]:
+        analyzer = ThemeAnalyzer(self.db_manager)
+        return analyzer._get_themes_with_keywords()
+
+    @staticmethod
+    def _themes_signature(themes_cache: Dict[str, Dict[str, Any]]) -> str:
+        payload = json.dumps(themes_cache, sort_keys=True, ensure_ascii=False)
+        return hashlib.sha1(payload.encode('utf-8')).hexdigest()
+
+    def _get_checkpoint(self) -> Optional[Dict[str, Any]]:
+        rows = self.db_manager.execute_query(
+            "SELECT * FROM reanalysis_checkpoints WHERE job_name = ?", (JOB_NAME,)
+        )
+        return dict(rows[0]) if rows else None
+
+    def _save_checkpoint(self, status: str, last_id: int, processed: int, total: int,
+                         signature: str, error: str = None, reset_start: bool = False):
+        with self.db_manager.connection() as conn:
+            self._update_checkpoint(conn, status, last_id, processed, total, signature,
+                                    error, reset_start)
+
+    @staticmethod
+    def _update_checkpoint(conn, status: str, last_id: int, processed: int, total: int,
+                           signature: str, error: str = None, reset_start: bool = False):
+        conn.execute("""
+            INSERT INTO reanalysis_checkpoints
+                (job_name, status, last_article_id, processed, total, themes_signature,
+                 started_at, updated_at, error)
+            VALUES (?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP, CURRENT_TIMESTAMP, ?)
+            ON CONFLICT(job_name) DO UPDATE SET
+                status = excluded.status,
+                last_article_id = excluded.last_article_id,
+                processed = excluded.processed,
+                total = excluded.total,
+                themes_signature = excluded.themes_signature,
+                started_at = CASE WHEN ? THEN excluded.started_at
+                                  ELSE reanalysis_checkpoints.started_at END,
+                updated_at = excluded.updated_at,
+                error = excluded.error
+        """, (JOB_NAME, status, last_id, processed, total, signature, error, int(reset_start)))